@@ -8,12 +8,14 @@ from fsm_admin2.admin import FSMTransitionMixin
 from .models import (
     Address,
     Booking,
+    BookingSeries,
     BookingSlot,
     Charge,
     Contact,
     Customer,
     Invoice,
     InvoiceOpen,
+    OutboxMessage,
     Payment,
     Pet,
     Service,
@@ -42,6 +44,11 @@ class BookingAdmin(admin.ModelAdmin):
     readonly_fields = ["state"]
 
 
+@admin.register(BookingSeries)
+class BookingSeriesAdmin(admin.ModelAdmin):
+    list_display = ("customer", "service", "start_date", "end_date", "time")
+
+
 @admin.register(BookingSlot)
 class BookingSlotAdmin(admin.ModelAdmin):
     pass
@@ -96,6 +103,12 @@ class InvoiceOpenAdmin(admin.ModelAdmin):
     list_display = ("invoice", "opened")
 
 
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ("invoice", "state", "attempts", "next_attempt", "sent_on")
+    list_filter = ("state",)
+
+
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
     list_display = ("amount", "invoice", "created")
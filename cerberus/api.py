@@ -1,14 +1,17 @@
 # Standard Library
 import contextlib
-from datetime import datetime, timedelta
+from datetime import timedelta
 from wsgiref.util import FileWrapper
 
 # Django
 from django.contrib.staticfiles import finders
 from django.db import transaction
+from django.db.models.functions import Coalesce
 from django.db.models.query import QuerySet
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.urls import path
+from django.utils.cache import parse_etags, quote_etag
 
 # Third Party
 from django_filters import rest_framework as filters
@@ -22,27 +25,67 @@ from rest_framework.views import APIView
 from taggit.models import Tag
 
 # Locals
+from .availability import find_availability
+from .billing import billing_run
+from .exports import export_invoices
 from .filters import BookingFilter, CustomerFilter, InvoiceFilter, PetFilter
-from .models import Address, Booking, BookingSlot, Charge, Contact, Customer, Invoice, Pet, Service, UserSettings, Vet
+from .models import (
+    Address,
+    Booking,
+    BookingSeries,
+    BookingSlot,
+    Charge,
+    Contact,
+    Customer,
+    Invoice,
+    Pet,
+    SearchEntry,
+    Service,
+    UserSettings,
+    Vet,
+)
+from .moves import Move, bulk_move
+from .overview import get_overview
 from .permissions import IsUsers
+from .reference_data import get_reference_data
+from .rendering import get_renderer
+from .schedule import build_day_schedule
 from .serializers import (
     AddressSerializer,
+    AutocompleteQuerySerializer,
+    AvailabilityRangeSerializer,
+    AvailabilitySerializer,
+    BillingRunSerializer,
     BookingSerializer,
+    BookingSeriesSerializer,
     BookingSlotSerializer,
     ChargeSerializer,
+    CompleteEndedSerializer,
     ContactSerializer,
     CustomerDropDownSerializer,
     CustomerSerializer,
+    DayScheduleSerializer,
+    InvoiceExportSerializer,
+    InvoiceOverviewBucketSerializer,
+    InvoiceOverviewQuerySerializer,
     InvoiceSendSerializer,
     InvoiceSerializer,
+    MoveResultSerializer,
+    MoveSerializer,
+    OnDateSerializer,
+    PetAutocompleteQuerySerializer,
     PetDropDownSerializer,
     PetSerializer,
+    SearchHitSerializer,
+    SearchQuerySerializer,
+    SeriesConflictSerializer,
     ServiceSerializer,
     ToDateSerializer,
     ToDateTimeSerializer,
     UserSettingsSerializer,
     VetSerializer,
 )
+from .utils import make_aware
 
 default_permissions = [permissions.IsAuthenticated]
 
@@ -67,6 +110,19 @@ class ActiveMixin:
         return Response({"status": "ok"})
 
 
+class PrefetchPlanMixin:
+    """Load the related objects the serializer declares it needs along with
+    the viewset's queryset."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()  # type: ignore
+        serializer_class = self.get_serializer_class()  # type: ignore
+
+        if hasattr(serializer_class, "setup_queryset"):
+            return serializer_class.setup_queryset(queryset)
+        return queryset
+
+
 class ChangeStateMixin:
     def change_state(self, action: str, request, **kwargs) -> Response:
         assert isinstance(self, viewsets.ModelViewSet), "Can only be used on ModelViewSet"
@@ -79,11 +135,23 @@ class ChangeStateMixin:
                 item.save()
                 status = 200
 
+        # The transition may have changed the prefetched related objects
+        item._prefetched_objects_cache = {}
+
         serializer = self.get_serializer(item)
 
         return Response({"item": serializer.data, "status": status}, status=status)
 
 
+def overview_response(request, customer_id: int | None = None) -> Response:
+    incoming = InvoiceOverviewQuerySerializer(data=request.query_params)
+    incoming.is_valid(raise_exception=True)
+
+    overview = get_overview(customer_id, **incoming.validated_data)
+
+    return Response({state: InvoiceOverviewBucketSerializer(bucket).data for state, bucket in overview.items()})
+
+
 class AddressViewSet(viewsets.ModelViewSet):
     queryset = Address.objects.all()
     serializer_class = AddressSerializer
@@ -95,6 +163,18 @@ class ServiceViewSet(viewsets.ModelViewSet):
     serializer_class = ServiceSerializer
     permission_classes = default_permissions
 
+    @action(detail=True, methods=["get"])
+    def availability(self, request, pk=None):
+        service: Service = self.get_object()
+        incoming = AvailabilityRangeSerializer(data=request.query_params)
+        incoming.is_valid(raise_exception=True)
+
+        start = make_aware(incoming.validated_data["from"])
+        end = make_aware(incoming.validated_data["to"] + timedelta(days=1))
+        windows = find_availability(service, start, end)
+
+        return Response(AvailabilitySerializer(windows, many=True).data)
+
 
 class BookingViewSet(viewsets.ModelViewSet, ChangeStateMixin):
     queryset = Booking.objects.all()
@@ -103,6 +183,15 @@ class BookingViewSet(viewsets.ModelViewSet, ChangeStateMixin):
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = BookingFilter
 
+    @action(detail=False, methods=["get"])
+    def day(self, request):
+        incoming = OnDateSerializer(data=request.query_params)
+        incoming.is_valid(raise_exception=True)
+
+        schedule = build_day_schedule(incoming.validated_data["date"])
+
+        return Response(DayScheduleSerializer(schedule).data)
+
     @action(detail=True, methods=["put"])
     def process(self, request, pk=None):
         return self.change_state("process", request)
@@ -123,6 +212,15 @@ class BookingViewSet(viewsets.ModelViewSet, ChangeStateMixin):
     def complete(self, request, pk=None):
         return self.change_state("complete", request)
 
+    @action(detail=False, methods=["put"])
+    def complete_ended(self, request):
+        incoming = CompleteEndedSerializer(data=request.data)
+        incoming.is_valid(raise_exception=True)
+
+        report = Booking.complete_ended(by=request.user, dry_run=incoming.validated_data["dry_run"])
+
+        return Response({**report._asdict(), "rate": report.rate, "status": 200})
+
     @action(detail=True, methods=["PUT"])
     def move(self, request, pk=None):
         booking: Booking = self.get_object()
@@ -141,6 +239,19 @@ class BookingViewSet(viewsets.ModelViewSet, ChangeStateMixin):
 
         return Response({"item": serializer.data, "status": status}, status=status)
 
+    @action(detail=False, methods=["PUT"])
+    def bulk_move(self, request):
+        incoming = MoveSerializer(data=request.data, many=True)
+        incoming.is_valid(raise_exception=True)
+
+        results = bulk_move(Move(item["id"], item["to"]) for item in incoming.validated_data)
+        status = 200 if all(result.status == 200 for result in results) else 207
+
+        return Response(
+            {"results": MoveResultSerializer(results, many=True).data, "status": status},
+            status=status,
+        )
+
     @action(detail=True, methods=["PUT"])
     def move_slot(self, request, pk=None):
         booking: Booking = self.get_object()
@@ -160,6 +271,37 @@ class BookingViewSet(viewsets.ModelViewSet, ChangeStateMixin):
         return Response({"item": serializer.data, "status": status}, status=status)
 
 
+class BookingSeriesViewSet(viewsets.ModelViewSet):
+    queryset = BookingSeries.objects.all()
+    serializer_class = BookingSeriesSerializer
+    permission_classes = default_permissions
+
+    def book_series(self, series: BookingSeries, status: int) -> Response:
+        bookings, conflicts = series.book()
+
+        return Response(
+            {
+                "item": self.get_serializer(series).data,
+                "bookings": [booking.pk for booking in bookings],
+                "conflicts": SeriesConflictSerializer(conflicts, many=True).data,
+                "status": status,
+            },
+            status=status,
+        )
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            series = serializer.save()
+            return self.book_series(series, status=201)
+
+    @action(detail=True, methods=["put"])
+    def book(self, request, pk=None):
+        return self.book_series(self.get_object(), status=200)
+
+
 class BookingSlotViewSet(viewsets.ModelViewSet):
     queryset = BookingSlot.objects.all()
     serializer_class = BookingSlotSerializer
@@ -216,7 +358,7 @@ class ChargeViewSet(viewsets.ModelViewSet):
         return self.change_state("refund")
 
 
-class InvoiceViewSet(ChangeStateMixin, viewsets.ModelViewSet):
+class InvoiceViewSet(PrefetchPlanMixin, ChangeStateMixin, viewsets.ModelViewSet):
     queryset = Invoice.objects.all()
     serializer_class = InvoiceSerializer
     permission_classes = default_permissions
@@ -243,14 +385,54 @@ class InvoiceViewSet(ChangeStateMixin, viewsets.ModelViewSet):
     @action(detail=True, methods=["get"])
     def resend(self, request, pk=None):
         item = self.get_object()
-        item.send_email()
+        item.resend_email()
         return Response({"status": "ok"}, status=200)
 
     @action(detail=True, methods=["get"])
     def pdf(self, request, pk=None):
         invoice: Invoice = self.get_object()
 
-        return invoice.get_pdf_response()
+        return invoice.get_pdf_response(request)
+
+    @action(detail=False, methods=["put"])
+    def billing_run(self, request):
+        incoming = BillingRunSerializer(data=request.data)
+        incoming.is_valid(raise_exception=True)
+
+        report = billing_run(
+            incoming.validated_data["to"],
+            incoming.validated_data.get("from"),
+            send=incoming.validated_data["send"],
+            dry_run=incoming.validated_data["dry_run"],
+        )
+
+        return Response({**report._asdict(), "status": 200})
+
+    @action(detail=False, methods=["get"], url_path="export.zip")
+    def export(self, request):
+        incoming = InvoiceExportSerializer(data=request.query_params)
+        incoming.is_valid(raise_exception=True)
+
+        invoices = Invoice.objects.alias(issued_on=Coalesce("sent_on", "created")).filter(
+            issued_on__gte=make_aware(incoming.validated_data["from"]),
+            issued_on__lt=make_aware(incoming.validated_data["to"] + timedelta(days=1)),
+        )
+        if state := incoming.validated_data.get("state"):
+            invoices = invoices.filter(state=state)
+
+        response = StreamingHttpResponse(
+            export_invoices(invoices.select_related("customer").order_by("pk").iterator()),
+            content_type="application/zip",
+        )
+        response.headers["Content-Disposition"] = 'attachment; filename="invoices.zip"'
+
+        return response
+
+    @action(detail=False, methods=["get"], permission_classes=[permissions.IsAdminUser])
+    def render_stats(self, request):
+        stats = get_renderer().stats()
+
+        return Response({**stats._asdict(), "average_render_seconds": stats.average_render_seconds})
 
     @action(detail=True, methods=["get"])
     def logo(self, request, pk=None):
@@ -264,23 +446,7 @@ class InvoiceViewSet(ChangeStateMixin, viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def overview(self, request):
-        invoices = Invoice.objects
-
-        recent = datetime.now() - timedelta(days=28)
-
-        draft = invoices.filter(state=Invoice.States.DRAFT.value)
-        unpaid = invoices.filter(state=Invoice.States.UNPAID.value)
-        void = invoices.filter(state=Invoice.States.VOID.value, last_updated__gte=recent)
-        paid = invoices.filter(state=Invoice.States.PAID.value, last_updated__gte=recent)
-
-        return Response(
-            {
-                "draft": InvoiceSerializer(draft, many=True).data,
-                "unpaid": InvoiceSerializer(unpaid, many=True).data,
-                "void": InvoiceSerializer(void, many=True).data,
-                "paid": InvoiceSerializer(paid, many=True).data,
-            }
-        )
+        return overview_response(request)
 
 
 class ContactViewSet(viewsets.ModelViewSet):
@@ -289,17 +455,20 @@ class ContactViewSet(viewsets.ModelViewSet):
     permission_classes = default_permissions
 
 
-class CustomerViewSet(viewsets.ModelViewSet, ActiveMixin):
+class CustomerViewSet(PrefetchPlanMixin, viewsets.ModelViewSet, ActiveMixin):
     queryset: "QuerySet[Customer]" = Customer.objects.all()
     serializer_class = CustomerSerializer
     permission_classes = default_permissions
     filter_backends = (filters.DjangoFilterBackend, drf_filters.OrderingFilter, drf_filters.SearchFilter)
     filterset_class = CustomerFilter
-    search_fields = ["name", "email"]
+    search_fields = ["name", "invoice_email"]
 
     ordering = "-name"
     ordering_fields = ("name", "invoiced_unpaid", "created")
 
+    def get_queryset(self):
+        return super().get_queryset().with_financials()
+
     @action(detail=True, methods=["put"])
     def partial(self, request, *args, **kwargs):
         kwargs["partial"] = True
@@ -320,27 +489,23 @@ class CustomerViewSet(viewsets.ModelViewSet, ActiveMixin):
 
     @action(detail=True, methods=["get"])
     def accounts(self, request, pk=None):
-        customer = self.get_object()
-        invoices = Invoice.objects.filter(customer=customer)
+        # Only checks the customer exists, without the manager's annotations
+        customer = get_object_or_404(Customer._base_manager, pk=pk)
 
-        recent = datetime.now() - timedelta(days=28)
+        return overview_response(request, customer.pk)
 
-        draft = invoices.filter(state=Invoice.States.DRAFT.value)
-        unpaid = invoices.filter(state=Invoice.States.UNPAID.value)
-        void = invoices.filter(state=Invoice.States.VOID.value, last_updated__gte=recent)
-        paid = invoices.filter(state=Invoice.States.PAID.value, last_updated__gte=recent)
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        incoming = AutocompleteQuerySerializer(data=request.query_params)
+        incoming.is_valid(raise_exception=True)
 
-        return Response(
-            {
-                "draft": InvoiceSerializer(draft, many=True).data,
-                "unpaid": InvoiceSerializer(unpaid, many=True).data,
-                "void": InvoiceSerializer(void, many=True).data,
-                "paid": InvoiceSerializer(paid, many=True).data,
-            }
-        )
+        query = incoming.validated_data
+        customers = Customer.objects.filter(active=True).matching(query["q"])[: query["limit"]]
+
+        return Response(CustomerDropDownSerializer(customers, many=True).data)
 
 
-class PetViewSet(viewsets.ModelViewSet, ActiveMixin):
+class PetViewSet(PrefetchPlanMixin, viewsets.ModelViewSet, ActiveMixin):
     queryset = Pet.objects.all()
     serializer_class = PetSerializer
     permission_classes = default_permissions
@@ -363,8 +528,22 @@ class PetViewSet(viewsets.ModelViewSet, ActiveMixin):
             }
         )
 
+    @action(detail=False, methods=["get"])
+    def autocomplete(self, request):
+        incoming = PetAutocompleteQuerySerializer(data=request.query_params)
+        incoming.is_valid(raise_exception=True)
+
+        query = incoming.validated_data
+        pets = Pet.objects.filter(active=True)
+        if "customer" in query:
+            pets = pets.filter(customer_id=query["customer"])
+        if query["q"]:
+            pets = pets.matching(query["q"])
+
+        return Response(PetDropDownSerializer(pets[: query["limit"]], many=True).data)
 
-class VetViewSet(viewsets.ModelViewSet):
+
+class VetViewSet(PrefetchPlanMixin, viewsets.ModelViewSet):
     queryset = Vet.objects.all()
     serializer_class = VetSerializer
     permission_classes = default_permissions
@@ -375,9 +554,39 @@ class TagListView(APIView):
         return Tag.objects.all()
 
     def get(self, request, format=None):
-        tags = self.get_queryset()
+        return Response(get_reference_data().data["tags"])
+
+
+class ReferenceDataView(APIView):
+    """Services, vets, tags and active customer and pet names in one
+    response, which can be revalidated against its version with
+    ``If-None-Match``."""
+
+    permission_classes = default_permissions
+
+    def get(self, request, format=None):
+        reference_data = get_reference_data()
+        etag = quote_etag(reference_data.version)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if "*" in etags or etag in etags:
+            return Response(status=304, headers=headers)
+
+        return Response(reference_data.data, headers=headers)
+
+
+class SearchView(APIView):
+    permission_classes = default_permissions
+
+    def get(self, request, format=None):
+        incoming = SearchQuerySerializer(data=request.query_params)
+        incoming.is_valid(raise_exception=True)
+
+        query = incoming.validated_data
+        hits = SearchEntry.search(query["q"], query["limit"], sorted(query.get("kind", [])))
 
-        return Response([tag.name for tag in tags])
+        return Response(SearchHitSerializer(hits, many=True).data)
 
 
 class UserSettingsViewSet(ChangeStateMixin, viewsets.ModelViewSet):
@@ -390,6 +599,7 @@ router = routers.DefaultRouter()
 router.register(r"address", AddressViewSet)
 router.register(r"service", ServiceViewSet)
 router.register(r"booking", BookingViewSet)
+router.register(r"bookingseries", BookingSeriesViewSet)
 router.register(r"bookingslot", BookingSlotViewSet)
 router.register(r"charge", ChargeViewSet)
 router.register(r"invoice", InvoiceViewSet)
@@ -400,4 +610,8 @@ router.register(r"vet", VetViewSet)
 router.register(r"usersettings", UserSettingsViewSet)
 
 
-urls = [path("tag/", TagListView.as_view())]
+urls = [
+    path("tag/", TagListView.as_view()),
+    path("search/", SearchView.as_view()),
+    path("reference-data/", ReferenceDataView.as_view()),
+]
@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class CerberusConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "cerberus"
+
+    def ready(self) -> None:
+        # Locals
+        from . import signals  # noqa: F401
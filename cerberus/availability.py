@@ -0,0 +1,113 @@
+# Standard Library
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import pairwise
+from typing import NamedTuple
+
+# Django
+from django.db import models
+from django.db.models import F, Q
+from django.db.models.functions import Lag, Lead
+from django.utils import timezone
+
+# Locals
+from .models import BookingSlot, Service
+
+
+class Window(NamedTuple):
+    start: datetime
+    end: datetime
+    pets: int
+    customers: int
+    slot: int | None = None
+
+
+class SecondsBetween(models.Func):
+    """The seconds from the second datetime to the first."""
+
+    template = "EXTRACT(EPOCH FROM (%(expressions)s))"
+    arg_joiner = " - "
+    output_field = models.FloatField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # SQLite's own julianday() keeps this out of Django's Python functions
+        return super().as_sql(
+            compiler,
+            connection,
+            template="((julianday(%(expressions)s)) * 86400)",
+            arg_joiner=") - julianday(",
+            **extra_context,
+        )
+
+
+def _midnights(start: datetime, end: datetime) -> list[datetime]:
+    """The local midnights after ``start`` and before ``end``."""
+    local = timezone.localtime(start)
+    midnight = timezone.make_aware(datetime(local.year, local.month, local.day) + timedelta(days=1))
+    midnights = []
+    while midnight < end:
+        midnights.append(midnight)
+        midnight = timezone.make_aware(timezone.make_naive(midnight) + timedelta(days=1))
+    return midnights
+
+
+def find_availability(service: Service, start: datetime, end: datetime) -> list[Window]:
+    """Find the windows in ``[start, end)`` where ``service`` can be booked.
+
+    A gap between occupied slots that is at least ``service.booked_length``
+    long is a free window with the full capacity of the service, split at
+    midnight so a quiet range gives one window a day. An occupied slot for
+    the same service with pets and customers to spare is returned as a window
+    that can be joined.
+
+    The gaps are found in one query that compares each occupied slot with the
+    end of the one before, which is enough as occupied slots never overlap.
+    Only the first and last slots, the slots after a long enough gap and the
+    joinable slots are loaded rather than every occupied slot.
+    """
+    slots = (
+        BookingSlot.occupied()
+        .filter(start__lt=end, end__gt=start)
+        .annotate(
+            free_from=models.Window(Lag("end"), order_by=[F("start"), F("end")]),
+            next_start=models.Window(Lead("start"), order_by=[F("start"), F("end")]),
+        )
+        .annotate(gap=SecondsBetween("start", "free_from"))
+        .filter(
+            Q(free_from__isnull=True)
+            | Q(next_start__isnull=True)
+            # A millisecond's grace for floating point, add_free() has the final say
+            | Q(gap__gte=service.booked_length.total_seconds() - 0.001)
+            | Q(service=service, pet_count__lt=service.max_pet, customer_count__lt=service.max_customer)
+        )
+        .order_by("start", "end")
+        .values_list("pk", "start", "end", "service_id", "pet_count", "customer_count", "free_from")
+    )
+
+    windows: list[Window] = []
+    midnights = _midnights(start, end)
+
+    def add_free(free_start: datetime, free_end: datetime) -> None:
+        if free_end - free_start < service.booked_length:
+            return
+
+        first = bisect_right(midnights, free_start)
+        last = bisect_left(midnights, free_end)
+        for day_start, day_end in pairwise([free_start, *midnights[first:last], free_end]):
+            if day_end - day_start >= service.booked_length:
+                windows.append(Window(day_start, day_end, service.max_pet, service.max_customer))
+
+    last_end = start
+    for pk, slot_start, slot_end, service_id, pet_count, customer_count, free_from in slots:
+        add_free(max(start, free_from or start), slot_start)
+
+        pets = service.max_pet - pet_count
+        customers = service.max_customer - customer_count
+        if service_id == service.pk and pets > 0 and customers > 0 and slot_start >= start:
+            windows.append(Window(slot_start, slot_end, pets, customers, pk))
+
+        last_end = slot_end
+
+    add_free(max(start, last_end), end)
+
+    return windows
@@ -0,0 +1,176 @@
+# Standard Library
+from collections import defaultdict
+from collections.abc import Iterable, Mapping
+from datetime import date
+from decimal import Decimal
+from time import perf_counter
+from typing import NamedTuple
+
+# Django
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+# Third Party
+from django_fsm_log.models import StateLog
+
+# Locals
+from .exceptions import ChargeLinesError
+from .models import Charge, Customer, Invoice
+from .overview import invalidate_overview
+
+# The fields of a charge that can be edited as a line of its invoice
+CHARGE_LINE_FIELDS = ("name", "line", "quantity")
+
+
+class BillingReport(NamedTuple):
+    invoices: int
+    charges: int
+    sent: int
+    elapsed: float
+
+
+def uninvoiced_charges(end: date, start: date | None = None):
+    """The charges still to be invoiced which were made between ``start``
+    and ``end``, inclusive."""
+    charges = Charge.objects.non_polymorphic().filter(
+        invoice__isnull=True,
+        customer__isnull=False,
+        state__in=[Charge.States.UNPAID.value, Charge.States.REFUND.value],
+        created__date__lte=end,
+    )
+    if start is not None:
+        charges = charges.filter(created__date__gte=start)
+
+    return charges
+
+
+def billing_run(end: date, start: date | None = None, send: bool = False, dry_run: bool = False) -> BillingReport:
+    """Invoice every customer's uninvoiced charges made up to ``end``.
+
+    The charges are read and locked with one query and every customer's
+    invoice is created, totals included, with one insert, then each invoice
+    takes its charges with a single UPDATE. Running it again for the same
+    period finds nothing left to invoice, so it is safe to repeat. With
+    ``send`` the new invoices are sent, skipping any whose customer has
+    issues.
+    """
+    started = perf_counter()
+    now = timezone.now()
+
+    with transaction.atomic():
+        by_customer: dict[int, list[int]] = defaultdict(list)
+        subtotals: dict[int, Decimal] = defaultdict(Decimal)
+        for customer_id, charge_id, line, quantity in (
+            uninvoiced_charges(end, start)
+            .select_for_update(of=("self",))
+            .order_by("customer_id", "pk")
+            .values_list("customer_id", "pk", "line", "quantity")
+        ):
+            by_customer[customer_id].append(charge_id)
+            subtotals[customer_id] += line * quantity
+
+        charge_count = sum(len(ids) for ids in by_customer.values())
+        if dry_run or not by_customer:
+            return BillingReport(len(by_customer), charge_count, 0, perf_counter() - started)
+
+        customers = Customer.objects.in_bulk(by_customer)
+        invoices = Invoice.objects.bulk_create(
+            Invoice(
+                customer=customer,
+                customer_name=customer.name,
+                invoice_address=customer.invoice_address,
+                subtotal=subtotals[customer.pk],
+                total=subtotals[customer.pk],
+            )
+            for customer in customers.values()
+        )
+
+        for invoice in invoices:
+            invoice.add_charges(by_customer[invoice.customer_id], now=now, update_totals=False)
+
+        # Nothing above sends the save signals that would do this
+        invalidate_overview()
+
+    sent = 0
+    if send:
+        for invoice in invoices:
+            if invoice.can_send():
+                invoice.send()
+                sent += 1
+
+    return BillingReport(len(invoices), charge_count, sent, perf_counter() - started)
+
+
+def write_charges(
+    invoice: Invoice, lines: Iterable[Mapping], remove_missing: bool = True, by: User | None = None
+) -> list[Charge]:
+    """Make an invoice's charges match ``lines``.
+
+    A line with an ``id`` updates that charge and any other line is a new
+    charge. With ``remove_missing`` the invoice's charges that aren't listed
+    are voided. Every line is checked before anything is written, then the
+    charges are read with one query and written with at most one insert, one
+    update and one void however many lines there are.
+    """
+    lines = list(lines)
+    if not invoice.can_edit:
+        raise ChargeLinesError("Only draft invoices can have their charges changed")
+
+    now = timezone.now()
+    ids = {line["id"] for line in lines if line.get("id")}
+    on_invoice = {
+        pk: charge
+        for pk, charge in Charge.objects.non_polymorphic().filter(Q(invoice=invoice) | Q(pk__in=ids)).in_bulk().items()
+        if charge.invoice_id == invoice.pk
+    }
+
+    if unknown := ids.difference(on_invoice):
+        raise ChargeLinesError(f"Charges {sorted(unknown)} are not on this invoice")
+
+    removed = [charge for pk, charge in on_invoice.items() if pk not in ids] if remove_missing else []
+    if locked := [charge.pk for charge in removed if charge.state != Charge.States.UNPAID.value]:
+        raise ChargeLinesError(f"Charges {locked} have been paid or refunded and can't be removed")
+
+    charges, created, updated = [], [], []
+    for line in lines:
+        fields = {field: line[field] for field in CHARGE_LINE_FIELDS if field in line}
+        if charge := on_invoice.get(line.get("id")):
+            for field, value in fields.items():
+                setattr(charge, field, value)
+            charge.last_updated = now
+            updated.append(charge)
+        else:
+            charge = Charge(invoice=invoice, customer=invoice.customer, **fields)
+            charge.pre_save_polymorphic()
+            created.append(charge)
+        charges.append(charge)
+
+    with transaction.atomic():
+        Charge.objects.bulk_create(created)
+        Charge.objects.bulk_update(updated, [*CHARGE_LINE_FIELDS, "line_currency", "last_updated"])
+
+        if removed:
+            Charge.objects.filter(pk__in=[charge.pk for charge in removed]).update(
+                state=Charge.States.VOID.value, invoice=None, last_updated=now
+            )
+            StateLog.objects.bulk_create(
+                StateLog(
+                    timestamp=now,
+                    by=by,
+                    source_state=Charge.States.UNPAID.value,
+                    state=Charge.States.VOID.value,
+                    transition="void",
+                    content_type_id=charge.polymorphic_ctype_id,
+                    object_id=charge.pk,
+                )
+                for charge in removed
+            )
+
+        # None of the writes above send the signals that would do this
+        Invoice.update_totals(invoice.pk)
+        invalidate_overview()
+
+    invoice.refresh_totals()
+    return charges
@@ -0,0 +1,44 @@
+# Standard Library
+import os
+from typing import NamedTuple
+
+# Django
+from django.template import engines, loader
+from django.template.backends.django import Template
+
+# Third Party
+from mjml import mjml2html
+
+
+class CompiledEmail(NamedTuple):
+    path: str
+    mtime: float
+    template: Template
+
+
+_compiled: dict[str, CompiledEmail] = {}
+
+
+def get_email_template(template_name: str) -> Template:
+    """An MJML template compiled to HTML, as a Django template.
+
+    The MJML is compiled once with its template tags left in place, so an
+    email only costs the Django render. It is compiled again whenever the
+    template file changes.
+    """
+    if (compiled := _compiled.get(template_name)) is not None and _mtime(compiled.path) == compiled.mtime:
+        return compiled.template
+
+    source = loader.get_template(template_name)
+    path = source.origin.name
+    template = engines["django"].from_string(mjml2html(source.template.source))
+    _compiled[template_name] = CompiledEmail(path, _mtime(path), template)
+
+    return template
+
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
@@ -23,9 +23,31 @@ class SlotOverlapsError(BookingSlotError):
     pass
 
 
+class SlotChangedError(BookingSlotError):
+    status_code = status.HTTP_409_CONFLICT
+
+
+class ChargeLinesError(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+
+
 class InvalidEmailError(Exception):
     pass
 
 
 class ChargeRefundError(Exception):
     pass
+
+
+class PdfRenderError(Exception):
+    pass
+
+
+class RendererUnavailableError(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "PDF rendering is busy, try again later."
+    default_code = "renderer_unavailable"
+
+    def __init__(self, detail=None, code=None, wait: int | None = None) -> None:
+        super().__init__(detail, code)
+        self.wait = wait
@@ -0,0 +1,104 @@
+# Standard Library
+import io
+import zipfile
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Django
+from django.core.files.storage import default_storage
+
+# Locals
+from .exceptions import RendererUnavailableError
+from .models import Invoice
+from .rendering import get_renderer
+
+
+class ChunkBuffer(io.RawIOBase):
+    """A write only file which hands back whatever was written since it was
+    last drained. It can't seek, so ``zipfile`` writes each entry's sizes
+    after its data rather than going back to fill them in."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        chunk, self._chunks = b"".join(self._chunks), []
+        return chunk
+
+
+def zip_stream(entries: Iterable[tuple[str, bytes]]) -> Iterator[bytes]:
+    """Yield a ZIP of ``entries`` a file at a time, so only one entry is held
+    in memory however many there are."""
+    buffer = ChunkBuffer()
+
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, data in entries:
+            # PDFs are already compressed, deflating them again costs time for nothing
+            archive.writestr(name, data)
+            yield buffer.drain()
+
+    yield buffer.drain()
+
+
+def invoice_pdfs(invoices: Iterable[Invoice]) -> Iterator[tuple[Invoice, bytes]]:
+    """Yield each invoice with its PDF, in order.
+
+    Stored PDFs are read back and the rest are rendered by the PDF workers,
+    keeping every worker busy so later invoices render while earlier ones are
+    being sent. At most one more PDF than there are workers is held at once.
+    """
+    renderer = get_renderer()
+    ahead = max(renderer.workers, 1)
+    pending: deque[tuple[Invoice, str, Future, bool]] = deque()
+
+    def finish(invoice: Invoice, digest: str, future: Future, stored: bool) -> tuple[Invoice, bytes]:
+        try:
+            pdf, _ = future.result(timeout=renderer.timeout)
+        except FutureTimeoutError:
+            raise RendererUnavailableError(wait=renderer.retry_after)
+
+        if not stored:
+            Invoice.store_pdf(digest, pdf)
+        return invoice, pdf
+
+    for invoice in invoices:
+        digest = invoice.pdf_digest()
+
+        if stored := Invoice.stored_pdf(digest):
+            with default_storage.open(stored.name) as f:
+                future = _completed(f.read())
+        elif renderer.workers == 0:
+            future = _completed(renderer.render(invoice.render_html()))
+        else:
+            future = renderer.submit(invoice.render_html(), wait=True)
+        pending.append((invoice, digest, future, stored is not None))
+
+        while len(pending) > ahead or (pending and pending[0][2].done()):
+            yield finish(*pending.popleft())
+
+    while pending:
+        yield finish(*pending.popleft())
+
+
+def _completed(pdf: bytes) -> Future:
+    future: Future = Future()
+    future.set_result((pdf, 0.0))
+    return future
+
+
+def export_invoices(invoices: Iterable[Invoice]) -> Iterator[bytes]:
+    return zip_stream((f"{invoice.name}.pdf", pdf) for invoice, pdf in invoice_pdfs(invoices))
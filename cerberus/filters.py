@@ -4,13 +4,14 @@ from enum import Enum
 
 # Django
 from django import forms
+from django.core.validators import EMPTY_VALUES
 
 # Third Party
 from django_filters import rest_framework as filters
 from django_filters.widgets import RangeWidget
 
 # Locals
-from .models import Booking, Customer, Invoice, Pet, Service, Vet
+from .models import Booking, Customer, Invoice, Pet, SearchEntry, Service, Vet
 
 ACTIVE_CHOICES = ((True, "Active"), (False, "Inactive"))
 
@@ -28,6 +29,27 @@ class RangeInput(RangeWidget):
     template_name = "forms/widgets/range_input.html"
 
 
+class SearchIndexFilter(filters.CharFilter):
+    """Match the words typed against the search index, rather than scanning
+    the table for them.
+
+    ``field_name`` is compared with the ``column`` of the matching entries of
+    ``kind``, the object's own id by default.
+    """
+
+    def __init__(self, kind: str, *args, column: str = "object_id", **kwargs):
+        self.kind = kind
+        self.column = column
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+
+        entries = SearchEntry.objects.matching(value).filter(kind=self.kind).values(self.column)
+        return qs.filter(**{f"{self.field_name}__in": entries})
+
+
 class FilterDefaults(filters.FilterSet):
     default_filters = {}
 
@@ -43,8 +65,8 @@ class FilterDefaults(filters.FilterSet):
 
 class PetFilter(FilterDefaults):
     active = filters.TypedChoiceFilter(choices=ACTIVE_CHOICES, coerce=strtobool, widget=Switch)
-    name = filters.CharFilter(lookup_expr="icontains", label="Name")
-    customer__name = filters.CharFilter(lookup_expr="icontains", label="Customer")
+    name = SearchIndexFilter(SearchEntry.Kinds.PET, field_name="pk", label="Name")
+    customer__name = SearchIndexFilter(SearchEntry.Kinds.CUSTOMER, field_name="customer", label="Customer")
 
     default_filters = {
         "active": True,
@@ -61,6 +83,7 @@ class CustomerFilter(FilterDefaults):
         UNINVOICED = "Uninvoiced"
         UNPAID = "Unpaid"
         OVERDUE = "Overdue"
+        ISSUES = "Needs attention"
 
         @classmethod
         def pairs(cls, filter: list = []) -> list[tuple[str, str]]:
@@ -68,8 +91,8 @@ class CustomerFilter(FilterDefaults):
 
     status = filters.ChoiceFilter(choices=Statuses.pairs([Statuses.BOOKINGS]), method="filter_status", label="Status")
     active = filters.TypedChoiceFilter(choices=ACTIVE_CHOICES, coerce=strtobool, widget=Switch)
-    name = filters.CharFilter(lookup_expr="icontains", label="Name")
-    pets__name = filters.CharFilter(lookup_expr="icontains", label="Pet")
+    name = SearchIndexFilter(SearchEntry.Kinds.CUSTOMER, field_name="pk", label="Name")
+    pets__name = SearchIndexFilter(SearchEntry.Kinds.PET, field_name="pk", column="customer_id", label="Pet")
 
     default_filters = {
         "active": True,
@@ -89,6 +112,8 @@ class CustomerFilter(FilterDefaults):
                 return queryset.filter(invoices__state=Invoice.States.UNPAID)
             case self.Statuses.OVERDUE.name:
                 return queryset.filter(invoices__state=Invoice.States.UNPAID, invoices__due__lt=datetime.now())
+            case self.Statuses.ISSUES.name:
+                return queryset.needing_attention()
             case _:
                 return queryset
 
@@ -97,8 +122,8 @@ class BookingFilter(FilterDefaults):
     from_date = filters.DateFilter(field_name="end", lookup_expr="gte")
     to_date = filters.DateFilter(field_name="start", lookup_expr="lte")
     on_date = filters.DateFilter(field_name="start", lookup_expr="date")
-    customer__name = filters.CharFilter(lookup_expr="icontains", label="Customer")
-    pets__name = filters.CharFilter(lookup_expr="icontains", label="Pet")
+    customer__name = SearchIndexFilter(SearchEntry.Kinds.CUSTOMER, field_name="customer", label="Customer")
+    pets__name = SearchIndexFilter(SearchEntry.Kinds.PET, field_name="pets", label="Pet")
 
     class Meta:
         model = Booking
@@ -107,7 +132,7 @@ class BookingFilter(FilterDefaults):
 
 class InvoiceFilter(FilterDefaults):
     state = filters.MultipleChoiceFilter(choices=Invoice.States.choices, widget=forms.CheckboxSelectMultiple)
-    customer__name = filters.CharFilter(lookup_expr="icontains", label="Customer")
+    customer__name = SearchIndexFilter(SearchEntry.Kinds.CUSTOMER, field_name="customer", label="Customer")
 
     class Meta:
         model = Invoice
@@ -117,9 +142,9 @@ class InvoiceFilter(FilterDefaults):
 
 
 class VetFilter(FilterDefaults):
-    customers__name = filters.CharFilter(lookup_expr="icontains", label="Customer")
-    pets__name = filters.CharFilter(lookup_expr="icontains", label="Pet")
-    name = filters.CharFilter(lookup_expr="icontains", label="Name")
+    customers__name = SearchIndexFilter(SearchEntry.Kinds.CUSTOMER, field_name="customers", label="Customer")
+    pets__name = SearchIndexFilter(SearchEntry.Kinds.PET, field_name="pets", label="Pet")
+    name = SearchIndexFilter(SearchEntry.Kinds.VET, field_name="pk", label="Name")
 
     class Meta:
         model = Vet
@@ -4,7 +4,7 @@ from django import forms
 # Locals
 from .models import Booking, Charge, Customer, Invoice, Pet, Service, Vet
 from .utils import minimize_whitespace
-from .widgets import CheckboxDataOptionAttr, CheckboxTable, SelectDataAttrField, SingleMoneyWidget
+from .widgets import AutocompleteInput, CheckboxTable, CustomerPetsCheckbox, SelectDataAttrField, SingleMoneyWidget
 
 
 class CustomerForm(forms.ModelForm):
@@ -97,30 +97,12 @@ class BookingForm(forms.ModelForm):
             "end",
         ]
         widgets = {
-            "customer": forms.Select(
-                attrs={
-                    "x-model.number.fill": "customer",
-                    "@change": minimize_whitespace(
-                        """
-                        pets.length = 0;
-                        $nextTick(() => {
-                            $el.closest('form')
-                                .querySelectorAll(`input[data-customer__id="${customer}"]`)
-                                .forEach((el) => {
-                                    pets.push(el.value);
-                                });
-                        });
-"""
-                    ),
-                }
-            ),
-            "pets": CheckboxDataOptionAttr(
-                "customer.id",
+            "customer": AutocompleteInput("customer_autocomplete", attrs={"x-model.number.fill": "customer"}),
+            "pets": CustomerPetsCheckbox(
+                "booking_pets",
                 attrs={
                     ":disabled": "!customer",
                     "x-model.number.fill": "pets",
-                    "x-cloak": True,
-                    ":class": "customer != $el.dataset.customer__id ? 'hidden' : 'visible'",
                 },
             ),
             "service": SelectDataAttrField(
@@ -177,6 +159,18 @@ class BookingForm(forms.ModelForm):
             ),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Only the chosen customer's pets are offered, and accepted, the rest
+        # are fetched by the pets widget when the customer changes
+        customer = self["customer"].value()
+        pets = self.fields["pets"]
+        if customer is not None and str(customer).isdigit():
+            pets.queryset = pets.queryset.filter(customer_id=customer)
+        else:
+            pets.queryset = pets.queryset.none()
+
 
 class InvoiceForm(forms.ModelForm):
     class Meta:
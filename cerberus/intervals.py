@@ -0,0 +1,146 @@
+# Standard Library
+import random
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from itertools import count
+from math import inf
+from typing import Generic, NamedTuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Interval(NamedTuple, Generic[T]):
+    start: datetime
+    end: datetime
+    item: T
+
+
+class _Node(Generic[T]):
+    __slots__ = ("interval", "key", "priority", "left", "right", "max_end")
+
+    def __init__(self, interval: Interval[T], key: tuple[datetime, datetime, int]) -> None:
+        self.interval = interval
+        self.key = key
+        self.priority = random.random()
+        self.left: _Node[T] | None = None
+        self.right: _Node[T] | None = None
+        self.max_end = interval.end
+
+    def update(self) -> "_Node[T]":
+        self.max_end = self.interval.end
+        for child in (self.left, self.right):
+            if child is not None and child.max_end > self.max_end:
+                self.max_end = child.max_end
+        return self
+
+
+def _split(node: _Node[T] | None, key: tuple) -> tuple[_Node[T] | None, _Node[T] | None]:
+    """Split into the nodes before ``key`` and the nodes from ``key`` on."""
+    if node is None:
+        return None, None
+
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        return node.update(), right
+
+    left, node.left = _split(node.left, key)
+    return left, node.update()
+
+
+def _merge(left: _Node[T] | None, right: _Node[T] | None) -> _Node[T] | None:
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return left.update()
+
+    right.left = _merge(left, right.left)
+    return right.update()
+
+
+def _walk(node: _Node[T] | None) -> Iterator[_Node[T]]:
+    stack: list[_Node[T]] = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node
+        node = node.right
+
+
+class IntervalIndex(Generic[T]):
+    """An in-memory index of half open ``[start, end)`` intervals.
+
+    Intervals are kept in a treap ordered by start, where every node also
+    holds the latest end below it. Adding or removing an interval takes
+    O(log n) expected time, and an overlap query skips any subtree that ends
+    before the query starts or starts after it ends, so it takes O(log n + k)
+    for ``k`` hits.
+    """
+
+    def __init__(self, intervals: Iterable[Interval[T]] = ()) -> None:
+        self._root: _Node[T] | None = None
+        self._size = 0
+        self._seq = count()
+        for interval in sorted(intervals, key=lambda i: (i.start, i.end)):
+            self.add(*interval)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Interval[T]]:
+        return (node.interval for node in _walk(self._root))
+
+    def add(self, start: datetime, end: datetime, item: T) -> None:
+        node = _Node(Interval(start, end, item), (start, end, next(self._seq)))
+        left, right = _split(self._root, node.key)
+        self._root = _merge(_merge(left, node), right)
+        self._size += 1
+
+    def remove(self, start: datetime, end: datetime, item: T) -> None:
+        """Remove the first interval from ``start`` to ``end`` holding ``item``."""
+        left, rest = _split(self._root, (start, end, -1))
+        same, right = _split(rest, (start, end, inf))
+
+        nodes = list(_walk(same))
+        for index, node in enumerate(nodes):
+            if node.interval.item == item:
+                del nodes[index]
+                self._size -= 1
+                break
+
+        same = None
+        for node in nodes:
+            node.left = node.right = None
+            same = _merge(same, node.update())
+
+        self._root = _merge(_merge(left, same), right)
+
+    def overlapping(self, start: datetime, end: datetime) -> list[Interval[T]]:
+        hits: list[Interval[T]] = []
+
+        # Walk in order, pruning subtrees that end by ``start`` and stopping
+        # at the first node that starts at or after ``end``
+        node = self._root
+        stack: list[_Node[T]] = []
+        while stack or node is not None:
+            while node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            node = stack.pop()
+            if node.interval.start >= end:
+                break
+            if node.interval.end > start:
+                hits.append(node.interval)
+            node = node.right
+
+        return hits
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        return len(self.overlapping(start, end)) > 0
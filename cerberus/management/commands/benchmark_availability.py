@@ -0,0 +1,63 @@
+# Standard Library
+import statistics
+import time
+from datetime import timedelta
+
+# Django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+# Locals
+from ...availability import find_availability
+from ...models import BookingSlot, Service
+
+
+class Command(BaseCommand):
+    help = "Time finding availability over a range full of bookings, in a transaction that is rolled back"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bookings", type=int, default=50_000, help="Number of bookings to spread over the range")
+        parser.add_argument("--days", type=int, default=92, help="Length of the range in days")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of times to time the search")
+        parser.add_argument("--target", type=float, default=100, help="Target time in milliseconds")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            service = Service.objects.create(name="Benchmark", cost=settings.DEFAULT_CURRENCY.zero, max_pet=4, max_customer=2)
+            start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=3650)
+            end = start + timedelta(days=options["days"])
+
+            # Two customers to a slot, with every tenth slot left with room to join
+            slot_count = options["bookings"] // 2
+            step = (end - start) / slot_count
+            BookingSlot.objects.bulk_create(
+                (
+                    BookingSlot(
+                        start=start + step * i,
+                        end=start + step * i + step * 0.6,
+                        service=service,
+                        pet_count=2,
+                        customer_count=1 if i % 10 == 0 else 2,
+                    )
+                    for i in range(slot_count)
+                ),
+                batch_size=5000,
+            )
+
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                windows = find_availability(service, start, end)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            transaction.set_rollback(True)
+
+        best = min(timings)
+        self.stdout.write(
+            f"Found {len(windows)} windows among {options['bookings']} bookings over {options['days']} days: "
+            f"best {best:.1f}ms, median {statistics.median(timings):.1f}ms, target {options['target']:.0f}ms"
+        )
+        if best > options["target"]:
+            self.stdout.write(self.style.WARNING("Slower than the target"))
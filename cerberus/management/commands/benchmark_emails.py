@@ -0,0 +1,59 @@
+# Standard Library
+import statistics
+import time
+
+# Django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.template import loader
+
+# Third Party
+from mjml import mjml2html
+
+# Locals
+from ...emails import get_email_template
+from ...models import Charge, Customer, Invoice
+
+TEMPLATE = "emails/invoice.mjml"
+
+
+class Command(BaseCommand):
+    help = "Time rendering the invoice email body, compiling the MJML for each email and precompiled"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--emails", type=int, default=500, help="Number of emails to render each way")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            customer = Customer.objects.create(name="Benchmark Customer")
+            invoice = Invoice.objects.create(customer=customer, send_notes="A note\nover two lines")
+            Charge.objects.create(name="Walk", line=10, invoice=invoice, customer=customer)
+            invoice = Invoice.objects.get(pk=invoice.pk)
+            context = {"invoice": invoice, "customer": customer, "send_notes": invoice.send_notes}
+
+            def compile_each() -> str:
+                return mjml2html(loader.get_template(TEMPLATE).render(context))
+
+            def precompiled() -> str:
+                return get_email_template(TEMPLATE).render(context)
+
+            # Compiled once up front, as the first email sent would
+            precompiled()
+            before = self.time(compile_each, options["emails"])
+            after = self.time(precompiled, options["emails"])
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"Rendered {options['emails']} emails each way: "
+            f"compiling each {statistics.mean(before):.3f}ms, precompiled {statistics.mean(after):.3f}ms per email "
+            f"({statistics.mean(before) / statistics.mean(after):.1f}x faster)"
+        )
+
+    def time(self, render, count: int) -> list[float]:
+        timings = []
+        for _ in range(count):
+            started = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
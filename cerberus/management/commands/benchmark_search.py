@@ -0,0 +1,66 @@
+# Standard Library
+import statistics
+import time
+
+# Django
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+# Locals
+from ...models import SearchEntry
+
+# Names made up from syllables, for a vocabulary about as varied as real names
+SYLLABLES = ["al", "ba", "cor", "den", "el", "fi", "gar", "han", "is", "jo", "ka", "lin", "mor", "ne", "os", "pe"]
+QUERIES = ["alba", "corden", "jo ka", "07700 912347", "pelinmor"]
+
+class Command(BaseCommand):
+    help = "Time searching a full search index, in a transaction that is rolled back"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entries", type=int, default=100_000, help="Number of entries to fill the index with")
+        parser.add_argument("--repeat", type=int, default=5, help="Number of times to time each search")
+        parser.add_argument("--target", type=float, default=10, help="Target time in milliseconds")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            SearchEntry.objects.bulk_create(
+                (self.entry(i) for i in range(options["entries"])),
+                batch_size=5000,
+            )
+
+            timings = []
+            for query in QUERIES:
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    SearchEntry.search(query)
+                    timings.append((time.perf_counter() - started) * 1000)
+
+            transaction.set_rollback(True)
+
+        worst = max(timings)
+        self.stdout.write(
+            f"Searched {options['entries']} entries {len(timings)} times: "
+            f"median {statistics.median(timings):.1f}ms, worst {worst:.1f}ms, target {options['target']:.0f}ms"
+        )
+        if worst > options["target"]:
+            self.stdout.write(self.style.WARNING("Slower than the target"))
+
+    def name(self, i: int, length: int) -> str:
+        syllables = [SYLLABLES[i // len(SYLLABLES) ** n % len(SYLLABLES)] for n in range(length)]
+        return "".join(syllables).title()
+
+    def entry(self, i: int) -> SearchEntry:
+        # Far beyond any real id, so they can't clash with entries already indexed
+        object_id = 1_000_000_000 + i
+
+        match i % 3:
+            case 0:
+                name = f"{self.name(i, 2)} {self.name(i // 7, 3)}"
+                return SearchEntry(kind=SearchEntry.Kinds.CUSTOMER, object_id=object_id, title=name, text=name)
+            case 1:
+                name = self.name(i // 3, 2)
+                return SearchEntry(kind=SearchEntry.Kinds.PET, object_id=object_id, title=name, text=name)
+            case _:
+                phone = f"07700 {900_000 + i % 100_000}"
+                text = f"{self.name(i, 2)} mobile {phone} {phone.replace(' ', '')}"
+                return SearchEntry(kind=SearchEntry.Kinds.CONTACT, object_id=object_id, title=phone, text=text)
@@ -0,0 +1,29 @@
+# Standard Library
+from datetime import date
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Locals
+from ...billing import billing_run
+
+
+class Command(BaseCommand):
+    help = "Invoice every customer's uninvoiced charges"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", type=date.fromisoformat, help="First day of charges to invoice")
+        parser.add_argument(
+            "--to", dest="end", type=date.fromisoformat, default=date.today(), help="Last day of charges to invoice"
+        )
+        parser.add_argument("--send", action="store_true", help="Send the invoices once created")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be invoiced without saving")
+
+    def handle(self, *args, **options):
+        report = billing_run(options["end"], options["start"], send=options["send"], dry_run=options["dry_run"])
+
+        verb = "Would create" if options["dry_run"] else "Created"
+        self.stdout.write(
+            f"{verb} {report.invoices} invoices for {report.charges} charges, "
+            f"sent {report.sent}, in {report.elapsed:.2f}s"
+        )
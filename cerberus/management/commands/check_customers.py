@@ -0,0 +1,28 @@
+# Standard Library
+from collections import Counter
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Locals
+from ...models import Customer, CustomerIssue
+
+
+class Command(BaseCommand):
+    help = "Run the data quality rules over every customer and store the issues they find"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Number of customers to check per batch")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        ids = list(Customer.objects.order_by("pk").values_list("pk", flat=True))
+
+        for offset in range(0, len(ids), chunk_size):
+            CustomerIssue.update_for(*ids[offset : offset + chunk_size])
+
+        counts = Counter(CustomerIssue.objects.values_list("kind", flat=True))
+        self.stdout.write(f"Checked {len(ids)} customers, found {counts.total()} issues")
+        for kind in CustomerIssue.Kinds:
+            if counts[kind]:
+                self.stdout.write(f"  {kind.label}: {counts[kind]}")
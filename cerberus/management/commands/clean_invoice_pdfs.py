@@ -0,0 +1,38 @@
+# Django
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+# Locals
+from ...models import Invoice
+
+
+class Command(BaseCommand):
+    help = "Delete stored invoice PDFs that no invoice shows any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting")
+
+    def handle(self, *args, **options):
+        current = {invoice.pdf_digest() for invoice in Invoice.objects.select_related("customer").iterator()}
+
+        kept = deleted = 0
+        try:
+            folders, _ = default_storage.listdir("invoices")
+        except FileNotFoundError:
+            folders = []
+        for folder in folders:
+            _, files = default_storage.listdir(f"invoices/{folder}")
+            for file in files:
+                digest = file.removesuffix(".pdf")
+                if digest in current:
+                    kept += 1
+                    continue
+
+                if not options["dry_run"]:
+                    default_storage.delete(f"invoices/{folder}/{file}")
+                    cache.delete(f"invoice-pdf:{digest}")
+                deleted += 1
+
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(f"{verb} {deleted} PDFs, kept {kept}")
@@ -1,9 +1,5 @@
-# Standard Library
-from contextlib import suppress
-
 # Django
 from django.core.management.base import BaseCommand
-from django.db.models import ProtectedError
 
 # Locals
 from ...models import BookingSlot
@@ -12,10 +8,12 @@ from ...models import BookingSlot
 class Command(BaseCommand):
     help = "Clean empty booking slots"
 
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Number of slot ids to check per delete")
+
     def handle(self, *args, **options):
         self.stdout.write("Removing empty booking slots")
 
-        for slot in BookingSlot.objects.all():
-            with suppress(ProtectedError):
-                slot.delete()
-                self.stdout.write("Removed slot")
+        report = BookingSlot.collect_empty(chunk_size=options["chunk_size"])
+
+        self.stdout.write(f"Scanned {report.scanned} slots, removed {report.deleted} in {report.elapsed:.2f}s")
@@ -0,0 +1,22 @@
+# Django
+from django.core.management.base import BaseCommand
+
+# Locals
+from ...models import Booking
+
+
+class Command(BaseCommand):
+    help = "Complete confirmed bookings that have ended and create their charges"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Report what would be completed without saving")
+        parser.add_argument("--batch-size", type=int, default=500, help="Number of bookings to complete per transaction")
+
+    def handle(self, *args, **options):
+        report = Booking.complete_ended(dry_run=options["dry_run"], batch_size=options["batch_size"])
+
+        verb = "Would complete" if options["dry_run"] else "Completed"
+        self.stdout.write(
+            f"{verb} {report.bookings} bookings with {report.charges} charges "
+            f"in {report.elapsed:.2f}s ({report.rate:.0f} bookings/s)"
+        )
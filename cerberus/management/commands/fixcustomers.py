@@ -6,7 +6,7 @@ from django.core.management.base import BaseCommand
 
 # Locals
 from ...exceptions import InvalidEmailError
-from ...models import Contact, Customer
+from ...models import Contact, Customer, CustomerIssue
 
 
 class Command(BaseCommand):
@@ -15,7 +15,9 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         self.stdout.write("Fixing as many customers it can")
 
-        for customer in Customer.objects.all():
+        # Only customers missing an invoice email can be fixed
+        missing = Customer.objects.filter(customer_issues__kind=CustomerIssue.Kinds.NO_INVOICE_EMAIL)
+        for customer in missing.prefetch_related("contacts"):
             if customer.invoice_email == "":
                 counts = Counter([c.type for c in customer.contacts.all()])
                 if counts[Contact.Type.EMAIL] == 1:
@@ -0,0 +1,35 @@
+# Django
+from django.core.management.base import BaseCommand, CommandError
+
+# Locals
+from ...models import Customer, CustomerBalance, Invoice
+
+
+class Command(BaseCommand):
+    help = "Check or recalculate the stored subtotal, total and paid total on invoices, and the customer balances"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Report invoices with wrong totals without fixing them")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Number of invoices to update per query")
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            mismatched = list(Invoice.mismatched_totals().values_list("pk", flat=True))
+            if mismatched:
+                raise CommandError(f"{len(mismatched)} invoices have wrong totals: {', '.join(map(str, mismatched))}")
+
+            self.stdout.write("All invoice totals match")
+            return
+
+        chunk_size = options["chunk_size"]
+        ids = list(Invoice.objects.order_by("pk").values_list("pk", flat=True))
+
+        for offset in range(0, len(ids), chunk_size):
+            Invoice.update_totals(*ids[offset : offset + chunk_size])
+
+        # Balances add up the invoice totals, so they are rebuilt after them
+        customer_ids = list(Customer.objects.order_by("pk").values_list("pk", flat=True))
+        for offset in range(0, len(customer_ids), chunk_size):
+            CustomerBalance.update_for(*customer_ids[offset : offset + chunk_size])
+
+        self.stdout.write(f"Rebuilt totals for {len(ids)} invoices and balances for {len(customer_ids)} customers")
@@ -0,0 +1,21 @@
+# Django
+from django.core.management.base import BaseCommand
+
+# Locals
+from ...models import BookingSlot
+
+
+class Command(BaseCommand):
+    help = "Recalculate the stored pet and customer counts on booking slots"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Number of slots to update per query")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        ids = list(BookingSlot.objects.order_by("pk").values_list("pk", flat=True))
+
+        for offset in range(0, len(ids), chunk_size):
+            BookingSlot.update_counts(*ids[offset : offset + chunk_size])
+
+        self.stdout.write(f"Rebuilt counts for {len(ids)} slots")
@@ -0,0 +1,31 @@
+# Standard Library
+import time
+
+# Django
+from django.core.management.base import BaseCommand
+
+# Locals
+from ...models import OutboxMessage
+
+
+class Command(BaseCommand):
+    help = "Send the emails waiting in the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50, help="Number of emails to claim at a time")
+        parser.add_argument("--loop", action="store_true", help="Keep checking for new emails instead of exiting")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds to wait between checks with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            report = OutboxMessage.deliver(batch_size=options["batch_size"])
+
+            if report.sent or report.retrying or report.failed or not options["loop"]:
+                self.stdout.write(
+                    f"Sent {report.sent} emails, {report.retrying} to retry and {report.failed} failed "
+                    f"in {report.elapsed:.2f}s"
+                )
+
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.4 on 2026-10-17 06:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cerberus", "0073_rename_cost_additional_booking_cost_per_additional_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="bookingslot",
+            index=models.Index(fields=["end", "start"], name="slot_end_start_idx"),
+        ),
+    ]
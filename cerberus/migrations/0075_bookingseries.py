@@ -0,0 +1,45 @@
+# Generated by Django 5.0.4 on 2026-10-17 06:01
+
+import django.db.models.deletion
+import djmoney.models.fields
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cerberus", "0074_bookingslot_slot_end_start_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookingSeries",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("last_updated", models.DateTimeField(auto_now=True)),
+                ("cost_currency", djmoney.models.fields.CurrencyField(choices=[("GBP", "GBP £")], default="GBP", editable=False, max_length=3)),
+                ("cost", djmoney.models.fields.MoneyField(decimal_places=2, default=Decimal("0.0"), max_digits=14)),
+                ("cost_per_additional_currency", djmoney.models.fields.CurrencyField(choices=[("GBP", "GBP £")], default="GBP", editable=False, max_length=3, null=True)),
+                ("cost_per_additional", djmoney.models.fields.MoneyField(blank=True, decimal_places=2, default=Decimal("0.0"), max_digits=14, null=True)),
+                ("start_date", models.DateField()),
+                ("end_date", models.DateField()),
+                ("weekdays", models.JSONField(default=list)),
+                ("time", models.TimeField()),
+                ("length", models.DurationField(blank=True, default=None, null=True)),
+                ("customer", models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name="booking_series", to="cerberus.customer")),
+                ("pets", models.ManyToManyField(related_name="booking_series", to="cerberus.pet")),
+                ("service", models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name="booking_series", to="cerberus.service")),
+            ],
+            options={
+                "verbose_name_plural": "booking series",
+                "ordering": ("-created",),
+            },
+        ),
+        migrations.AddField(
+            model_name="booking",
+            name="series",
+            field=models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="bookings", to="cerberus.bookingseries"),
+        ),
+    ]
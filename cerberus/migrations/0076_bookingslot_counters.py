@@ -0,0 +1,51 @@
+# Generated by Django 5.0.4 on 2026-10-17 06:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counts(apps, schema_editor):
+    BookingSlot = apps.get_model("cerberus", "BookingSlot")
+    Booking = apps.get_model("cerberus", "Booking")
+
+    bookings = Booking.objects.filter(_booking_slot=OuterRef("pk")).order_by()
+    BookingSlot.objects.update(
+        pet_count=Coalesce(
+            Subquery(bookings.values("_booking_slot").annotate(count=Count("pets")).values("count")[:1]), 0
+        ),
+        customer_count=Coalesce(
+            Subquery(
+                bookings.values("_booking_slot").annotate(count=Count("customer", distinct=True)).values("count")[:1]
+            ),
+            0,
+        ),
+        service=Subquery(bookings.values("service")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cerberus", "0075_bookingseries"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookingslot",
+            name="customer_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="bookingslot",
+            name="pet_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="bookingslot",
+            name="service",
+            field=models.ForeignKey(blank=True, default=None, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="booking_slots", to="cerberus.service"),
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.4 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cerberus", "0076_bookingslot_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bookingslot",
+            name="version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.4 on 2026-10-17 07:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cerberus", "0077_bookingslot_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxMessage",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("to", models.JSONField(default=list)),
+                ("state", models.CharField(choices=[("pending", "Pending"), ("sending", "Sending"), ("sent", "Sent"), ("failed", "Failed")], default="pending", max_length=20)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("next_attempt", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("sent_on", models.DateTimeField(blank=True, default=None, null=True)),
+                ("invoice", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="emails", to="cerberus.invoice")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["state", "next_attempt"], name="outbox_due_idx")],
+            },
+        ),
+    ]
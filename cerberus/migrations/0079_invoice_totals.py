@@ -0,0 +1,65 @@
+# Generated by Django 5.0.4 on 2026-10-17 07:56
+
+import djmoney.models.fields
+from decimal import Decimal
+from django.db import migrations
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_totals(apps, schema_editor):
+    Invoice = apps.get_model("cerberus", "Invoice")
+    Charge = apps.get_model("cerberus", "Charge")
+    Payment = apps.get_model("cerberus", "Payment")
+
+    charges = Charge.objects.filter(invoice=OuterRef("pk")).order_by().values("invoice")
+    payments = Payment.objects.filter(invoice=OuterRef("pk")).order_by().values("invoice")
+    zero = Value(Decimal(0))
+
+    charged = Subquery(charges.annotate(sum=Sum(F("line") * F("quantity"))).values("sum"))
+    Invoice.objects.update(
+        subtotal=Coalesce(charged, zero),
+        total=Coalesce(F("adjustment") + charged, F("adjustment")),
+        paid_total=Coalesce(Subquery(payments.annotate(sum=Sum("amount")).values("sum")), zero),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cerberus", "0078_outbox_message"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="paid_total",
+            field=djmoney.models.fields.MoneyField(decimal_places=2, default=Decimal("0.0"), editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="paid_total_currency",
+            field=djmoney.models.fields.CurrencyField(choices=[("GBP", "GBP £")], default="GBP", editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="subtotal",
+            field=djmoney.models.fields.MoneyField(decimal_places=2, default=Decimal("0.0"), editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="subtotal_currency",
+            field=djmoney.models.fields.CurrencyField(choices=[("GBP", "GBP £")], default="GBP", editable=False, max_length=3),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="total",
+            field=djmoney.models.fields.MoneyField(decimal_places=2, default=Decimal("0.0"), editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name="invoice",
+            name="total_currency",
+            field=djmoney.models.fields.CurrencyField(choices=[("GBP", "GBP £")], default="GBP", editable=False, max_length=3),
+        ),
+        migrations.RunPython(populate_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.4 on 2026-10-17 08:16
+
+import django.db.models.deletion
+import djmoney.models.fields
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_balances(apps, schema_editor):
+    Customer = apps.get_model("cerberus", "Customer")
+    CustomerBalance = apps.get_model("cerberus", "CustomerBalance")
+
+    unpaid = Q(invoices__state="unpaid")
+    balances = (
+        Customer.objects.order_by()
+        .annotate(total=Sum("invoices__total", filter=unpaid, default=0), count=Count("invoices", filter=unpaid))
+        .values_list("pk", "total", "count")
+    )
+    CustomerBalance.objects.bulk_create(
+        (CustomerBalance(customer_id=pk, invoiced_unpaid=total, unpaid_count=count) for pk, total, count in balances),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cerberus", "0079_invoice_totals"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerBalance",
+            fields=[
+                ("customer", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="balance", serialize=False, to="cerberus.customer")),
+                ("invoiced_unpaid_currency", djmoney.models.fields.CurrencyField(choices=[("GBP", "GBP £")], default="GBP", editable=False, max_length=3)),
+                ("invoiced_unpaid", djmoney.models.fields.MoneyField(db_index=True, decimal_places=2, default=Decimal("0"), max_digits=14)),
+                ("unpaid_count", models.PositiveIntegerField(default=0)),
+                ("last_updated", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.0.4 on 2026-10-17 08:20
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_INDEX = [
+    # An external content table, so the text is only stored once
+    "CREATE VIRTUAL TABLE cerberus_searchentry_fts USING fts5("
+    "text, content='cerberus_searchentry', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    "CREATE TRIGGER cerberus_searchentry_fts_insert AFTER INSERT ON cerberus_searchentry BEGIN "
+    "INSERT INTO cerberus_searchentry_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER cerberus_searchentry_fts_delete AFTER DELETE ON cerberus_searchentry BEGIN "
+    "INSERT INTO cerberus_searchentry_fts(cerberus_searchentry_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER cerberus_searchentry_fts_update AFTER UPDATE ON cerberus_searchentry BEGIN "
+    "INSERT INTO cerberus_searchentry_fts(cerberus_searchentry_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO cerberus_searchentry_fts(rowid, text) VALUES (new.id, new.text); END",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS cerberus_searchentry_fts_insert",
+    "DROP TRIGGER IF EXISTS cerberus_searchentry_fts_delete",
+    "DROP TRIGGER IF EXISTS cerberus_searchentry_fts_update",
+    "DROP TABLE IF EXISTS cerberus_searchentry_fts",
+]
+POSTGRES_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # icontains compares UPPER(text), so that is what is indexed
+    "CREATE INDEX cerberus_searchentry_text_trgm ON cerberus_searchentry USING gin (UPPER(text) gin_trgm_ops)",
+]
+POSTGRES_DROP = ["DROP INDEX IF EXISTS cerberus_searchentry_text_trgm"]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        with schema_editor.connection.cursor() as cursor:
+            for statement in statements.get(schema_editor.connection.vendor, []):
+                cursor.execute(statement)
+
+    return operation
+
+
+def populate_entries(apps, schema_editor):
+    Customer = apps.get_model("cerberus", "Customer")
+    Pet = apps.get_model("cerberus", "Pet")
+    Contact = apps.get_model("cerberus", "Contact")
+    Vet = apps.get_model("cerberus", "Vet")
+    SearchEntry = apps.get_model("cerberus", "SearchEntry")
+
+    def entries():
+        for customer in Customer.objects.iterator():
+            name = f"{customer.first_name} {customer.last_name}"
+            text = " ".join([name, customer.other_names, customer.invoice_email])
+            yield SearchEntry(kind="customer", object_id=customer.pk, customer_id=customer.pk, title=name, text=text)
+        for pet in Pet.objects.iterator():
+            yield SearchEntry(kind="pet", object_id=pet.pk, customer_id=pet.customer_id, title=pet.name, text=pet.name)
+        for contact in Contact.objects.iterator():
+            text = " ".join([contact.name, contact.details, re.sub(r"\D", "", contact.details)])
+            title = f"{contact.name}: {contact.details}"[:255]
+            yield SearchEntry(
+                kind="contact", object_id=contact.pk, customer_id=contact.customer_id, title=title, text=text
+            )
+        for vet in Vet.objects.iterator():
+            text = " ".join([vet.name, vet.phone, re.sub(r"\D", "", vet.phone)])
+            yield SearchEntry(kind="vet", object_id=vet.pk, title=vet.name, text=text)
+
+    SearchEntry.objects.bulk_create(entries(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cerberus", "0080_customer_balance"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchEntry",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=[("customer", "Customer"), ("pet", "Pet"), ("contact", "Contact"), ("vet", "Vet")], max_length=20)),
+                ("object_id", models.PositiveIntegerField()),
+                ("title", models.CharField(max_length=255)),
+                ("text", models.TextField()),
+                ("customer", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name="+", to="cerberus.customer")),
+            ],
+            options={
+                "unique_together": {("kind", "object_id")},
+            },
+        ),
+        migrations.RunPython(
+            run({"sqlite": SQLITE_INDEX, "postgresql": POSTGRES_INDEX}),
+            run({"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP}),
+        ),
+        migrations.RunPython(populate_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.4 on 2026-10-17 08:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Exists, OuterRef, Q, Value
+
+
+def populate_issues(apps, schema_editor):
+    # The rules of CustomerIssue.RULES as they were when this was written
+    Contact = apps.get_model("cerberus", "Contact")
+    Customer = apps.get_model("cerberus", "Customer")
+    CustomerIssue = apps.get_model("cerberus", "CustomerIssue")
+
+    shared = (
+        Customer.objects.exclude(invoice_email="")
+        .order_by()
+        .values("invoice_email")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+        .values("invoice_email")
+    )
+    rules = [
+        ("no_invoice_email", True, Q(invoice_email=""), Value("")),
+        ("bad_last_name", True, Q(last_name__contains="&"), "last_name"),
+        ("no_contact", False, ~Exists(Contact.objects.filter(customer=OuterRef("pk"))), Value("")),
+        ("duplicate_email", False, Q(invoice_email__in=shared), "invoice_email"),
+    ]
+
+    CustomerIssue.objects.bulk_create(
+        (
+            CustomerIssue(customer_id=pk, kind=kind, blocking=blocking, details=details[:255])
+            for kind, blocking, condition, field in rules
+            for pk, details in Customer.objects.order_by().filter(condition).values_list("pk", field)
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cerberus", "0081_search_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerIssue",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=[("no_invoice_email", "no invoice email set"), ("bad_last_name", "last name doesn't look right"), ("no_contact", "no contact details"), ("duplicate_email", "invoice email shared with another customer")], max_length=20)),
+                ("blocking", models.BooleanField(default=False)),
+                ("details", models.CharField(blank=True, default="", max_length=255)),
+                ("found", models.DateTimeField(auto_now_add=True)),
+                ("customer", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="customer_issues", to="cerberus.customer")),
+            ],
+            options={
+                "ordering": ("-blocking", "kind"),
+                "indexes": [models.Index(fields=["blocking", "customer"], name="cerberus_cu_blockin_72d8fd_idx")],
+                "unique_together": {("customer", "kind")},
+            },
+        ),
+        migrations.RunPython(populate_issues, migrations.RunPython.noop),
+    ]
@@ -4,11 +4,14 @@ from datetime import datetime, timedelta
 # Locals
 from .address import Address
 from .booking import Booking, BookingCharge, BookingSlot
+from .booking_series import BookingSeries
 from .charge import Charge
 from .contact import Contact
-from .customer import Customer
+from .customer import Customer, CustomerBalance, CustomerIssue
 from .invoice import Invoice, InvoiceOpen, Payment
+from .outbox import DeliveryReport, OutboxMessage
 from .pet import Pet
+from .search import SearchEntry, SearchHit
 from .service import Service
 from .user_settings import UserSettings
 from .vet import Vet
@@ -23,13 +26,20 @@ __all__ = [
     "Booking",
     "BookingSlot",
     "BookingCharge",
+    "BookingSeries",
     "Charge",
     "Contact",
     "Customer",
+    "CustomerBalance",
+    "CustomerIssue",
     "Invoice",
     "InvoiceOpen",
+    "DeliveryReport",
+    "OutboxMessage",
     "Payment",
     "Pet",
+    "SearchEntry",
+    "SearchHit",
     "Service",
     "UserSettings",
     "Vet",
@@ -3,38 +3,56 @@ from collections.abc import Callable, Iterable, Iterator
 from datetime import date, datetime, timedelta
 from functools import reduce
 from operator import or_
-from typing import TYPE_CHECKING, Self
+from random import random
+from time import perf_counter, sleep
+from typing import TYPE_CHECKING, NamedTuple, Self
 
 # Django
+from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
-from django.db import models, transaction
-from django.db.models import CheckConstraint, F, Max, Min, Q
+from django.db import OperationalError, connection, models, transaction
+from django.db.models import CheckConstraint, Count, Exists, F, Max, Min, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.db.models.query import QuerySet
 from django.urls import reverse
-from django.utils.functional import lazy
 
 # Third Party
 import reversion
 from django_fsm import FSMField, Transition, transition
+from django_fsm_log.models import StateLog
 from djmoney.models.fields import MoneyField
 from humanize import naturaldate
 
 # Locals
 from ..decorators import save_after
-from ..exceptions import IncorectServiceError, MaxCustomersError, MaxPetsError, SlotOverlapsError
-from ..utils import make_aware
+from ..exceptions import IncorectServiceError, MaxCustomersError, MaxPetsError, SlotChangedError, SlotOverlapsError
+from ..intervals import Interval, IntervalIndex
+from ..utils import is_lock_conflict, make_aware
 from .charge import Charge
 from .service import Service
 
 if TYPE_CHECKING:
+    # Django
+    from django.contrib.auth.models import User
+
     # Locals
     from . import Customer, Pet, Service
 
 
+class CollectionReport(NamedTuple):
+    scanned: int
+    deleted: int
+    elapsed: float
+
+
 class BookingSlot(models.Model):
+    COUNTER_FIELDS = ("pet_count", "customer_count", "service", "version")
+
     id: int
     bookings: models.QuerySet["Booking"]
+    service_id: int | None
 
     created = models.DateTimeField(auto_now_add=True, editable=False)
     last_updated = models.DateTimeField(auto_now=True, editable=False)
@@ -46,22 +64,122 @@ class BookingSlot(models.Model):
         db_persist=True,
     )
 
+    # Maintained by update_counts, never written by save
+    pet_count = models.PositiveIntegerField(default=0, editable=False)
+    customer_count = models.PositiveIntegerField(default=0, editable=False)
+    service = models.ForeignKey(
+        "cerberus.Service",
+        on_delete=models.SET_NULL,
+        related_name="booking_slots",
+        null=True,
+        blank=True,
+        default=None,
+        editable=False,
+    )
+    # Bumped whenever the slot's bookings change, see reserve
+    version = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         unique_together = [("start", "end")]
+        indexes = [models.Index(fields=["end", "start"], name="slot_end_start_idx")]
         constraints = [CheckConstraint(check=Q(start__lt=F("end")), name="slot_start_before_end")]
 
     def __str__(self) -> str:
         return f"{self.id}: {self.start} - {self.end}"
 
+    def save(self, *args, **kwargs) -> None:
+        if self.pk is not None and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+            all_fields = {f.name for f in self._meta.concrete_fields if not f.primary_key and not f.generated}
+            kwargs["update_fields"] = all_fields.difference(self.COUNTER_FIELDS)
+
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def update_counts(cls, *slot_ids: int | None) -> None:
+        """Recalculate the stored pet, customer and service columns for the
+        given slots with a single UPDATE."""
+        ids = {slot_id for slot_id in slot_ids if slot_id is not None}
+        if not ids:
+            return
+
+        bookings = Booking.objects.filter(_booking_slot=OuterRef("pk")).order_by()
+        grouped = bookings.values("_booking_slot")
+
+        cls.objects.filter(pk__in=ids).update(
+            pet_count=Coalesce(Subquery(grouped.annotate(count=Count("pets")).values("count")), 0),
+            customer_count=Coalesce(
+                Subquery(grouped.annotate(count=Count("customer", distinct=True)).values("count")), 0
+            ),
+            service=Subquery(bookings.values("service")[:1]),
+            version=F("version") + 1,
+        )
+
+    def refresh_counts(self) -> None:
+        self.refresh_from_db(fields=self.COUNTER_FIELDS)
+
     @classmethod
     def get_slot(cls, start: datetime, end: datetime) -> Self:
-        try:
-            slot = cls.objects.get(start=start, end=end)
-        except cls.DoesNotExist:
-            slot = cls(start=start, end=end)
-            slot.save()
+        """Get or create the slot, locking it when called in a transaction.
+
+        ``get_or_create`` falls back to fetching the slot when a concurrent
+        request created it first, rather than failing on the unique
+        constraint. The row lock is held until the caller's transaction ends.
+        Called outside a transaction, the lock is released as soon as this
+        returns. ``reserve()``'s version check is then what stops a stale
+        slot from being overbooked.
+        """
+        with transaction.atomic():
+            slot, _ = cls.objects.get_or_create(start=start, end=end)
+            return cls.objects.select_for_update().get(pk=slot.pk)
 
-        return slot
+    @classmethod
+    def get_slots(cls, intervals: Iterable[tuple[datetime, datetime]]) -> dict[tuple[datetime, datetime], Self]:
+        """Get or create the slots for many intervals at once, locked for the
+        rest of the transaction.
+
+        Slots a concurrent request created first are skipped by the insert
+        and picked up by the locking select, so callers must check the counts
+        of what comes back rather than assume the slots are empty.
+        """
+        intervals = set(intervals)
+        if not intervals:
+            return {}
+
+        cls.objects.bulk_create([cls(start=start, end=end) for start, end in intervals], ignore_conflicts=True)
+        slots = cls.objects.select_for_update().filter(start__in={start for start, _ in intervals})
+
+        return {(slot.start, slot.end): slot for slot in slots if (slot.start, slot.end) in intervals}
+
+    @classmethod
+    def lock(cls, *slot_ids: int | None) -> None:
+        """Lock the slots until the end of the current transaction."""
+        ids = [slot_id for slot_id in slot_ids if slot_id is not None]
+        if ids:
+            list(cls.objects.select_for_update().filter(pk__in=ids).order_by("pk").values_list("pk", flat=True))
+
+    @classmethod
+    def check_pet_capacity(cls, *slot_ids: int | None) -> None:
+        full = (
+            cls.objects.filter(pk__in=[slot_id for slot_id in slot_ids if slot_id is not None])
+            .filter(pet_count__gt=F("service__max_pet"))
+            .values_list("service__max_pet", flat=True)
+            .first()
+        )
+        if full is not None:
+            raise MaxPetsError(f"Booking has max pets for service, {full}")
+
+    def reserve(self) -> None:
+        """Claim the slot for a change to its bookings.
+
+        The claim only succeeds if the slot is still at the version it was
+        read at, so a capacity check made against stale counters fails with
+        ``SlotChangedError`` instead of overbooking the slot.
+        """
+        claimed = type(self).objects.filter(pk=self.pk, version=self.version).update(version=F("version") + 1)
+        if not claimed:
+            raise SlotChangedError("Slot was changed by another booking")
+
+        self.version += 1
 
     @staticmethod
     def round_date_time(dt: datetime) -> datetime:
@@ -69,18 +187,21 @@ class BookingSlot(models.Model):
 
         return make_aware(dt)
 
-    def get_overlapping(self) -> QuerySet[Self]:
-        start = Q(start__lt=self.start, end__gt=self.start)
-        end = Q(start__lt=self.end, end__gt=self.end)
-        equal = Q(start=self.start, end=self.end)
-        contains = Q(start__gt=self.start, end__lt=self.end)
+    @classmethod
+    def occupied(cls) -> QuerySet[Self]:
+        return cls.objects.filter(customer_count__gt=0)
 
-        return self.__class__.objects.filter(start | end | equal | contains).exclude(pk=self.pk)
+    @classmethod
+    def occupied_between(cls, start: datetime, end: datetime) -> IntervalIndex[Self]:
+        slots = cls.occupied().filter(start__lt=end, end__gt=start)
 
-    def overlaps(self) -> bool:
-        others = self.get_overlapping()
+        return IntervalIndex(Interval(slot.start, slot.end, slot) for slot in slots)
 
-        return any(o.bookings.all().count() > 0 for o in others)
+    def get_overlapping(self) -> QuerySet[Self]:
+        return self.__class__.objects.filter(start__lt=self.end, end__gt=self.start).exclude(pk=self.pk)
+
+    def overlaps(self) -> bool:
+        return self.occupied().filter(start__lt=self.end, end__gt=self.start).exclude(pk=self.pk).exists()
 
     def clean(self) -> None:
         if self.overlaps():
@@ -89,10 +210,10 @@ class BookingSlot(models.Model):
         if len({booking.service.id for booking in self.bookings.all()}) > 1:
             raise ValidationError(f"{self.__class__.__name__} has multiple services")
 
-        if (max_pet := getattr(self.service, "max_pet")) and self.pet_count > max_pet:
+        if (max_pet := getattr(self.service, "max_pet", None)) and self.pet_count > max_pet:
             raise ValidationError(f"{self.__class__.__name__} has max pets for service, {max_pet}")
 
-        if (max_customer := getattr(self.service, "max_customer")) and self.customer_count > max_customer:
+        if (max_customer := getattr(self.service, "max_customer", None)) and self.customer_count > max_customer:
             raise ValidationError(f"{self.__class__.__name__} has max customers for service, {max_customer}")
 
         super().clean()
@@ -113,12 +234,12 @@ class BookingSlot(models.Model):
         self.end = start + (self.end - self.start) if end is None else end
         self.start = start
 
-        overlaps = self.get_overlapping()
-        if overlaps.count():
-            if overlaps.count() > 1:
+        overlaps = list(self.get_overlapping()[:2])
+        if overlaps:
+            if len(overlaps) > 1:
                 raise SlotOverlapsError("Slot overlaps multiple slots")
 
-            if (overlapping := overlaps.first()) and self.matches(overlapping):
+            if (overlapping := overlaps[0]) and self.matches(overlapping):
                 overlapping += self
                 return True
 
@@ -144,37 +265,48 @@ class BookingSlot(models.Model):
         return self.length_seconds() // 60
 
     def matches(self, other: Self) -> bool:
-        return self.start == other.start and self.end == other.end and self.service == other.service
+        return self.start == other.start and self.end == other.end and self.service_id == other.service_id
 
     @classmethod
-    def clean_empty_slots(cls) -> None:
-        cls.objects.filter(bookings__isnull=True).delete()
+    def clean_empty_slots(cls) -> CollectionReport:
+        return cls.collect_empty()
 
-    @property
-    def service(self) -> "Service | None":
-        try:
-            return self.bookings.all()[0].service
-        except IndexError:
-            return None
+    @classmethod
+    def collect_empty(cls, *slot_ids: int | None, chunk_size: int = 5000) -> CollectionReport:
+        """Delete slots without bookings, either the given slots or the whole
+        table in chunks of ``chunk_size`` ids.
+
+        The given slots, usually the one a booking has just left, go through
+        the normal delete. For the whole table each chunk is one ``DELETE ...
+        WHERE NOT EXISTS`` statement. Slots protect their bookings rather than
+        cascading and the ``NOT EXISTS`` means there are none to protect, so
+        the chunks skip the delete collector's selects with ``_raw_delete``.
+        """
+        started = perf_counter()
+        empty = cls.objects.filter(~Exists(Booking.objects.filter(_booking_slot=OuterRef("pk"))))
+
+        if slot_ids:
+            ids = {slot_id for slot_id in slot_ids if slot_id is not None}
+            deleted = empty.filter(pk__in=ids).delete()[1].get(cls._meta.label, 0) if ids else 0
+            return CollectionReport(len(ids), deleted, perf_counter() - started)
+
+        bounds = cls.objects.aggregate(first=Min("pk"), last=Max("pk"), count=Count("pk"))
+        deleted = 0
+        if bounds["count"]:
+            for first in range(bounds["first"], bounds["last"] + 1, chunk_size):
+                deleted += empty.filter(pk__gte=first, pk__lt=first + chunk_size)._raw_delete(empty.db)
+
+        return CollectionReport(bounds["count"], deleted, perf_counter() - started)
 
     @property
     def pets(self) -> Iterator["Pet"]:
         for booking in self.bookings.all():
             yield from booking.pets.all()
 
-    @property
-    @lazy
-    def pet_count(self) -> int:
-        return sum(booking.pets.count() for booking in self.bookings.all())
-
     @property
     def customers(self) -> set["Customer"]:
         return {b.customer for b in self.bookings.all()}
 
-    @property
-    def customer_count(self) -> int:
-        return len(self.customers)
-
     def __add__(self, other: "Self|Booking") -> Self:
         if isinstance(other, Booking):
             with transaction.atomic():
@@ -209,6 +341,16 @@ class BookingStates(models.TextChoices):
         return reduce(or_, [Q(**{field: e.value}) for e in cls])
 
 
+class CompletionReport(NamedTuple):
+    bookings: int
+    charges: int
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        return self.bookings / self.elapsed if self.elapsed else 0.0
+
+
 class ActiveBookingManager(models.Manager):
     def get_queryset(self):
         return super().get_queryset().exclude(state=BookingStates.CANCELED.value)
@@ -227,6 +369,9 @@ class Booking(models.Model):
         BookingStates.CONFIRMED.value,
     ]
 
+    SLOT_RETRIES = 5
+    SLOT_RETRY_DELAY = 0.05
+
     id: int
     get_all_state_transitions: Callable[[], Iterable[Transition]]
     get_available_state_transitions: Callable[[], Iterable[Transition]]
@@ -255,6 +400,15 @@ class Booking(models.Model):
     )
     _booking_slot_id: int | None
     _previous_slot: BookingSlot | None = None
+    _loaded_slot_id: int | None = None
+    series = models.ForeignKey(
+        "cerberus.BookingSeries",
+        on_delete=models.SET_NULL,
+        related_name="bookings",
+        null=True,
+        blank=True,
+        default=None,
+    )
 
     charges = GenericRelation(Charge)
 
@@ -278,6 +432,42 @@ class Booking(models.Model):
         return f"{self.name} - {naturaldate(self.start)}"
 
     def save(self, *args, **kwargs) -> None:
+        """Save the booking, retrying from the start when a concurrent booking
+        changed the slot or the database reports a lock conflict.
+
+        Inside a caller's transaction the conflict is raised straight away,
+        as retrying would keep the caller's locks while it slept and the
+        caller's transaction would have to be retried anyway.
+        """
+        if connection.in_atomic_block:
+            return self._save(*args, **kwargs)
+
+        slot_field = self._meta.get_field("_booking_slot")
+        pk, adding, loaded_slot_id = self.pk, self._state.adding, self._loaded_slot_id
+        slot_id, slot = self._booking_slot_id, slot_field.get_cached_value(self, default=None)
+        slot_pk = getattr(slot, "pk", None)
+
+        for attempt in range(self.SLOT_RETRIES + 1):
+            try:
+                return self._save(*args, **kwargs)
+            except SlotChangedError:
+                if attempt == self.SLOT_RETRIES:
+                    raise
+            except OperationalError as e:
+                if attempt == self.SLOT_RETRIES or not is_lock_conflict(e):
+                    raise
+
+            self.pk, self._state.adding, self._loaded_slot_id = pk, adding, loaded_slot_id
+            self._booking_slot_id = slot_id
+            if slot is not None:
+                slot.pk, slot._state.adding = slot_pk, slot_pk is None
+                if slot_pk is not None:
+                    slot.refresh_counts()
+                self._booking_slot = slot
+
+            sleep(self.SLOT_RETRY_DELAY * 2**attempt * random())
+
+    def _save(self, *args, **kwargs) -> None:
         with transaction.atomic():
             if self.pk is None and getattr(self, "_booking_slot", None) is None:
                 self._booking_slot = self._get_new_booking_slot()
@@ -285,20 +475,52 @@ class Booking(models.Model):
             if self._booking_slot is not None:
                 self._booking_slot.save()
 
+            slot_changed = self._booking_slot is not None and self._booking_slot_id != self._loaded_slot_id
+            if slot_changed:
+                self._booking_slot.reserve()
+
             super().save(*args, **kwargs)
             self.refresh_from_db(fields=["pets"])
             self.check_valid()
+            previous_slot_ids = {self._loaded_slot_id, getattr(self._previous_slot, "pk", None)}
+            previous_slot_ids.discard(self._booking_slot_id)
+            self.update_slot_counts(*previous_slot_ids)
 
-            if self._previous_slot is not None and self._previous_slot.pk and self._previous_slot.bookings.count() == 0:
-                self._previous_slot.delete()
+            if slot_changed:
+                self.check_capacity()
+
+            self._loaded_slot_id = self._booking_slot_id
+
+            if settings.COLLECT_EMPTY_SLOTS:
+                BookingSlot.collect_empty(*previous_slot_ids)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_slot_id = instance.__dict__.get("_booking_slot_id")
+        return instance
 
     def get_absolute_url(self):
         return reverse("booking_detail", kwargs={"pk": self.pk})
 
+    def update_slot_counts(self, *slot_ids: int | None) -> None:
+        BookingSlot.update_counts(self._booking_slot_id, *slot_ids)
+
+        if self._booking_slot_id is not None and self._meta.get_field("_booking_slot").is_cached(self):
+            self.booking_slot.refresh_counts()
+
     def check_valid(self) -> None:
         if any(pet.customer != self.customer for pet in self.pets.all()):
             raise ValidationError("Booking has pets from a different customer")
 
+    def check_capacity(self) -> None:
+        slot = self.booking_slot
+        if slot.pet_count > self.service.max_pet:
+            raise MaxPetsError(f"Booking has max pets for service, {self.service.max_pet}")
+
+        if slot.customer_count > self.service.max_customer:
+            raise MaxCustomersError(f"Booking has max customers for service, {self.service.max_customer}")
+
     def natural_date(self):
         return naturaldate(self.start)
 
@@ -308,7 +530,7 @@ class Booking(models.Model):
         next_date = date + timedelta(days=1)
 
         result = (
-            cls.objects.filter(start__gt=date, end__lt=next_date).values("start").aggregate(Min("start"), Max("end"))
+            cls.objects.filter(start__gte=date, start__lt=next_date).values("start").aggregate(Min("start"), Max("end"))
         )
 
         return result["start__min"], result["end__max"]
@@ -333,52 +555,51 @@ class Booking(models.Model):
 
         self._booking_slot = value
 
-    def create_charges(self) -> list[Charge]:
-        cost = self.cost
+    def build_charges(self) -> list["BookingCharge"]:
+        """The unsaved charges for this booking, one per pet when there is a
+        cost per additional pet."""
+        pets = list(self.pets.all())
+
         if self.cost_per_additional is None:
-            pet_names = ", ".join(str(p) for p in self.pets.all())
+            pet_names = ", ".join(str(p) for p in pets)
             name = f"{self.service} for {pet_names}"[:255]
-            charge = BookingCharge(name=name, line=cost, booking=self, customer=self.customer)
-            charge.save()
-            return [charge]
+            return [BookingCharge(name=name, line=self.cost, booking=self, customer=self.customer)]
 
-        charges = []
+        if not pets:
+            name = f"{self.service}"[:255]
+            return [BookingCharge(name=name, line=self.cost, booking=self, customer=self.customer)]
 
-        if self.pets.count():
-            for pet in self.pets.all():
-                name = f"{self.service} for {pet}"[:255]
-                charge = BookingCharge(name=name, line=cost, booking=self, customer=self.customer)
-                charge.save()
-                charges.append(charge)
+        costs = [self.cost] + [self.cost_per_additional] * (len(pets) - 1)
+        return [
+            BookingCharge(name=f"{self.service} for {pet}"[:255], line=cost, booking=self, customer=self.customer)
+            for pet, cost in zip(pets, costs)
+        ]
 
-                cost = self.cost_per_additional
-                if self.cost_per_additional is None:
-                    break
-        else:
-            name = f"{self.service}"[:255]
-            charge = BookingCharge(name=name, line=cost, booking=self, customer=self.customer)
+    def create_charges(self) -> list[Charge]:
+        charges = self.build_charges()
+        for charge in charges:
             charge.save()
-            charges.append(charge)
 
-        return charges
+        return list(charges)
 
     def _get_new_booking_slot(self) -> BookingSlot:
         slot = BookingSlot.get_slot(self.start, self.end)
 
-        if slot.service != self.service and slot.service is not None:
+        if slot.service_id not in (None, self.service_id):
             raise IncorectServiceError("Booking is for a different service")
 
         if slot.pet_count >= self.service.max_pet:
             raise MaxPetsError(f"Booking has max pets for service, {self.service.max_pet}")
 
-        if slot.customer_count >= self.service.max_customer and self.customer not in slot.customers:
+        if (
+            slot.customer_count >= self.service.max_customer
+            and not slot.bookings.filter(customer_id=self.customer_id).exists()
+        ):
             raise MaxCustomersError(f"Booking has max customers for service, {self.service.max_customer}")
 
-        if slot.overlaps():
-            overlaps = slot.get_overlapping()
-
-            if not all(all(b.id == self.id for b in o.bookings.all()) for o in overlaps):
-                raise SlotOverlapsError("Booking overlaps another")
+        others = Booking.objects.filter(_booking_slot__in=slot.get_overlapping()).exclude(pk=self.pk)
+        if others.exists():
+            raise SlotOverlapsError("Booking overlaps another")
 
         return slot
 
@@ -400,8 +621,9 @@ class Booking(models.Model):
         self.start -= delta
         self.end -= delta
 
-        self.booking_slot = self._get_new_booking_slot()
-        self.save()
+        with transaction.atomic():
+            self.booking_slot = self._get_new_booking_slot()
+            self.save()
 
         return True
 
@@ -460,6 +682,101 @@ class Booking(models.Model):
     def available_state_transitions(self) -> list[str]:
         return [i.name for i in self.get_available_state_transitions()]
 
+    @classmethod
+    def complete_ended(
+        cls, by: "User | None" = None, dry_run: bool = False, batch_size: int = 500
+    ) -> CompletionReport:
+        """Complete every confirmed booking that has ended.
+
+        Each batch is completed in one transaction: the charges are built in
+        memory and bulk inserted, the states are set with one UPDATE and the
+        state logs bulk created. Unlike ``complete()`` no reversion revision is
+        written per booking.
+        """
+        started = perf_counter()
+        now = make_aware(datetime.now())
+        confirmed = BookingStates.CONFIRMED.value
+        completed = BookingStates.COMPLETED.value
+
+        ids = list(cls.objects.filter(state=confirmed, end__lt=now).order_by("pk").values_list("pk", flat=True))
+        content_type = ContentType.objects.get_for_model(cls)
+        booking_count = charge_count = 0
+
+        for offset in range(0, len(ids), batch_size):
+            with transaction.atomic():
+                bookings = list(
+                    cls.objects.select_for_update(of=("self",))
+                    .filter(pk__in=ids[offset : offset + batch_size], state=confirmed)
+                    .select_related("service", "customer")
+                    .prefetch_related("pets")
+                )
+                charges = [charge for booking in bookings for charge in booking.build_charges()]
+                booking_count += len(bookings)
+                charge_count += len(charges)
+
+                if dry_run:
+                    continue
+
+                BookingCharge.bulk_insert(charges)
+                cls.objects.filter(pk__in=[booking.pk for booking in bookings]).update(state=completed, last_updated=now)
+                StateLog.objects.bulk_create(
+                    StateLog(
+                        timestamp=now,
+                        by=by,
+                        source_state=confirmed,
+                        state=completed,
+                        transition="complete",
+                        content_type=content_type,
+                        object_id=booking.pk,
+                    )
+                    for booking in bookings
+                )
+
+        return CompletionReport(booking_count, charge_count, perf_counter() - started)
+
 
 class BookingCharge(Charge):
+    booking_id: int
+
     booking = models.ForeignKey(Booking, on_delete=models.PROTECT)
+
+    @classmethod
+    def bulk_insert(cls, charges: list[Self]) -> list[Self]:
+        """Insert unsaved charges with two bulk inserts.
+
+        ``bulk_create`` does not support multi-table models, so the parent
+        charge rows are bulk created first and the booking charge rows are then
+        inserted against their ids.
+        """
+        if not charges:
+            return charges
+
+        content_type = ContentType.objects.get_for_model(cls, for_concrete_model=False)
+        parents = Charge.objects.bulk_create(
+            Charge(
+                polymorphic_ctype=content_type,
+                name=charge.name,
+                line=charge.line,
+                quantity=charge.quantity,
+                customer=charge.customer,
+                invoice=charge.invoice,
+            )
+            for charge in charges
+        )
+
+        for charge, parent in zip(charges, parents):
+            charge.pk = parent.pk
+            charge.created = parent.created
+            charge.last_updated = parent.last_updated
+            charge._state.adding = False
+
+        table = connection.ops.quote_name(cls._meta.db_table)
+        ptr = connection.ops.quote_name(cls._meta.pk.column)
+        booking = connection.ops.quote_name(cls._meta.get_field("booking").column)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {table} ({ptr}, {booking}) VALUES (%s, %s)",
+                [(charge.pk, charge.booking_id) for charge in charges],
+            )
+
+        return charges
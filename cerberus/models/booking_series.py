@@ -0,0 +1,191 @@
+# Standard Library
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, NamedTuple
+
+# Django
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef, QuerySet
+
+# Third Party
+import reversion
+from djmoney.models.fields import MoneyField
+
+# Locals
+from ..exceptions import SlotChangedError
+from ..intervals import Interval, IntervalIndex
+from ..utils import make_aware
+from .booking import Booking, BookingSlot
+
+if TYPE_CHECKING:
+    # Locals
+    from . import Pet
+
+
+class Occurrence(NamedTuple):
+    start: datetime
+    end: datetime
+
+
+class Conflict(NamedTuple):
+    start: datetime
+    end: datetime
+    reason: str
+
+
+class SeriesBookings(NamedTuple):
+    bookings: list[Booking]
+    conflicts: list[Conflict]
+
+
+@reversion.register()
+class BookingSeries(models.Model):
+    class Weekday(models.IntegerChoices):
+        MONDAY = 0
+        TUESDAY = 1
+        WEDNESDAY = 2
+        THURSDAY = 3
+        FRIDAY = 4
+        SATURDAY = 5
+        SUNDAY = 6
+
+    id: int
+    pets: "QuerySet[Pet]"
+
+    # Fields
+    created = models.DateTimeField(auto_now_add=True, editable=False)
+    last_updated = models.DateTimeField(auto_now=True, editable=False)
+    cost = MoneyField(max_digits=14, default=0.0)
+    cost_per_additional = MoneyField(max_digits=14, default=0.0, blank=True, null=True)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    weekdays = models.JSONField(default=list)
+    time = models.TimeField()
+    length = models.DurationField(blank=True, null=True, default=None)
+
+    # Relationship Fields
+    customer = models.ForeignKey("cerberus.Customer", on_delete=models.PROTECT, related_name="booking_series")
+    pets = models.ManyToManyField("cerberus.Pet", related_name="booking_series")
+    service = models.ForeignKey("cerberus.Service", on_delete=models.PROTECT, related_name="booking_series")
+
+    class Meta:
+        ordering = ("-created",)
+        verbose_name_plural = "booking series"
+
+    def __str__(self) -> str:
+        days = ", ".join(self.Weekday(day).label for day in sorted(self.weekdays))
+        return f"{self.service} every {days} at {self.time:%H:%M}"
+
+    def clean(self) -> None:
+        if self.end_date < self.start_date:
+            raise ValidationError("Series ends before it starts")
+
+        if any(day not in self.Weekday.values for day in self.weekdays):
+            raise ValidationError(f"Weekdays must be between {min(self.Weekday)} and {max(self.Weekday)}")
+
+        super().clean()
+
+    def occurrences(self) -> Iterator[Occurrence]:
+        length = self.length or self.service.length
+        days = (self.end_date - self.start_date).days + 1
+
+        for offset in range(days):
+            date = self.start_date + timedelta(days=offset)
+            if date.weekday() in self.weekdays:
+                start = make_aware(datetime.combine(date, self.time))
+                yield Occurrence(start, start + length)
+
+    def _get_slots(self, start: datetime, end: datetime) -> QuerySet[BookingSlot]:
+        return BookingSlot.objects.select_for_update().filter(start__lt=end, end__gt=start).annotate(
+            has_customer=Exists(Booking.objects.filter(_booking_slot=OuterRef("pk"), customer=self.customer)),
+        )
+
+    def _check_occurrence(
+        self,
+        occurrence: Occurrence,
+        slot: BookingSlot | None,
+        occupied: IntervalIndex[BookingSlot | None],
+        pet_count: int,
+    ) -> str | None:
+        if slot is not None and slot.customer_count:
+            if slot.service_id != self.service_id:
+                return "Booking is for a different service"
+
+            if slot.has_customer:
+                return "Customer is already booked in this slot"
+
+            if slot.pet_count + pet_count > self.service.max_pet:
+                return f"Booking has max pets for service, {self.service.max_pet}"
+
+            if slot.customer_count >= self.service.max_customer:
+                return f"Booking has max customers for service, {self.service.max_customer}"
+
+        overlapping = occupied.overlapping(occurrence.start, occurrence.end)
+        if any(hit.item is None or hit.item != slot for hit in overlapping):
+            return "Booking overlaps another"
+
+        return None
+
+    def book(self) -> SeriesBookings:
+        """Create a booking for every free occurrence of the series.
+
+        Capacity and overlap are checked for the whole series against one
+        load of the slot table, then the slots, bookings and pets are bulk
+        created. Occurrences that cannot be booked are returned as conflicts
+        rather than stopping the rest of the series.
+        """
+        occurrences = list(self.occurrences())
+        pets = list(self.pets.all())
+        conflicts: list[Conflict] = []
+
+        if not occurrences:
+            return SeriesBookings([], conflicts)
+
+        if any(pet.customer_id != self.customer_id for pet in pets):
+            raise ValidationError("Booking has pets from a different customer")
+
+        with transaction.atomic():
+            slots = list(self._get_slots(occurrences[0].start, occurrences[-1].end))
+            by_interval = {(slot.start, slot.end): slot for slot in slots}
+            occupied: IntervalIndex[BookingSlot | None] = IntervalIndex(
+                Interval(slot.start, slot.end, slot) for slot in slots if slot.customer_count
+            )
+
+            booked: list[tuple[Occurrence, BookingSlot | None]] = []
+            for occurrence in occurrences:
+                slot = by_interval.get(occurrence)
+                if reason := self._check_occurrence(occurrence, slot, occupied, len(pets)):
+                    conflicts.append(Conflict(*occurrence, reason))
+                    continue
+
+                booked.append((occurrence, slot))
+                occupied.add(occurrence.start, occurrence.end, slot)
+
+            new_slots = BookingSlot.get_slots(occurrence for occurrence, slot in booked if slot is None)
+            if any(slot.customer_count for slot in new_slots.values()):
+                raise SlotChangedError("Slot was booked by another request")
+            by_interval.update(new_slots)
+
+            bookings = Booking.objects.bulk_create(
+                [
+                    Booking(
+                        customer_id=self.customer_id,
+                        service_id=self.service_id,
+                        series=self,
+                        cost=self.cost,
+                        cost_per_additional=self.cost_per_additional,
+                        start=occurrence.start,
+                        end=occurrence.end,
+                        _booking_slot=by_interval[occurrence],
+                    )
+                    for occurrence, _ in booked
+                ]
+            )
+
+            Booking.pets.through.objects.bulk_create(
+                [Booking.pets.through(booking_id=booking.pk, pet_id=pet.pk) for booking in bookings for pet in pets]
+            )
+            BookingSlot.update_counts(*(booking._booking_slot_id for booking in bookings))
+
+        return SeriesBookings(bookings, conflicts)
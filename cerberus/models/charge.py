@@ -76,6 +76,13 @@ class Charge(PolymorphicModel):
     def __str__(self) -> str:
         return f"{self.name} - {self.amount}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        charge = super().from_db(db, field_names, values)
+        # Kept so moving a charge off an invoice updates that invoice's totals too
+        charge._loaded_invoice_id = charge.__dict__.get("invoice_id")
+        return charge
+
     def __float__(self) -> float:
         return float(self.cost)
 
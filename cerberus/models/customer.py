@@ -1,17 +1,19 @@
 # Standard Library
-from datetime import datetime
-from typing import TYPE_CHECKING
+from collections.abc import Callable
+from datetime import date, datetime
+from typing import TYPE_CHECKING, NamedTuple
 
 # Django
 from django.conf import settings
-from django.db import models
-from django.db.models import Count, F, Q, Sum
-from django.db.models.functions import Concat
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat
 from django.db.models.query import QuerySet
 from django.urls import reverse
 
 # Third Party
 import reversion
+from djmoney.models.fields import MoneyField
 from djmoney.models.managers import money_manager
 from moneyed import Money
 from taggit.managers import TaggableManager
@@ -21,40 +23,40 @@ if TYPE_CHECKING:
 
 # Locals
 from .booking import Booking, BookingStates
+from .contact import Contact
 from .invoice import Invoice
+from .search import SearchEntry
 
 
-class CustomerManager(models.Manager["Customer"]):
-    def get_queryset(self):
-        return (
-            super()
-            .get_queryset()
-            .annotate(
-                invoiced_unpaid=Sum(F("invoices__adjustment"), default=0)
-                + Sum(
-                    (F("invoices__charges__line") * F("invoices__charges__quantity")),
-                    filter=Q(invoices__state=Invoice.States.UNPAID.value),
-                    default=0,
-                ),
-            )
-            .annotate(
-                unpaid_count=Count(
-                    "invoices",
-                    distinct=True,
-                    filter=Q(invoices__state=Invoice.States.UNPAID.value),
-                )
-            )
-            .annotate(
-                overdue_count=Count(
-                    "invoices",
-                    distinct=True,
-                    filter=Q(
-                        invoices__state=Invoice.States.UNPAID.value,
-                        invoices__due__lt=datetime.today(),
-                    ),
-                )
-            )
-            .order_by(*Customer._meta.ordering or list())
+class CustomerQuerySet(models.QuerySet["Customer"]):
+    def matching(self, query: str) -> "CustomerQuerySet":
+        """The customers found by ``query`` in the search index."""
+        entries = SearchEntry.objects.matching(query).filter(kind=SearchEntry.Kinds.CUSTOMER)
+        return self.filter(pk__in=entries.values("object_id"))
+
+    def needing_attention(self, blocking: bool | None = None) -> "CustomerQuerySet":
+        """The customers with any issues, or only those with (or without)
+        issues that stop them being sent invoices."""
+        issues = CustomerIssue.objects.filter(customer=OuterRef("pk"))
+        if blocking is not None:
+            issues = issues.filter(blocking=blocking)
+        return self.filter(Exists(issues))
+
+    def with_financials(self) -> "CustomerQuerySet":
+        """Add each customer's unpaid invoice total and count, read from their
+        CustomerBalance, and how many of those invoices are overdue."""
+        overdue = (
+            Invoice._base_manager.filter(customer=OuterRef("pk"), state=Invoice.States.UNPAID.value, due__lt=date.today())
+            .order_by()
+            .values("customer")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+
+        return self.annotate(
+            invoiced_unpaid=F("balance__invoiced_unpaid"),
+            unpaid_count=Coalesce(F("balance__unpaid_count"), 0),
+            overdue_count=Coalesce(Subquery(overdue), 0),
         )
 
 
@@ -63,6 +65,7 @@ class Customer(models.Model):
     id: int
     pets: "QuerySet[Pet]"
     contacts: "QuerySet[Contact]"
+    customer_issues: "QuerySet[CustomerIssue]"
     charges: "QuerySet[Charge]"
     invoices: "QuerySet[Invoice]"
     unpaid_count: int
@@ -96,7 +99,7 @@ class Customer(models.Model):
 
     tags = TaggableManager(blank=True)
 
-    objects = money_manager(CustomerManager())
+    objects = money_manager(CustomerQuerySet.as_manager())
 
     _invoiced_unpaid = None
 
@@ -119,7 +122,7 @@ class Customer(models.Model):
 
     @invoiced_unpaid.setter
     def invoiced_unpaid(self, value):
-        self._invoiced_unpaid = Money(value, settings.DEFAULT_CURRENCY)
+        self._invoiced_unpaid = Money(value or 0, settings.DEFAULT_CURRENCY)
 
     def outstanding_invoices(self):
         return self.invoices.filter(state=Invoice.States.UNPAID.value).order_by("-due")
@@ -128,16 +131,8 @@ class Customer(models.Model):
         return self.charges.filter(invoice=None).count()
 
     @property
-    def issues(self):
-        issues = []
-
-        if self.invoice_email == "":
-            issues.append("no invoice email set")
-
-        if "&" in self.last_name:
-            issues.append("last name doesn't look right")
-
-        return issues
+    def issues(self) -> list[str]:
+        return [issue.get_kind_display() for issue in self.customer_issues.all()]
 
     @property
     def bookings(self) -> QuerySet["Booking"]:
@@ -148,3 +143,157 @@ class Customer(models.Model):
         return self.bookings.filter(start__gte=datetime.today()).exclude(
             state__in=[BookingStates.CANCELED.value, BookingStates.COMPLETED.value]
         )
+
+
+class CustomerBalance(models.Model):
+    """A customer's unpaid invoice total and count.
+
+    Kept up to date as their invoices, and the charges and payments on them,
+    change, so listing customers by what they owe reads an indexed column
+    rather than adding up every invoice.
+    """
+
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name="balance")
+    invoiced_unpaid = MoneyField(max_digits=14, decimal_places=2, default=0, db_index=True)
+    unpaid_count = models.PositiveIntegerField(default=0)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.customer}: {self.invoiced_unpaid}"
+
+    @classmethod
+    def update_for(cls, *customer_ids: int | None) -> None:
+        """Recalculate the balances of the given customers from their invoices'
+        stored totals, with one query and one upsert."""
+        ids = {customer_id for customer_id in customer_ids if customer_id is not None}
+        if not ids:
+            return
+
+        unpaid = Q(invoices__state=Invoice.States.UNPAID.value)
+        balances = (
+            Customer._base_manager.filter(pk__in=ids)
+            .order_by()
+            .annotate(total=Sum("invoices__total", filter=unpaid, default=0), count=Count("invoices", filter=unpaid))
+            .values_list("pk", "total", "count")
+        )
+
+        cls.objects.bulk_create(
+            [
+                cls(customer_id=pk, invoiced_unpaid=Money(total, settings.DEFAULT_CURRENCY), unpaid_count=count)
+                for pk, total, count in balances
+            ],
+            update_conflicts=True,
+            unique_fields=["customer"],
+            update_fields=["invoiced_unpaid", "unpaid_count", "last_updated"],
+        )
+
+    @classmethod
+    def update_for_invoices(cls, *invoice_ids: int | None) -> None:
+        """Recalculate the balances of the customers whose unpaid invoices are
+        given. Draft, paid and void invoices don't count towards a balance."""
+        ids = {invoice_id for invoice_id in invoice_ids if invoice_id is not None}
+        if not ids:
+            return
+
+        cls.update_for(
+            *Invoice._base_manager.filter(pk__in=ids, state=Invoice.States.UNPAID.value).values_list(
+                "customer_id", flat=True
+            )
+        )
+
+
+class IssueRule(NamedTuple):
+    kind: str
+    # Whether invoices can't be sent to a customer with the issue
+    blocking: bool
+    # The filter picking out the customers with the issue
+    condition: Callable[[], Q | Exists]
+    # The field the issue is about, kept on it to show
+    details: str | None = None
+
+
+def _shared_emails() -> Q:
+    shared = (
+        Customer._base_manager.exclude(invoice_email="")
+        .order_by()
+        .values("invoice_email")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+        .values("invoice_email")
+    )
+    return Q(invoice_email__in=shared)
+
+
+class CustomerIssue(models.Model):
+    """Something wrong with a customer's details.
+
+    Found by running the ``RULES`` over customers as they and their contacts
+    are saved, and over every customer with the check_customers command, so
+    whether a customer can be sent invoices, or needs looking at, is an
+    indexed lookup.
+    """
+
+    class Kinds(models.TextChoices):
+        NO_INVOICE_EMAIL = "no_invoice_email", "no invoice email set"
+        BAD_LAST_NAME = "bad_last_name", "last name doesn't look right"
+        NO_CONTACT = "no_contact", "no contact details"
+        DUPLICATE_EMAIL = "duplicate_email", "invoice email shared with another customer"
+
+    RULES = (
+        IssueRule(Kinds.NO_INVOICE_EMAIL, True, lambda: Q(invoice_email="")),
+        IssueRule(Kinds.BAD_LAST_NAME, True, lambda: Q(last_name__contains="&"), "last_name"),
+        IssueRule(Kinds.NO_CONTACT, False, lambda: ~Exists(Contact.objects.filter(customer=OuterRef("pk")))),
+        IssueRule(Kinds.DUPLICATE_EMAIL, False, _shared_emails, "invoice_email"),
+    )
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="customer_issues")
+    kind = models.CharField(max_length=20, choices=Kinds.choices)
+    blocking = models.BooleanField(default=False)
+    details = models.CharField(max_length=255, default="", blank=True)
+    found = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("-blocking", "kind")
+        unique_together = ("customer", "kind")
+        indexes = [models.Index(fields=["blocking", "customer"])]
+
+    def __str__(self) -> str:
+        return f"{self.customer_id}: {self.get_kind_display()}"
+
+    @classmethod
+    def update_for(cls, *customer_ids: int | None) -> int:
+        """Replace the issues of the given customers, or of every customer when
+        none are given, with what the rules find, with one query per rule."""
+        customers = Customer._base_manager.order_by()
+        issues = cls.objects.all()
+        if customer_ids:
+            ids = {customer_id for customer_id in customer_ids if customer_id is not None}
+            customers = customers.filter(pk__in=ids)
+            issues = issues.filter(customer_id__in=ids)
+
+        found = [
+            cls(customer_id=pk, kind=rule.kind, blocking=rule.blocking, details=details[:255])
+            for rule in cls.RULES
+            for pk, details in customers.filter(rule.condition()).values_list("pk", rule.details or Value(""))
+        ]
+
+        with transaction.atomic():
+            issues.delete()
+            cls.objects.bulk_create(found, batch_size=1000)
+
+        return len(found)
+
+    @classmethod
+    def affected_by(cls, customer: Customer) -> set[int]:
+        """The customers whose issues may change when ``customer`` is saved or
+        deleted: it, and any sharing its invoice email before or after."""
+        emails = {customer.invoice_email}
+        emails.update(
+            cls.objects.filter(customer_id=customer.pk, kind=cls.Kinds.DUPLICATE_EMAIL).values_list(
+                "details", flat=True
+            )
+        )
+        emails.discard("")
+
+        shared = Customer._base_manager.filter(invoice_email__in=emails).values_list("pk", flat=True) if emails else []
+        return {customer.pk, *shared}
@@ -1,48 +1,73 @@
 # Standard Library
-import io
-import os
+import hashlib
+import json
 from collections.abc import Callable, Iterable
-from datetime import date, timedelta
-from typing import TYPE_CHECKING
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import lru_cache
+from operator import attrgetter
+from typing import TYPE_CHECKING, NamedTuple
 
 # Django
-from django.conf import settings
-from django.contrib.staticfiles import finders
+from django.contrib.contenttypes.fields import GenericRelation
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.mail import EmailMultiAlternatives
 from django.db import models
-from django.db.models import F, Q, Sum
-from django.http import HttpResponse
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, HttpRequest, HttpResponse
 from django.template import loader
 from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 
 # Third Party
 from django_fsm import FSMField, Transition, transition
 from django_fsm_log.models import StateLog
 from djmoney.models.fields import MoneyField
 from djmoney.models.managers import money_manager
-from mjml import mjml2html
 from model_utils.fields import MonitorField
 from moneyed import Money
-from xhtml2pdf import pisa
 from xhtml2pdf.context import pisaContext
 
 # Locals
 from ..decorators import save_after
+from ..emails import get_email_template
+from ..rendering import create_pdf, get_renderer, link_callback
+from .charge import Charge
+from .outbox import OutboxMessage
 
 if TYPE_CHECKING:
     # Locals
-    from . import Charge, Customer
+    from . import Customer
+
+
+class InvoicePdf(NamedTuple):
+    name: str
+    digest: str
+    last_modified: int
+
+
+@lru_cache(maxsize=8)
+def _template_digest(template_name: str) -> str:
+    return hashlib.sha256(get_template(template_name).template.source.encode()).hexdigest()
 
 
 class InvoiceManager(models.Manager["Invoice"]):
     def get_queryset(self):
+        # Locals
+        from .customer import CustomerIssue
+
+        blocked = CustomerIssue.objects.filter(customer=OuterRef("customer"), blocking=True)
         return (
             super()
             .get_queryset()
             .annotate(
-                subtotal=Sum(F("charges__line") * F("charges__quantity")),
-                total=F("adjustment") + F("subtotal"),
                 overdue=Q(state=Invoice.States.UNPAID.value, due__lt=date.today()),
+                customer_blocked=Exists(blocked),
             )
         )
 
@@ -62,6 +87,12 @@ class Invoice(models.Model):
     due = models.DateField(blank=True, null=True, default=None)
     adjustment = MoneyField(max_digits=14, default=0.0)
 
+    # Kept up to date by update_totals() whenever the charges, adjustment or
+    # payments change
+    subtotal = MoneyField(max_digits=14, default=0.0, editable=False)
+    total = MoneyField(max_digits=14, default=0.0, editable=False)
+    paid_total = MoneyField(max_digits=14, default=0.0, editable=False)
+
     customer_name = models.CharField(max_length=255, blank=True, default="")
     sent_to = models.CharField(max_length=255, blank=True, default="")
     invoice_address = models.TextField(default="", blank=True)
@@ -77,21 +108,41 @@ class Invoice(models.Model):
 
     _can_edit = False
 
+    PDF_TEMPLATE = "cerberus/invoice.html"
+    TOTAL_FIELDS = (
+        "subtotal",
+        "subtotal_currency",
+        "total",
+        "total_currency",
+        "paid_total",
+        "paid_total_currency",
+    )
+
     customer: models.ForeignKey["Customer|None"] = models.ForeignKey(
         "cerberus.Customer",
         on_delete=models.SET_NULL,
         null=True,
         related_name="invoices",
     )
+    state_logs = GenericRelation(StateLog)
 
     objects = money_manager(InvoiceManager())
 
     def __str__(self) -> str:
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        invoice = super().from_db(db, field_names, values)
+        # Kept so moving an invoice to another customer updates both balances
+        invoice._loaded_customer_id = invoice.__dict__.get("customer_id")
+        return invoice
+
     def save(self, *args, **kwargs) -> None:
+        adding = self._state.adding
+        all_fields = {f.name for f in self._meta.concrete_fields if not f.primary_key}
+
         if not self.can_edit:
-            all_fields = {f.name for f in self._meta.concrete_fields if not f.primary_key}
             excluded = (
                 "invoice",
                 "details",
@@ -103,18 +154,90 @@ class Invoice(models.Model):
                 "adjustment",
             )
             kwargs["update_fields"] = all_fields.difference(excluded)
+        elif not adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = all_fields
         self._can_edit = False
 
+        # The totals may be out of date in memory, only update_totals() writes them
+        if not adding:
+            kwargs["update_fields"] = set(kwargs["update_fields"]).difference(self.TOTAL_FIELDS)
+
         super().save(*args, **kwargs)
 
+        if adding or "adjustment" in kwargs["update_fields"]:
+            self.update_totals(self.pk)
+            self.refresh_totals()
+
+    @classmethod
+    def total_expressions(cls) -> dict[str, Coalesce]:
+        charges = Charge.objects.non_polymorphic().filter(invoice=OuterRef("pk")).order_by().values("invoice")
+        payments = Payment.objects.filter(invoice=OuterRef("pk")).order_by().values("invoice")
+        zero = Value(Decimal(0))
+
+        charged = Subquery(charges.annotate(sum=Sum(F("line") * F("quantity"))).values("sum"))
+        return {
+            "subtotal": Coalesce(charged, zero),
+            # Coalesce rather than adding to the subtotal above, which djmoney can't expand
+            "total": Coalesce(F("adjustment") + charged, F("adjustment")),
+            "paid_total": Coalesce(Subquery(payments.annotate(sum=Sum("amount")).values("sum")), zero),
+        }
+
+    @classmethod
+    def update_totals(cls, *invoice_ids: int | None) -> None:
+        """Recalculate the stored totals of the given invoices with a single
+        UPDATE."""
+        ids = {invoice_id for invoice_id in invoice_ids if invoice_id is not None}
+        if not ids:
+            return
+
+        cls._base_manager.filter(pk__in=ids).update(**cls.total_expressions())
+
+    @classmethod
+    def mismatched_totals(cls) -> models.QuerySet["Invoice"]:
+        """The invoices whose stored totals don't match their charges and
+        payments."""
+        expected = {f"expected_{name}": expression for name, expression in cls.total_expressions().items()}
+
+        return (
+            cls._base_manager.alias(**expected)
+            .filter(
+                ~Q(subtotal=F("expected_subtotal"))
+                | ~Q(total=F("expected_total"))
+                | ~Q(paid_total=F("expected_paid_total"))
+            )
+            .order_by("pk")
+        )
+
+    def refresh_totals(self) -> None:
+        self.refresh_from_db(fields=self.TOTAL_FIELDS)
+
     @classmethod
     def from_customer(cls, customer: "Customer"):
         invoice = cls(customer=customer, customer_name=customer.name, invoice_address=customer.invoice_address)
         invoice.save()
         return invoice
 
+    def add_charges(self, charge_ids: Iterable[int], now: datetime | None = None, update_totals: bool = True) -> int:
+        """Put uninvoiced charges on this invoice with a single UPDATE."""
+        added = Charge.objects.filter(pk__in=list(charge_ids)).update(invoice=self, last_updated=now or timezone.now())
+
+        if update_totals:
+            self.update_totals(self.pk)
+            self.refresh_totals()
+
+        return added
+
     def can_send(self) -> bool:
-        return self.customer is not None and len(self.customer.issues) == 0
+        if self.customer_id is None:
+            return False
+
+        # Read along with the invoice, unless it wasn't loaded through objects
+        if (blocked := getattr(self, "customer_blocked", None)) is None:
+            # Locals
+            from .customer import CustomerIssue
+
+            blocked = CustomerIssue.objects.filter(customer_id=self.customer_id, blocking=True).exists()
+        return not blocked
 
     def can_resend_email(self) -> bool:
         return self.can_send() and self.sent_to != ""
@@ -148,7 +271,7 @@ class Invoice(models.Model):
         }
         created_log = StateLog(**created)
 
-        return [created_log] + list(StateLog.objects.for_(self))  # type: ignore
+        return [created_log] + sorted(self.state_logs.all(), key=attrgetter("timestamp", "pk"))
 
     @save_after
     @transition(
@@ -178,10 +301,14 @@ class Invoice(models.Model):
         assert self.sent_to, "No email address to send to"
         return self.send_email([self.sent_to])
 
-    def send_email(self, to: list[str]):
+    def send_email(self, to: list[str]) -> OutboxMessage:
+        """Queue the invoice to be emailed by ``run_outbox``."""
         assert self.can_send(), "Unable to send email"
 
-        html = loader.get_template("emails/invoice.mjml")
+        return OutboxMessage.enqueue(self, to)
+
+    def build_email(self, to: list[str]) -> EmailMultiAlternatives:
+        html = get_email_template("emails/invoice.mjml")
         txt = loader.get_template("emails/invoice.txt")
 
         context = {
@@ -198,23 +325,19 @@ class Invoice(models.Model):
             to=to,
         )
 
-        dest = io.BytesIO()
-        results = self.get_pdf(render_to=dest)
-        if (err := getattr(results, "err", 0)) > 0:
-            raise Exception(err)
+        with default_storage.open(self.get_pdf_file().name) as pdf:
+            email.attach(f"{self.name}.pdf", pdf.read(), "application/pdf")
+        email.attach_alternative(html.render(context), "text/html")
 
-        email.attach(f"{self.name}.pdf", dest.getvalue(), "application/pdf")
-        email.attach_alternative(mjml2html(html.render(context)), "text/html")
-
-        return email.send()
+        return email
 
     @property
-    def paid(self):
-        return sum(p.amount for p in self.payments.all())
+    def paid(self) -> Money:
+        return self.paid_total
 
     @property
-    def unpaid(self):
-        return (self.total or 0) - self.paid
+    def unpaid(self) -> Money:
+        return self.total - self.paid_total
 
     @save_after
     @transition(
@@ -255,70 +378,97 @@ class Invoice(models.Model):
         return self.sent_on or self.created
 
     def link_callback(self, uri, rel):
-        """Convert HTML URIs to absolute system paths so xhtml2pdf can access
-        those resources."""
-
-        static_url = settings.STATIC_URL
-        static_root = settings.STATIC_ROOT
-        media_url = settings.MEDIA_URL
-        media_root = settings.MEDIA_ROOT
-
-        if result := finders.find(uri):
-            if not isinstance(result, list | tuple):
-                result = [result]
-            result = [os.path.realpath(path) for path in result]
-            path = result[0]
-        elif uri.startswith(media_url):
-            path = os.path.join(media_root, uri.replace(media_url, ""))
-        elif uri.startswith(static_url):
-            path = os.path.join(static_root, uri.replace(static_url, ""))
-        else:
-            return uri
+        return link_callback(uri, rel)
 
-        # make sure that file exists
-        if not os.path.isfile(path):
-            raise Exception(f"media URI must start with {static_url} or {media_url}")
-        return path
+    def render_html(self) -> str:
+        template_path = self.PDF_TEMPLATE
+        context = {
+            "invoice": self,
+        }
 
-    @property
-    def subtotal(self) -> Money:
-        return settings.DEFAULT_CURRENCY.zero + sum(c.amount for c in self.charges.all())
+        template = get_template(template_path)
+        return template.render(context)
+
+    def get_pdf(self, render_to=None, html: str | None = None) -> pisaContext:
+        if html is None:
+            html = self.render_html()
+
+        return create_pdf(html, render_to=render_to)
+
+    def pdf_digest(self) -> str:
+        """A hash of everything the PDF shows, read without rendering it."""
+        customer = (self.customer.name, self.customer.invoice_address) if self.customer else None
+        charges = self.charges.order_by("created", "pk").values_list("name", "line", "line_currency", "quantity")
+        content = [
+            _template_digest(self.PDF_TEMPLATE),
+            self.pk,
+            self.issued.date(),
+            self.due,
+            self.details,
+            self.adjustment,
+            customer,
+            list(charges),
+        ]
 
-    @subtotal.setter
-    def subtotal(self, value):
-        pass
+        return hashlib.sha256(json.dumps(content, default=str).encode()).hexdigest()
 
-    @property
-    def total(self) -> Money:
-        return self.subtotal + self.adjustment
+    @staticmethod
+    def pdf_name(digest: str) -> str:
+        return f"invoices/{digest[:2]}/{digest}.pdf"
 
-    @total.setter
-    def total(self, _value):
-        pass
+    def get_pdf_file(self) -> InvoicePdf:
+        """Get the stored PDF of the invoice, rendering it if needed.
 
-    def get_pdf(self, render_to=None) -> pisaContext:
-        template_path = "cerberus/invoice.html"
-        context = {
-            "invoice": self,
-        }
+        PDFs are stored under a hash of what the invoice shows, so the PDF is
+        only rendered again when that has changed. The rendering itself
+        happens in the PDF renderer's worker processes. Stored PDFs are
+        remembered in the cache, so a repeat download goes straight to
+        opening the file.
+        """
+        digest = self.pdf_digest()
 
-        template = get_template(template_path)
-        html = template.render(context)
+        return self.stored_pdf(digest) or self.store_pdf(digest, get_renderer().render(self.render_html()))
 
-        pdf = pisa.CreatePDF(html, dest=render_to, link_callback=self.link_callback)
+    @classmethod
+    def stored_pdf(cls, digest: str) -> InvoicePdf | None:
+        if stored := cache.get(f"invoice-pdf:{digest}"):
+            return InvoicePdf(stored[0], digest, stored[1])
 
-        if not isinstance(pdf, pisaContext) or pdf.err > 0:
-            raise Exception("Unable to create PDF")
+        name = cls.pdf_name(digest)
+        if not default_storage.exists(name):
+            return None
 
-        return pdf
+        return cls._remember_pdf(name, digest)
 
-    def get_pdf_response(self) -> HttpResponse:
-        response = HttpResponse(
+    @classmethod
+    def store_pdf(cls, digest: str, pdf: bytes) -> InvoicePdf:
+        name = default_storage.save(cls.pdf_name(digest), ContentFile(pdf))
+        return cls._remember_pdf(name, digest)
+
+    @staticmethod
+    def _remember_pdf(name: str, digest: str) -> InvoicePdf:
+        last_modified = int(default_storage.get_modified_time(name).timestamp())
+        cache.set(f"invoice-pdf:{digest}", (name, last_modified), None)
+
+        return InvoicePdf(name, digest, last_modified)
+
+    def get_pdf_response(self, request: HttpRequest | None = None) -> HttpResponse:
+        pdf = self.get_pdf_file()
+        etag = quote_etag(pdf.digest)
+        last_modified = pdf.last_modified
+
+        if request is not None:
+            if response := get_conditional_response(request, etag=etag, last_modified=last_modified):
+                return response
+
+        response = FileResponse(
+            default_storage.open(pdf.name),
+            as_attachment=True,
+            filename=f"{self.name}.pdf",
             content_type="application/pdf",
-            headers={"Content-Disposition": f'attachment; filename="{self.name}.pdf"'},
         )
-
-        self.get_pdf(render_to=response)
+        response.headers["ETag"] = etag
+        response.headers["Last-Modified"] = http_date(last_modified)
 
         return response
 
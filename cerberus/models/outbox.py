@@ -0,0 +1,137 @@
+# Standard Library
+from datetime import timedelta
+from time import perf_counter
+from typing import TYPE_CHECKING, NamedTuple
+
+# Django
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import models, transaction
+from django.utils import timezone
+
+if TYPE_CHECKING:
+    # Locals
+    from . import Invoice
+
+
+class DeliveryReport(NamedTuple):
+    sent: int
+    retrying: int
+    failed: int
+    elapsed: float
+
+
+class OutboxMessage(models.Model):
+    """An email waiting to be sent by ``run_outbox``.
+
+    Only what is needed to build the email is stored. It is rendered when it
+    is sent, so queueing one costs a single insert.
+    """
+
+    class States(models.TextChoices):
+        PENDING = "pending"
+        SENDING = "sending"
+        SENT = "sent"
+        FAILED = "failed"
+
+    invoice: models.ForeignKey["Invoice"] = models.ForeignKey(
+        "cerberus.Invoice", on_delete=models.CASCADE, related_name="emails"
+    )
+    to = models.JSONField(default=list)
+
+    state = models.CharField(max_length=20, choices=States.choices, default=States.PENDING.value)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+
+    created = models.DateTimeField(auto_now_add=True, editable=False)
+    sent_on = models.DateTimeField(blank=True, null=True, default=None)
+
+    class Meta:
+        indexes = [models.Index(fields=["state", "next_attempt"], name="outbox_due_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.invoice} to {', '.join(self.to)} ({self.state})"
+
+    @classmethod
+    def enqueue(cls, invoice: "Invoice", to: list[str]) -> "OutboxMessage":
+        return cls.objects.create(invoice=invoice, to=to)
+
+    @classmethod
+    def claim(cls, batch_size: int) -> list["OutboxMessage"]:
+        """Take the messages due to be sent.
+
+        Claimed messages are marked as sending until the lease runs out, after
+        which another worker takes them again in case this one died mid batch.
+        """
+        now = timezone.now()
+        lease = now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)
+
+        with transaction.atomic():
+            ids = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(state__in=[cls.States.PENDING.value, cls.States.SENDING.value], next_attempt__lte=now)
+                .order_by("next_attempt", "pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            cls.objects.filter(pk__in=ids).update(state=cls.States.SENDING.value, next_attempt=lease)
+
+        return list(cls.objects.filter(pk__in=ids).select_related("invoice__customer").order_by("pk"))
+
+    @classmethod
+    def deliver(cls, batch_size: int = 50) -> DeliveryReport:
+        """Send every due message, a batch at a time, over one connection.
+
+        A message that fails is tried again after ``OUTBOX_RETRY_SECONDS``,
+        doubling each time, and given up on after ``OUTBOX_MAX_ATTEMPTS``.
+        """
+        started = perf_counter()
+        sent = retrying = failed = 0
+        connection: BaseEmailBackend | None = None
+
+        try:
+            while messages := cls.claim(batch_size):
+                if connection is None:
+                    connection = get_connection()
+                    connection.open()
+
+                for message in messages:
+                    try:
+                        connection.send_messages([message.invoice.build_email(message.to)])
+                    except Exception as e:
+                        # The connection may be broken, the next send reconnects
+                        connection.close()
+                        if message.mark_failed(e):
+                            retrying += 1
+                        else:
+                            failed += 1
+                    else:
+                        message.mark_sent()
+                        sent += 1
+        finally:
+            if connection is not None:
+                connection.close()
+
+        return DeliveryReport(sent, retrying, failed, perf_counter() - started)
+
+    def mark_sent(self) -> None:
+        self.state = self.States.SENT.value
+        self.attempts += 1
+        self.sent_on = timezone.now()
+        self.save(update_fields=["state", "attempts", "sent_on"])
+
+    def mark_failed(self, error: Exception) -> bool:
+        """Record a failed attempt, returning whether it will be retried."""
+        self.attempts += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+
+        if self.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            self.state = self.States.FAILED.value
+        else:
+            self.state = self.States.PENDING.value
+            delay = settings.OUTBOX_RETRY_SECONDS * 2 ** (self.attempts - 1)
+            self.next_attempt = timezone.now() + timedelta(seconds=delay)
+
+        self.save(update_fields=["state", "attempts", "last_error", "next_attempt"])
+        return self.state == self.States.PENDING.value
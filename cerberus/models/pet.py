@@ -15,13 +15,21 @@ from taggit.managers import TaggableManager
 
 # Locals
 from ..utils import choice_length
+from .search import SearchEntry
 
 if TYPE_CHECKING:
     # Locals
     from . import Booking
 
 
-class PetManager(models.Manager):
+class PetQuerySet(models.QuerySet["Pet"]):
+    def matching(self, query: str) -> "PetQuerySet":
+        """The pets found by ``query`` in the search index."""
+        entries = SearchEntry.objects.matching(query).filter(kind=SearchEntry.Kinds.PET)
+        return self.filter(pk__in=entries.values("object_id"))
+
+
+class PetManager(models.Manager.from_queryset(PetQuerySet)):  # type: ignore
     def get_queryset(self):
         return super().get_queryset().select_related("customer")
 
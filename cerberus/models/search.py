@@ -0,0 +1,174 @@
+# Standard Library
+import re
+from typing import TYPE_CHECKING, NamedTuple
+
+# Django
+from django.db import connection, models
+from django.db.models.expressions import RawSQL
+
+if TYPE_CHECKING:
+    # Locals
+    from . import Contact, Customer, Pet, Vet
+
+# Kept in step with the cerberus_searchentry table by triggers, see the
+# search_index migration
+FTS_TABLE = "cerberus_searchentry_fts"
+WORD_REGEX = re.compile(r"\w+")
+
+
+class SearchHit(NamedTuple):
+    kind: str
+    id: int
+    customer_id: int | None
+    title: str
+    rank: float
+
+
+class SearchEntryQuerySet(models.QuerySet["SearchEntry"]):
+    def matching(self, query: str) -> "SearchEntryQuerySet":
+        """The entries containing every word of ``query``, each word matching
+        the start of a word in the entry."""
+        words = search_words(query)
+        if not words:
+            return self.none()
+
+        if connection.vendor == "sqlite":
+            match = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [fts_query(words)])
+            return self.filter(pk__in=match)
+
+        # On Postgres these use the trigram index on the text
+        for word in words:
+            self = self.filter(text__icontains=word)
+        return self
+
+
+class SearchEntry(models.Model):
+    """A customer, pet, contact or vet as it is found by search.
+
+    Every kind of thing that can be searched for is copied into this one table,
+    which is indexed for full text search, by the signals that save them.
+    """
+
+    class Kinds(models.TextChoices):
+        CUSTOMER = "customer"
+        PET = "pet"
+        CONTACT = "contact"
+        VET = "vet"
+
+    kind = models.CharField(max_length=20, choices=Kinds.choices)
+    object_id = models.PositiveIntegerField()
+    customer = models.ForeignKey(
+        "cerberus.Customer", on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    title = models.CharField(max_length=255)
+    text = models.TextField()
+
+    objects = SearchEntryQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ("kind", "object_id")
+
+    def __str__(self) -> str:
+        return f"{self.kind}: {self.title}"
+
+    @classmethod
+    def for_object(cls, instance: "Customer | Pet | Contact | Vet") -> "SearchEntry":
+        # Locals
+        from . import Contact, Customer, Pet, Vet
+
+        match instance:
+            case Customer():
+                name = f"{instance.first_name} {instance.last_name}"
+                words = [name, instance.other_names, instance.invoice_email]
+                return cls(kind=cls.Kinds.CUSTOMER, customer_id=instance.pk, title=name, text=" ".join(words))
+            case Pet():
+                name = instance.name
+                return cls(kind=cls.Kinds.PET, customer_id=instance.customer_id, title=name, text=name)
+            case Contact():
+                words = [instance.name, instance.details, digits(instance.details)]
+                title = f"{instance.name}: {instance.details}"
+                return cls(kind=cls.Kinds.CONTACT, customer_id=instance.customer_id, title=title, text=" ".join(words))
+            case Vet():
+                text = " ".join([instance.name, instance.phone, digits(instance.phone)])
+                return cls(kind=cls.Kinds.VET, title=instance.name, text=text)
+            case _:
+                raise TypeError(f"{type(instance).__name__} isn't searchable")
+
+    @classmethod
+    def index(cls, *instances: "Customer | Pet | Contact | Vet") -> None:
+        """Add or update the entries for ``instances`` with one upsert."""
+        entries = []
+        for instance in instances:
+            entry = cls.for_object(instance)
+            entry.object_id = instance.pk
+            entry.title = entry.title[:255]
+            entries.append(entry)
+
+        cls.objects.bulk_create(
+            entries,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=["kind", "object_id"],
+            update_fields=["customer", "title", "text"],
+        )
+
+    @classmethod
+    def unindex(cls, instance: "Customer | Pet | Contact | Vet") -> None:
+        cls.objects.filter(kind=cls.for_object(instance).kind, object_id=instance.pk).delete()
+
+    @classmethod
+    def search(cls, query: str, limit: int = 20, kinds: list[str] | None = None) -> list[SearchHit]:
+        """The best matches for ``query``, best first."""
+        words = search_words(query)
+        if not words:
+            return []
+
+        if connection.vendor == "sqlite":
+            # bm25() can only be read alongside the MATCH, so the search is
+            # written out rather than built from matching()
+            params: list = [fts_query(words)]
+            kind_sql = ""
+            if kinds:
+                kind_sql = f" AND e.kind IN ({', '.join(['%s'] * len(kinds))})"
+                params += kinds
+
+            entries = cls.objects.raw(
+                f"SELECT e.*, -bm25({FTS_TABLE}) AS rank FROM {FTS_TABLE} "
+                f"JOIN cerberus_searchentry e ON e.id = {FTS_TABLE}.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s{kind_sql} ORDER BY rank DESC, e.id LIMIT %s",
+                [*params, limit],
+            )
+        else:
+            # Django
+            from django.contrib.postgres.search import TrigramSimilarity
+
+            entries = cls.objects.matching(query)
+            if kinds:
+                entries = entries.filter(kind__in=kinds)
+            entries = entries.annotate(rank=TrigramSimilarity("text", query)).order_by("-rank", "pk")[:limit]
+
+        return [SearchHit(entry.kind, entry.object_id, entry.customer_id, entry.title, entry.rank) for entry in entries]
+
+
+def digits(text: str) -> str:
+    # Phone numbers are indexed with their digits run together too, so they
+    # are found however they were spaced out
+    return re.sub(r"\D", "", text)
+
+
+def search_words(query: str) -> list[str]:
+    """The words of ``query``, with runs of numbers joined up to match the
+    way phone numbers are indexed."""
+    words: list[str] = []
+    for word in WORD_REGEX.findall(query):
+        if words and word.isdigit() and words[-1].isdigit():
+            words[-1] += word
+        else:
+            words.append(word)
+    return words
+
+
+def fts_query(words: list[str]) -> str:
+    # Each word is quoted so nothing in it is read as FTS5 syntax, and matched
+    # as a prefix so results show up while a word is being typed
+    return " ".join(f'"{word}"*' for word in words)
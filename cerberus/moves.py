@@ -0,0 +1,202 @@
+# Standard Library
+from collections import defaultdict
+from collections.abc import Iterable
+from datetime import date, datetime
+from functools import reduce
+from operator import or_
+from typing import NamedTuple
+
+# Django
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+# Locals
+from .exceptions import SlotChangedError
+from .intervals import Interval, IntervalIndex
+from .models import Booking, BookingSlot
+from .utils import make_aware
+
+SlotKey = tuple[datetime, datetime]
+
+
+class Move(NamedTuple):
+    booking_id: int
+    to: datetime | date
+
+
+class MoveResult(NamedTuple):
+    id: int
+    status: int
+    reason: str | None = None
+    start: datetime | None = None
+    end: datetime | None = None
+    slot: int | None = None
+
+
+class SlotState:
+    """The bookings a slot would hold part way through planning the moves."""
+
+    def __init__(self, slot: BookingSlot | None = None, customers: Iterable[int] = ()) -> None:
+        self.service_id = getattr(slot, "service_id", None)
+        self.pets = getattr(slot, "pet_count", 0)
+        self.customers = set(customers)
+
+    def add(self, booking: Booking) -> None:
+        self.service_id = booking.service_id
+        self.pets += len(booking.pets.all())
+        self.customers.add(booking.customer_id)
+
+    def remove(self, booking: Booking) -> None:
+        self.pets -= len(booking.pets.all())
+        self.customers.discard(booking.customer_id)
+        if not self.customers:
+            self.service_id = None
+
+    def check(self, booking: Booking) -> str | None:
+        if not self.customers:
+            return None
+
+        if self.service_id != booking.service_id:
+            return "Booking is for a different service"
+
+        if booking.customer_id in self.customers:
+            return "Customer is already booked in this slot"
+
+        if self.pets + len(booking.pets.all()) > booking.service.max_pet:
+            return f"Booking has max pets for service, {booking.service.max_pet}"
+
+        if len(self.customers) >= booking.service.max_customer:
+            return f"Booking has max customers for service, {booking.service.max_customer}"
+
+        return None
+
+
+def _target(booking: Booking, to: datetime | date) -> SlotKey:
+    if not isinstance(to, datetime):
+        start = booking.start
+        to = make_aware(datetime(to.year, to.month, to.day, start.hour, start.minute, start.second))
+
+    return to, to + (booking.end - booking.start)
+
+
+def _plan(
+    targets: dict[int, SlotKey],
+    bookings: dict[int, Booking],
+    slots: list[BookingSlot],
+    customers: dict[int, set[int]],
+) -> dict[int, str]:
+    """Place the moving bookings in order and return why any could not be."""
+    state = {(slot.start, slot.end): SlotState(slot, customers[slot.pk]) for slot in slots}
+    by_pk = {slot.pk: state[(slot.start, slot.end)] for slot in slots}
+
+    for booking_id in targets:
+        if source := by_pk.get(bookings[booking_id]._booking_slot_id):
+            source.remove(bookings[booking_id])
+
+    occupied: IntervalIndex[SlotKey] = IntervalIndex(Interval(*key, key) for key, st in state.items() if st.customers)
+    failures: dict[int, str] = {}
+
+    for booking_id, key in targets.items():
+        booking = bookings[booking_id]
+        slot_state = state.setdefault(key, SlotState())
+
+        reason = slot_state.check(booking)
+        if reason is None and any(hit.item != key for hit in occupied.overlapping(*key)):
+            reason = "Booking overlaps another"
+
+        if reason is not None:
+            failures[booking_id] = reason
+            continue
+
+        if not slot_state.customers:
+            occupied.add(*key, key)
+        slot_state.add(booking)
+
+    return failures
+
+
+def bulk_move(moves: Iterable[Move]) -> list[MoveResult]:
+    """Move several bookings at once.
+
+    The moves are validated together, so bookings can swap places or move
+    into a slot another booking in the same request is leaving. A booking
+    that cannot be moved stays where it is, and the remaining moves are
+    planned again around it. The moves that are valid are then written in
+    one transaction with bulk updates.
+    """
+    moves = list(moves)
+
+    with transaction.atomic():
+        bookings = (
+            Booking.objects.select_for_update(of=("self",))
+            .select_related("service")
+            .prefetch_related("pets")
+            .in_bulk({move.booking_id for move in moves})
+        )
+
+        targets: dict[int, SlotKey] = {}
+        failures: dict[int, str] = {}
+        for move in moves:
+            if (booking := bookings.get(move.booking_id)) is None:
+                continue
+            if move.booking_id in targets or move.booking_id in failures:
+                failures[move.booking_id] = "Booking is moved more than once"
+            elif not booking.can_move:
+                failures[move.booking_id] = "Booking cannot be moved"
+            else:
+                targets[move.booking_id] = _target(booking, move.to)
+
+        for booking_id in failures:
+            targets.pop(booking_id, None)
+
+        slots: list[BookingSlot] = []
+        customers: dict[int, set[int]] = defaultdict(set)
+        if targets:
+            ranges = [Q(start__lt=end, end__gt=start) for start, end in targets.values()]
+            slots = list(BookingSlot.objects.select_for_update().filter(reduce(or_, ranges)))
+            rows = Booking.objects.filter(_booking_slot__in=slots).values_list("_booking_slot", "customer")
+            for slot_id, customer_id in rows:
+                customers[slot_id].add(customer_id)
+
+        while new_failures := _plan(targets, bookings, slots, customers):
+            failures.update(new_failures)
+            for booking_id in new_failures:
+                del targets[booking_id]
+
+        slot_for = {(slot.start, slot.end): slot for slot in slots}
+        new_slots = BookingSlot.get_slots(key for key in targets.values() if key not in slot_for)
+        if any(slot.customer_count for slot in new_slots.values()):
+            raise SlotChangedError("Slot was booked by another request")
+        slot_for.update(new_slots)
+
+        now = timezone.now()
+        source_ids = {bookings[booking_id]._booking_slot_id for booking_id in targets}
+        for booking_id, (start, end) in targets.items():
+            booking = bookings[booking_id]
+            booking.start = start
+            booking.end = end
+            booking._booking_slot = slot_for[(start, end)]
+            booking.last_updated = now
+
+        Booking.objects.bulk_update(
+            [bookings[booking_id] for booking_id in targets], ["start", "end", "_booking_slot", "last_updated"]
+        )
+
+        target_ids = {bookings[booking_id]._booking_slot_id for booking_id in targets}
+        BookingSlot.update_counts(*source_ids, *target_ids)
+        if settings.COLLECT_EMPTY_SLOTS:
+            BookingSlot.collect_empty(*(source_ids - target_ids))
+
+    results = []
+    for move in moves:
+        if move.booking_id not in bookings:
+            results.append(MoveResult(move.booking_id, 404, "Booking not found"))
+        elif reason := failures.get(move.booking_id):
+            results.append(MoveResult(move.booking_id, 400, reason))
+        else:
+            booking = bookings[move.booking_id]
+            results.append(MoveResult(booking.pk, 200, None, booking.start, booking.end, booking._booking_slot_id))
+
+    return results
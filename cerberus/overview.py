@@ -0,0 +1,142 @@
+# Standard Library
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
+# Django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, NullIf, RowNumber
+from django.utils import timezone
+
+# Third Party
+from moneyed import Money
+
+# Locals
+from .models import Invoice
+
+BUCKETS = (
+    Invoice.States.DRAFT.value,
+    Invoice.States.UNPAID.value,
+    Invoice.States.VOID.value,
+    Invoice.States.PAID.value,
+)
+# Void and paid invoices are only shown for this long after they last changed
+RECENT = timedelta(days=28)
+VERSION_KEY = "invoice-overview:version"
+
+
+class OverviewRow(NamedTuple):
+    id: int
+    customer_id: int | None
+    customer_name: str
+    state: str
+    due: date | None
+    total: Money
+    paid_total: Money
+    overdue: bool
+    last_updated: datetime
+
+    @property
+    def name(self) -> str:
+        return f"INV-{self.id:03}"
+
+
+class OverviewBucket(NamedTuple):
+    count: int
+    total: Money
+    offset: int
+    results: list[OverviewRow]
+
+    @property
+    def next_offset(self) -> int | None:
+        end = self.offset + len(self.results)
+        return end if end < self.count else None
+
+
+def build_overview(
+    customer_id: int | None = None, limit: int = 10, offset: int = 0, bucket: str | None = None
+) -> dict[str, OverviewBucket]:
+    """Page through the draft, unpaid and recently void or paid invoices.
+
+    Every bucket's page, count and total comes from a single query, which
+    numbers the rows within each state and keeps the requested page of each.
+    """
+    invoices = Invoice.objects.filter(
+        Q(state__in=[Invoice.States.DRAFT.value, Invoice.States.UNPAID.value])
+        | Q(state__in=[Invoice.States.VOID.value, Invoice.States.PAID.value], last_updated__gte=timezone.now() - RECENT)
+    )
+    if customer_id is not None:
+        invoices = invoices.filter(customer_id=customer_id)
+    if bucket is not None:
+        invoices = invoices.filter(state=bucket)
+
+    by_state = {"partition_by": F("state")}
+    rows = (
+        invoices.annotate(
+            position=Window(RowNumber(), order_by=(F("created").desc(), F("pk").desc()), **by_state),
+            bucket_count=Window(Count("pk"), **by_state),
+            bucket_total=Window(Sum("total"), **by_state),
+            customer_label=Coalesce(NullIf("customer_name", Value("")), "customer__name", Value("")),
+        )
+        # Every bucket's first row is kept too, so its count and total are known
+        # even when the page is past its end
+        .filter(Q(position__gt=offset, position__lte=offset + limit) | Q(position=1))
+        .order_by("state", "position")
+        .values_list(
+            "position",
+            "bucket_count",
+            "bucket_total",
+            "pk",
+            "customer_id",
+            "customer_label",
+            "state",
+            "due",
+            "total",
+            "paid_total",
+            "overdue",
+            "last_updated",
+        )
+    )
+
+    def money(amount: Decimal | None) -> Money:
+        return Money(amount or 0, settings.DEFAULT_CURRENCY)
+
+    buckets = {state: OverviewBucket(0, money(0), offset, []) for state in BUCKETS if bucket in (None, state)}
+    for position, count, total, pk, customer_id, name, state, due, amount, paid, overdue, updated in rows:
+        results = buckets[state].results
+        buckets[state] = OverviewBucket(count, money(total), offset, results)
+        if position > offset:
+            results.append(OverviewRow(pk, customer_id, name, state, due, money(amount), money(paid), overdue, updated))
+
+    return buckets
+
+
+def get_overview(
+    customer_id: int | None = None, limit: int = 10, offset: int = 0, bucket: str | None = None
+) -> dict[str, OverviewBucket]:
+    """``build_overview()``, cached until an invoice, charge or payment changes."""
+    version = cache.get_or_set(VERSION_KEY, 0, None)
+    key = f"invoice-overview:{version}:{customer_id}:{limit}:{offset}:{bucket}"
+
+    if (overview := cache.get(key)) is None:
+        overview = build_overview(customer_id, limit, offset, bucket)
+        cache.set(key, overview, settings.INVOICE_OVERVIEW_CACHE_SECONDS)
+
+    return overview
+
+
+def invalidate_overview() -> None:
+    _bump_version()
+    # Again once committed, in case the overview was cached from before the
+    # change was visible to other connections
+    transaction.on_commit(_bump_version)
+
+
+def _bump_version() -> None:
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
@@ -0,0 +1,71 @@
+# Standard Library
+import hashlib
+import json
+from typing import Any, NamedTuple
+
+# Django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+# Third Party
+from taggit.models import Tag
+
+# Locals
+from .models import Customer, Pet, Service, Vet
+from .serializers import ServiceSerializer, VetSerializer
+
+VERSION_KEY = "reference-data:version"
+
+
+class ReferenceData(NamedTuple):
+    # A hash of the data, so it is only different when the data is
+    version: str
+    data: dict[str, Any]
+
+
+def build_reference_data() -> ReferenceData:
+    """The services, vets, tags and active customer and pet names the app
+    needs on nearly every screen."""
+    data = {
+        "services": ServiceSerializer(Service.objects.all(), many=True).data,
+        "vets": VetSerializer(Vet.objects.all(), many=True, exclude=("pets",)).data,
+        "tags": list(Tag.objects.order_by("name").values_list("name", flat=True)),
+        "customers": dict(Customer.objects.filter(active=True).values_list("pk", "name")),
+        "pets": dict(Pet.objects.filter(active=True).values_list("pk", "name")),
+    }
+    # Cached as the plain JSON types it is sent as, with string ids, so the
+    # hash is of exactly what clients see
+    data = json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+    version = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+
+    return ReferenceData(version, {"version": version, **data})
+
+
+def get_reference_data() -> ReferenceData:
+    """``build_reference_data()``, held in the shared cache until one of the
+    tables it reads from is written to."""
+    cache = caches[settings.REFERENCE_DATA_CACHE]
+    key = f"reference-data:{cache.get_or_set(VERSION_KEY, 0, None)}"
+
+    if (reference_data := cache.get(key)) is None:
+        reference_data = build_reference_data()
+        cache.set(key, reference_data, settings.REFERENCE_DATA_CACHE_SECONDS)
+
+    return reference_data
+
+
+def invalidate_reference_data() -> None:
+    _bump_version()
+    # Again once committed, in case another worker cached the data from
+    # before the change was visible to it
+    transaction.on_commit(_bump_version)
+
+
+def _bump_version() -> None:
+    cache = caches[settings.REFERENCE_DATA_CACHE]
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
@@ -0,0 +1,276 @@
+# Standard Library
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+
+# Django
+import django
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.signals import setting_changed
+
+# Third Party
+from xhtml2pdf import pisa
+from xhtml2pdf.context import pisaContext
+
+# Locals
+from .exceptions import PdfRenderError, RendererUnavailableError
+
+WARM_UP_HTML = """
+<html>
+  <head><style>@page { size: A4 portrait; margin: 1cm; } body { font-family: Helvetica; }</style></head>
+  <body><h1>Invoice</h1><table><tr><td>Warm up</td><td>&pound;0.00</td></tr></table></body>
+</html>
+"""
+
+
+class RenderStats(NamedTuple):
+    workers: int
+    capacity: int
+    in_flight: int
+    queued: int
+    rendered: int
+    failed: int
+    rejected: int
+    timed_out: int
+    render_seconds: float
+    max_render_seconds: float
+
+    @property
+    def average_render_seconds(self) -> float:
+        return self.render_seconds / self.rendered if self.rendered else 0.0
+
+
+def link_callback(uri: str, rel: str | None) -> str:
+    """Convert HTML URIs to absolute system paths so xhtml2pdf can access
+    those resources."""
+
+    static_url = settings.STATIC_URL
+    static_root = settings.STATIC_ROOT
+    media_url = settings.MEDIA_URL
+    media_root = settings.MEDIA_ROOT
+
+    if result := finders.find(uri):
+        if not isinstance(result, list | tuple):
+            result = [result]
+        result = [os.path.realpath(path) for path in result]
+        path = result[0]
+    elif uri.startswith(media_url):
+        path = os.path.join(media_root, uri.replace(media_url, ""))
+    elif uri.startswith(static_url):
+        path = os.path.join(static_root, uri.replace(static_url, ""))
+    else:
+        return uri
+
+    # make sure that file exists
+    if not os.path.isfile(path):
+        raise Exception(f"media URI must start with {static_url} or {media_url}")
+    return path
+
+
+def create_pdf(html: str, render_to=None) -> pisaContext:
+    pdf = pisa.CreatePDF(html, dest=render_to, link_callback=link_callback)
+
+    if not isinstance(pdf, pisaContext) or pdf.err > 0:
+        raise PdfRenderError("Unable to create PDF")
+
+    return pdf
+
+
+def render_pdf(html: str) -> tuple[bytes, float]:
+    """Render ``html`` to PDF bytes, returning them with the seconds taken."""
+    started = time.perf_counter()
+    dest = io.BytesIO()
+    create_pdf(html, render_to=dest)
+
+    return dest.getvalue(), time.perf_counter() - started
+
+
+def _init_worker() -> None:
+    django.setup()
+    # The first render loads reportlab's fonts and xhtml2pdf's default CSS,
+    # do it before any real work arrives
+    render_pdf(WARM_UP_HTML)
+
+
+class PdfRenderer:
+    """Render PDFs in a pool of worker processes.
+
+    At most ``workers`` PDFs render at once and ``queue`` more may wait for a
+    worker. Past that, or when a PDF is not ready within ``timeout`` seconds,
+    ``RendererUnavailableError`` is raised, which the API answers with a 503
+    and a Retry-After header. With no workers PDFs are rendered in the calling
+    process.
+    """
+
+    def __init__(self, workers: int = 2, queue: int = 8, timeout: float = 30, retry_after: int = 5) -> None:
+        self.workers = workers
+        self.capacity = workers + queue
+        self.timeout = timeout
+        self.retry_after = retry_after
+
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(self.capacity, 1))
+        self._in_flight = 0
+        self._rendered = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._render_seconds = 0.0
+        self._max_render_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls) -> "PdfRenderer":
+        return cls(
+            workers=settings.PDF_RENDER_WORKERS,
+            queue=settings.PDF_RENDER_QUEUE,
+            timeout=settings.PDF_RENDER_TIMEOUT,
+            retry_after=settings.PDF_RENDER_RETRY_AFTER,
+        )
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # Spawned rather than forked so workers don't share the web
+                # process's database connections or threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+            return self._pool
+
+    def start(self) -> None:
+        """Start every worker now, instead of on the first renders."""
+        if self.workers == 0:
+            return
+
+        pool = self._get_pool()
+        # Each task holds a worker long enough that the pool has to start them all
+        for future in [pool.submit(time.sleep, 0.1) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+
+        # Outside the lock, shutting down waits on the pool's thread which
+        # records the last renders and needs the lock to do so
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    def _record(self, future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._failed += 1
+            else:
+                _, seconds = future.result()
+                self._rendered += 1
+                self._render_seconds += seconds
+                self._max_render_seconds = max(self._max_render_seconds, seconds)
+        self._slots.release()
+
+    def submit(self, html: str, wait: bool = False) -> Future:
+        """Queue ``html`` to be rendered, failing straight away when the
+        queue is full or, with ``wait``, once it has stayed full for the
+        timeout."""
+        acquired = self._slots.acquire(timeout=self.timeout) if wait else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self._rejected += 1
+            raise RendererUnavailableError(wait=self.retry_after)
+
+        with self._lock:
+            self._in_flight += 1
+
+        try:
+            future = self._get_pool().submit(render_pdf, html)
+        except BrokenProcessPool:
+            with self._lock:
+                self._in_flight -= 1
+                self._failed += 1
+            self._slots.release()
+            self.shutdown()
+            raise RendererUnavailableError(wait=self.retry_after)
+
+        future.add_done_callback(self._record)
+        return future
+
+    def render(self, html: str) -> bytes:
+        """Render ``html`` to PDF bytes in a worker.
+
+        A render that times out may already be running in a worker, where it
+        can't be cancelled. It keeps its place until the worker finishes, so
+        renders that are still running always count against the capacity.
+        """
+        if self.workers == 0:
+            pdf, seconds = render_pdf(html)
+            with self._lock:
+                self._rendered += 1
+                self._render_seconds += seconds
+                self._max_render_seconds = max(self._max_render_seconds, seconds)
+            return pdf
+
+        future = self.submit(html)
+        try:
+            pdf, _ = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            raise RendererUnavailableError(wait=self.retry_after)
+        except BrokenProcessPool:
+            self.shutdown()
+            raise RendererUnavailableError(wait=self.retry_after)
+
+        return pdf
+
+    def stats(self) -> RenderStats:
+        with self._lock:
+            return RenderStats(
+                workers=self.workers,
+                capacity=self.capacity,
+                in_flight=self._in_flight,
+                queued=max(0, self._in_flight - self.workers),
+                rendered=self._rendered,
+                failed=self._failed,
+                rejected=self._rejected,
+                timed_out=self._timed_out,
+                render_seconds=self._render_seconds,
+                max_render_seconds=self._max_render_seconds,
+            )
+
+
+_renderer: PdfRenderer | None = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> PdfRenderer:
+    global _renderer
+
+    with _renderer_lock:
+        if _renderer is None:
+            _renderer = PdfRenderer.from_settings()
+        return _renderer
+
+
+def reset_renderer(**kwargs) -> None:
+    global _renderer
+
+    if kwargs.get("setting", "PDF_RENDER_").startswith("PDF_RENDER_"):
+        with _renderer_lock:
+            renderer, _renderer = _renderer, None
+
+        if renderer is not None:
+            renderer.shutdown()
+
+
+setting_changed.connect(reset_renderer)
@@ -1,5 +1,5 @@
 # Django
-from django.db.models import Count, F, Sum
+from django.db.models import Count, Sum
 from django.db.models.functions import ExtractWeek, ExtractYear
 from django.urls import path
 
@@ -24,11 +24,7 @@ class InvoicePerWeek(BaseInvoiceReport):
             .exclude(sent_on=None)
             .annotate(year=ExtractYear("sent_on"), week=ExtractWeek("sent_on"))
             .values("year", "week")
-            .annotate(count=Count("id"))
-            .annotate(
-                subtotal=Sum(F("charges__line") * F("charges__quantity")),
-                total=Sum("adjustment") + F("subtotal"),
-            )
+            .annotate(count=Count("id"), subtotal=Sum("subtotal"), total=Sum("total"))
             .order_by("week")
         )
 
@@ -0,0 +1,66 @@
+# Standard Library
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+# Locals
+from .models import Booking, BookingSlot
+from .utils import make_aware
+
+
+class SlotBookings(NamedTuple):
+    slot: BookingSlot
+    bookings: list[Booking]
+
+
+class ScheduleRow(NamedTuple):
+    time: datetime
+    bookings: list[Booking]
+
+    @property
+    def slots(self) -> list[SlotBookings]:
+        """The row's bookings grouped by their slot, in the order the slots start."""
+        slots: dict[int, SlotBookings] = {}
+        for booking in self.bookings:
+            slots.setdefault(booking._booking_slot_id, SlotBookings(booking.booking_slot, [])).bookings.append(booking)
+        return list(slots.values())
+
+
+class DaySchedule(NamedTuple):
+    date: datetime
+    rows: list[ScheduleRow]
+
+
+def day_bookings(day: datetime) -> list[Booking]:
+    return list(
+        Booking.active.filter(start__gte=day, start__lt=day + timedelta(days=1))
+        .select_related("service", "customer", "_booking_slot")
+        .prefetch_related("pets", "_booking_slot__bookings")
+        .order_by("start", "pk")
+    )
+
+
+def build_day_schedule(value: date, step: int = 15, start: int = 8, end: int = 17) -> DaySchedule:
+    """Lay out a day's bookings on a grid of ``step`` minute rows.
+
+    The grid covers ``start`` to ``end`` o'clock, widened to an hour either
+    side of the bookings on the day but never past midnight. Bookings are
+    loaded once and placed in the row their start falls in.
+    """
+    day = make_aware(value)
+    bookings = day_bookings(day)
+
+    if bookings:
+        first_hour = bookings[0].start.hour
+        last_end = max(booking.end for booking in bookings)
+        last_hour = 24 if last_end >= day + timedelta(days=1) else last_end.hour
+        start = max(0, min(start, first_hour - 1))
+        end = min(24, max(end, last_hour + 1))
+
+    grid_start = day + timedelta(hours=start)
+    row_length = timedelta(minutes=step)
+    rows = [ScheduleRow(grid_start + row_length * i, []) for i in range((end - start) * 60 // step + 1)]
+
+    for booking in bookings:
+        rows[min((booking.start - grid_start) // row_length, len(rows) - 1)].bookings.append(booking)
+
+    return DaySchedule(day, rows)
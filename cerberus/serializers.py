@@ -1,9 +1,12 @@
 # Standard Library
+from datetime import date
 from enum import Enum
 
 # Django
+from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import transaction
+from django.db.models import Prefetch, QuerySet
 
 # Third Party
 from django_fsm_log.models import StateLog
@@ -12,7 +15,22 @@ from rest_framework import serializers
 from taggit.serializers import TaggitSerializer, TagListSerializerField
 
 # Locals
-from .models import Address, Booking, BookingSlot, Charge, Contact, Customer, Invoice, Pet, Service, UserSettings, Vet
+from .billing import write_charges
+from .models import (
+    Address,
+    Booking,
+    BookingSeries,
+    BookingSlot,
+    Charge,
+    Contact,
+    Customer,
+    Invoice,
+    Pet,
+    SearchEntry,
+    Service,
+    UserSettings,
+    Vet,
+)
 
 default_read_only = [
     "id",
@@ -23,7 +41,24 @@ default_read_only = [
 
 class DynamicFieldsModelSerializer(serializers.ModelSerializer):
     """A ModelSerializer that takes an additional `fields` argument that
-    controls which fields should be displayed."""
+    controls which fields should be displayed.
+
+    `select_related` and `prefetch_related` list the related objects the
+    fields read, `setup_queryset()` applies them so serializing many objects
+    doesn't query once per object.
+    """
+
+    select_related: tuple[str, ...] = ()
+    prefetch_related: tuple[str | Prefetch, ...] = ()
+
+    @classmethod
+    def setup_queryset(cls, queryset: QuerySet) -> QuerySet:
+        if cls.select_related:
+            queryset = queryset.select_related(*cls.select_related)
+        if cls.prefetch_related:
+            queryset = queryset.prefetch_related(*cls.prefetch_related)
+
+        return queryset
 
     def __init__(self, *args, **kwargs):
         fields = kwargs.pop("fields", None)
@@ -163,6 +198,78 @@ class BookingSerializer(DynamicFieldsModelSerializer):
         ]
 
 
+class ScheduleRowSerializer(serializers.Serializer):
+    time = serializers.DateTimeField(read_only=True)
+    bookings = BookingSerializer(many=True, read_only=True)
+
+
+class DayScheduleSerializer(serializers.Serializer):
+    date = serializers.DateTimeField(read_only=True)
+    rows = ScheduleRowSerializer(many=True, read_only=True)
+
+
+class BookingSeriesSerializer(DynamicFieldsModelSerializer):
+    id = serializers.ReadOnlyField()
+    weekdays = serializers.ListField(child=serializers.ChoiceField(choices=BookingSeries.Weekday.choices))
+
+    class Meta:
+        model = BookingSeries
+        fields = "__all__"
+        read_only_fields = default_read_only
+
+    def validate(self, attrs):
+        start_date = attrs.get("start_date", getattr(self.instance, "start_date", None))
+        end_date = attrs.get("end_date", getattr(self.instance, "end_date", None))
+        if start_date and end_date and end_date < start_date:
+            raise serializers.ValidationError({"end_date": ["Series ends before it starts"]})
+
+        customer = attrs.get("customer", getattr(self.instance, "customer", None))
+        if any(pet.customer != customer for pet in attrs.get("pets", [])):
+            raise serializers.ValidationError({"pets": ["Booking has pets from a different customer"]})
+
+        return super().validate(attrs)
+
+
+class SeriesConflictSerializer(serializers.Serializer):
+    start = serializers.DateTimeField(read_only=True)
+    end = serializers.DateTimeField(read_only=True)
+    reason = serializers.CharField(read_only=True)
+
+
+class AvailabilityRangeSerializer(serializers.Serializer):
+    """The ``from`` and ``to`` dates, inclusive, of an availability search."""
+
+    max_days = 366
+
+    def get_fields(self):
+        return {"from": serializers.DateField(), "to": serializers.DateField()}
+
+    def validate(self, attrs):
+        days = (attrs["to"] - attrs["from"]).days
+        if days < 0:
+            raise serializers.ValidationError("to must not be before from")
+
+        if days >= self.max_days:
+            raise serializers.ValidationError(f"Range must be less than {self.max_days} days")
+
+        return attrs
+
+
+class InvoiceExportSerializer(AvailabilityRangeSerializer):
+    """The invoices issued ``from`` and ``to``, optionally in one ``state``."""
+
+    def get_fields(self):
+        return {**super().get_fields(), "state": serializers.ChoiceField(Invoice.States.choices, required=False)}
+
+
+class AvailabilitySerializer(serializers.Serializer):
+    start = serializers.DateTimeField(read_only=True)
+    end = serializers.DateTimeField(read_only=True)
+    pets = serializers.IntegerField(read_only=True)
+    customers = serializers.IntegerField(read_only=True)
+    slot = serializers.IntegerField(read_only=True, allow_null=True)
+
+
 class ToDateTimeSerializer(serializers.Serializer):
     to = serializers.DateTimeField()
 
@@ -171,6 +278,117 @@ class ToDateSerializer(serializers.Serializer):
     to = serializers.DateField()
 
 
+class DateOrDateTimeField(serializers.Field):
+    """A date, or a date and time when the value is not a bare date."""
+
+    def to_internal_value(self, data):
+        try:
+            return serializers.DateField().to_internal_value(data)
+        except serializers.ValidationError:
+            return serializers.DateTimeField().to_internal_value(data)
+
+    def to_representation(self, value):
+        return value.isoformat()
+
+
+class MoveSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    to = DateOrDateTimeField()
+
+
+class MoveResultSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    status = serializers.IntegerField(read_only=True)
+    reason = serializers.CharField(read_only=True, allow_null=True)
+    start = serializers.DateTimeField(read_only=True, allow_null=True)
+    end = serializers.DateTimeField(read_only=True, allow_null=True)
+    slot = serializers.IntegerField(read_only=True, allow_null=True)
+
+
+class CompleteEndedSerializer(serializers.Serializer):
+    dry_run = serializers.BooleanField(default=False)
+
+
+class BillingRunSerializer(serializers.Serializer):
+    """Invoice the charges made ``from`` and ``to``, inclusive. Without a
+    ``from`` every earlier uninvoiced charge is included."""
+
+    send = serializers.BooleanField(default=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def get_fields(self):
+        return {
+            **super().get_fields(),
+            "from": serializers.DateField(required=False),
+            "to": serializers.DateField(default=date.today),
+        }
+
+    def validate(self, attrs):
+        if "from" in attrs and attrs["from"] > attrs["to"]:
+            raise serializers.ValidationError("to must not be before from")
+
+        return attrs
+
+
+class InvoiceOverviewQuerySerializer(serializers.Serializer):
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=100)
+    offset = serializers.IntegerField(default=0, min_value=0)
+    bucket = serializers.ChoiceField(Invoice.States.choices, required=False)
+
+
+class InvoiceOverviewRowSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    customer_id = serializers.IntegerField(read_only=True, allow_null=True)
+    customer_name = serializers.CharField(read_only=True)
+    state = serializers.CharField(read_only=True)
+    due = serializers.DateField(read_only=True, allow_null=True)
+    total = MoneyField(max_digits=10, decimal_places=2, read_only=True)
+    paid_total = MoneyField(max_digits=10, decimal_places=2, read_only=True)
+    overdue = serializers.BooleanField(read_only=True)
+    last_updated = serializers.DateTimeField(read_only=True)
+
+
+class InvoiceOverviewBucketSerializer(serializers.Serializer):
+    count = serializers.IntegerField(read_only=True)
+    total = MoneyField(max_digits=10, decimal_places=2, read_only=True)
+    next_offset = serializers.IntegerField(read_only=True, allow_null=True)
+    results = InvoiceOverviewRowSerializer(many=True, read_only=True)
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=255)
+    limit = serializers.IntegerField(default=20, min_value=1, max_value=100)
+    kind = serializers.MultipleChoiceField(choices=SearchEntry.Kinds.choices, required=False)
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=255)
+    limit = serializers.IntegerField(default=10, min_value=1, max_value=50)
+
+
+class PetAutocompleteQuerySerializer(AutocompleteQuerySerializer):
+    q = serializers.CharField(max_length=255, required=False, allow_blank=True, default="")
+    customer = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if not attrs["q"] and "customer" not in attrs:
+            raise serializers.ValidationError("Search for pets or choose a customer")
+        return attrs
+
+
+class SearchHitSerializer(serializers.Serializer):
+    kind = serializers.CharField(read_only=True)
+    id = serializers.IntegerField(read_only=True)
+    customer_id = serializers.IntegerField(read_only=True, allow_null=True)
+    title = serializers.CharField(read_only=True)
+    rank = serializers.FloatField(read_only=True)
+
+
+class OnDateSerializer(serializers.Serializer):
+    date = serializers.DateField()
+
+
 class AddressSerializer(DynamicFieldsModelSerializer):
     id = serializers.ReadOnlyField()
 
@@ -201,6 +419,9 @@ class PetSerializer(TaggitSerializer, DynamicFieldsModelSerializer, NestedObject
     vet_id = serializers.IntegerField(write_only=True)
     customer = CustomerDetailsOnlySerializer(read_only=True)
 
+    select_related = ("customer", "vet")
+    prefetch_related = ("tags",)
+
     class Meta:
         model = Pet
         fields = "__all__"
@@ -218,6 +439,8 @@ class VetSerializer(DynamicFieldsModelSerializer):
     id = serializers.ReadOnlyField()
     pets = PetSerializer(many=True, read_only=True, exclude=("vet", "customer"))
 
+    prefetch_related = ("pets__tags",)
+
     class Meta:
         model = Vet
         fields = "__all__"
@@ -244,6 +467,9 @@ class CustomerSerializer(TaggitSerializer, DynamicFieldsModelSerializer, NestedO
     overdue_count = serializers.IntegerField(read_only=True)
     issues = serializers.ListSerializer(child=serializers.CharField(read_only=True), read_only=True)
 
+    select_related = ("vet",)
+    prefetch_related = ("addresses", "contacts", "tags", "customer_issues")
+
     class Meta:
         model = Customer
         fields = "__all__"
@@ -268,6 +494,9 @@ class InvoiceSerializer(DynamicFieldsModelSerializer, NestedObjectSerializer):
     can_edit = serializers.BooleanField(read_only=True)
     state_log = StatusLogSerializer(read_only=True, many=True)
 
+    select_related = ("customer",)
+    prefetch_related = ("charges", "state_logs")
+
     class Meta:
         model = Invoice
         fields = "__all__"
@@ -282,54 +511,26 @@ class InvoiceSerializer(DynamicFieldsModelSerializer, NestedObjectSerializer):
 
     @transaction.atomic
     def update(self, invoice: Invoice, validated_data):
-        charges_data = validated_data.pop("charges") or []
-
-        charges = []
-        for charge_data in charges_data:
-            charge_data.invoice = invoice
-            charge_data.customer = invoice.customer
-
-            try:
-                charge_id = charge_data.pop("id")
-                charge = Charge.objects.get(id=charge_id)
-            except KeyError:
-                charge = None
-
-            charge_serializer: ChargeSerializer = ChargeSerializer(data=charge_data, instance=charge)
-            if charge_serializer.is_valid():
-                charge = charge_serializer.save()
-                charge.invoice = invoice
-                charge.save()
-                charges.append(charge)
-
-        ids = list(map(lambda c: c.id, charges))
+        charges = validated_data.pop("charges", None)
+        invoice = super().update(invoice, validated_data)
 
-        for charge in invoice.charges.all():
-            if charge.id not in ids:
-                charge.delete()
-
-        return super().update(invoice, validated_data)
+        # A partial update that leaves out the charges leaves them be
+        if charges is not None:
+            write_charges(invoice, charges, by=self._user())
+        return invoice
 
     @transaction.atomic
     def create(self, validated_data):
-        charges_data = validated_data["charges"] or []
-        del validated_data["charges"]
+        charges = validated_data.pop("charges", [])
         invoice = super().create(validated_data)
 
-        charges = []
-        for charge_data in charges_data:
-            charge_data.invoice = invoice
-            charge_data.customer = invoice.customer
-
-            charge_serializer: ChargeSerializer = ChargeSerializer(data=charge_data)
-            if charge_serializer.is_valid():
-                charge = charge_serializer.save()
-                charge.invoice = invoice
-                charge.save()
-                charges.append(charge)
-
+        write_charges(invoice, charges, by=self._user())
         return invoice
 
+    def _user(self) -> User | None:
+        request = self.context.get("request")
+        return request.user if request and request.user.is_authenticated else None
+
 
 class InvoiceSendSerializer(serializers.Serializer):
     to = serializers.EmailField(default="")
@@ -0,0 +1,129 @@
+# Django
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+# Third Party
+from taggit.models import Tag
+
+# Locals
+from .models import (
+    Booking,
+    BookingSlot,
+    Charge,
+    Contact,
+    Customer,
+    CustomerBalance,
+    CustomerIssue,
+    Invoice,
+    Payment,
+    Pet,
+    SearchEntry,
+    Service,
+    Vet,
+)
+from .overview import invalidate_overview
+from .reference_data import invalidate_reference_data
+
+
+@receiver(m2m_changed, sender=Booking.pets.through)
+def update_slot_pet_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    # Pets are added after the booking is saved, so the pet limit can only be
+    # checked here. The add runs in a transaction, so raising undoes it.
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            if action == "post_add":
+                BookingSlot.lock(instance._booking_slot_id)
+            instance.update_slot_counts()
+            if action == "post_add":
+                BookingSlot.check_pet_capacity(instance._booking_slot_id)
+        return
+
+    match action:
+        case "pre_clear":
+            instance._cleared_slot_ids = list(instance.bookings.values_list("_booking_slot", flat=True))
+        case "post_clear":
+            BookingSlot.update_counts(*getattr(instance, "_cleared_slot_ids", []))
+        case "post_add" | "post_remove":
+            slot_ids = list(Booking.objects.filter(pk__in=pk_set).values_list("_booking_slot", flat=True))
+            if action == "post_add":
+                BookingSlot.lock(*slot_ids)
+            BookingSlot.update_counts(*slot_ids)
+            if action == "post_add":
+                BookingSlot.check_pet_capacity(*slot_ids)
+
+
+@receiver(post_delete, sender=Booking)
+def update_slot_counts_on_delete(sender, instance: Booking, **kwargs):
+    BookingSlot.update_counts(instance._booking_slot_id)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def update_invoice_totals(sender, instance, update_fields=None, **kwargs):
+    if not isinstance(instance, Charge | Payment):
+        return
+
+    previous = getattr(instance, "_loaded_invoice_id", instance.invoice_id)
+    instance._loaded_invoice_id = instance.invoice_id
+    # Paying a charge on a sent invoice saves everything but the amounts
+    if previous == instance.invoice_id and update_fields and not {"line", "quantity", "amount"} & set(update_fields):
+        return
+
+    Invoice.update_totals(previous, instance.invoice_id)
+    CustomerBalance.update_for_invoices(previous, instance.invoice_id)
+
+    if instance.invoice_id is not None and type(instance).invoice.is_cached(instance):
+        instance.invoice.refresh_totals()
+
+
+@receiver(post_save, sender=Customer)
+def create_customer_balance(sender, instance: Customer, created: bool, **kwargs):
+    if created:
+        CustomerBalance.objects.get_or_create(customer=instance)
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def update_customer_balance(sender, instance: Invoice, update_fields=None, **kwargs):
+    previous = getattr(instance, "_loaded_customer_id", instance.customer_id)
+    instance._loaded_customer_id = instance.customer_id
+    if previous == instance.customer_id and update_fields and not {"state", "adjustment"} & set(update_fields):
+        return
+
+    CustomerBalance.update_for(previous, instance.customer_id)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_invoice_overview(sender, instance, **kwargs):
+    if isinstance(instance, Invoice | Charge | Payment):
+        invalidate_overview()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_reference_data_bundle(sender, instance, **kwargs):
+    if isinstance(instance, Service | Vet | Tag | Customer | Pet):
+        invalidate_reference_data()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def update_customer_issues(sender, instance, origin=None, **kwargs):
+    if isinstance(instance, Customer):
+        CustomerIssue.update_for(*CustomerIssue.affected_by(instance))
+    elif isinstance(instance, Contact) and not isinstance(origin, Customer):
+        # Unless the contact is going because its customer is
+        CustomerIssue.update_for(instance.customer_id)
+
+
+@receiver(post_save)
+def index_for_search(sender, instance, **kwargs):
+    if isinstance(instance, Customer | Pet | Contact | Vet):
+        SearchEntry.index(instance)
+
+
+@receiver(post_delete)
+def unindex_for_search(sender, instance, **kwargs):
+    if isinstance(instance, Customer | Pet | Contact | Vet):
+        SearchEntry.unindex(instance)
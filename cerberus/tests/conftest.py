@@ -0,0 +1,54 @@
+# Standard Library
+from collections.abc import Generator
+from datetime import date, datetime, timedelta
+
+# Django
+from django.core.cache import cache
+
+# Third Party
+import pytest
+from model_bakery import baker
+
+# Locals
+from ..models import Booking, Customer, Pet, Service
+from ..utils import make_aware
+
+DAY = date(2024, 4, 1)
+
+
+def at(hour: float, days: int = 0) -> datetime:
+    return make_aware(DAY) + timedelta(days=days, hours=hour)
+
+
+def book(service: Service, start: datetime, end: datetime | None = None, pets: int = 1, **kwargs) -> Booking:
+    customer = baker.make(Customer)
+    return baker.make(
+        Booking,
+        service=service,
+        customer=customer,
+        start=start,
+        end=end or start + timedelta(hours=1),
+        pets=baker.make(Pet, customer=customer, _quantity=pets),
+        **kwargs,
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> Generator[None, None, None]:
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def in_memory_storage(settings) -> Generator[None, None, None]:
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+    }
+    yield
+
+
+@pytest.fixture
+def walk_service() -> Generator[Service, None, None]:
+    yield baker.make(Service, name="Walk", max_pet=4, max_customer=2)
@@ -0,0 +1,132 @@
+# Standard Library
+import re
+from datetime import timedelta
+
+# Django
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+from django.utils.timezone import now
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..forms import BookingForm
+from ..models import Booking, Customer, Pet, Service
+
+
+@pytest.fixture
+def api_client() -> APIClient:
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    return client
+
+
+@pytest.fixture
+def client() -> Client:
+    client = Client()
+    client.force_login(baker.make(User))
+    return client
+
+
+@pytest.fixture
+def customer() -> Customer:
+    return baker.make(Customer, first_name="Alice", last_name="Smith")
+
+
+@pytest.mark.django_db
+def test_customer_api(api_client: APIClient, customer: Customer):
+    baker.make(Customer, first_name="Alison", last_name="Jones")
+    baker.make(Customer, first_name="Alice", last_name="Brown", active=False)
+    baker.make(Customer, first_name="Bob", last_name="Smith")
+
+    response = api_client.get("/api/customer/autocomplete/", {"q": "ali smi"})
+
+    assert response.status_code == 200
+    assert response.data == [{"id": customer.pk, "name": "Alice Smith"}]
+    assert len(api_client.get("/api/customer/autocomplete/", {"q": "ali"}).data) == 2
+    assert len(api_client.get("/api/customer/autocomplete/", {"q": "ali", "limit": 1}).data) == 1
+    assert api_client.get("/api/customer/autocomplete/").status_code == 400
+    assert api_client.get("/api/customer/autocomplete/", {"q": "ali", "limit": 500}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_pet_api(api_client: APIClient, customer: Customer):
+    rex = baker.make(Pet, name="Rex", customer=customer)
+    bella = baker.make(Pet, name="Bella", customer=customer)
+    baker.make(Pet, name="Retired", customer=customer, active=False)
+    baker.make(Pet, name="Rover")
+
+    def pet_ids(**params) -> list[int]:
+        return sorted(pet["id"] for pet in api_client.get("/api/pet/autocomplete/", params).data)
+
+    assert pet_ids(customer=customer.pk) == [rex.pk, bella.pk]
+    assert pet_ids(customer=customer.pk, q="re") == [rex.pk]
+    assert len(pet_ids(q="r")) == 2
+    assert api_client.get("/api/pet/autocomplete/").status_code == 400
+
+
+@pytest.mark.django_db
+def test_customer_results(client: Client, customer: Customer):
+    response = client.get(reverse("customer_autocomplete"), {"q": "smi"})
+
+    assert response.status_code == 200
+    assert "Alice Smith" in response.content.decode()
+    assert "No matches" in client.get(reverse("customer_autocomplete"), {"q": "nobody"}).content.decode()
+
+
+@pytest.mark.django_db
+def test_pets_field(client: Client, customer: Customer):
+    rex = baker.make(Pet, name="Rex", customer=customer)
+    retired = baker.make(Pet, name="Retired", customer=customer, active=False)
+    baker.make(Pet, name="Rover")
+
+    response = client.get(reverse("booking_pets"), {"customer": customer.pk})
+
+    html = response.content.decode()
+    assert response.status_code == 200
+    assert "Rover" not in html
+    assert sorted(re.findall(r'value="(\d+)"', html)) == sorted([str(rex.pk), str(retired.pk)])
+    assert re.findall(r'value="(\d+)"[^>]*checked', html) == [str(rex.pk)]
+    assert "Rex" not in client.get(reverse("booking_pets")).content.decode()
+
+
+@pytest.mark.django_db
+def test_create_form_reads_no_choices(client: Client, django_assert_max_num_queries):
+    baker.make(Service)
+    for _ in range(30):
+        baker.make(Pet, customer=baker.make(Customer))
+
+    # The service select is the only list of choices still rendered
+    with django_assert_max_num_queries(5):
+        response = client.get(reverse("booking_create"))
+
+    assert response.status_code == 200
+    assert 'name="pets"' not in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_form_only_accepts_customers_pets(customer: Customer, walk_service: Service):
+    rex = baker.make(Pet, customer=customer)
+    other = baker.make(Pet)
+    start = now().replace(microsecond=0) + timedelta(days=1)
+    data = {
+        "customer": customer.pk,
+        "service": walk_service.pk,
+        "cost_0": "10.00",
+        "cost_1": "GBP",
+        "cost_per_additional_0": "5.00",
+        "cost_per_additional_1": "GBP",
+        "start": start,
+        "end": start + timedelta(hours=1),
+    }
+
+    assert "pets" in BookingForm(data=data | {"pets": [rex.pk, other.pk]}).errors
+    form = BookingForm(data=data | {"pets": [rex.pk]})
+    assert form.is_valid(), form.errors
+    booking: Booking = form.save()
+    assert list(booking.pets.all()) == [rex]
+    assert list(BookingForm(instance=booking).fields["pets"].queryset) == [rex]
@@ -0,0 +1,110 @@
+# Standard Library
+from datetime import timedelta
+from io import StringIO
+
+# Django
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..availability import Window, find_availability
+from ..models import Booking, BookingSlot, Service
+from .conftest import DAY, at, book
+
+
+@pytest.mark.django_db
+def test_empty_day(walk_service: Service):
+    assert find_availability(walk_service, at(0), at(24)) == [Window(at(0), at(24), 4, 2)]
+
+
+@pytest.mark.django_db
+def test_gaps_and_joinable_slots(walk_service: Service):
+    other_service = baker.make(Service, max_pet=1, max_customer=1)
+    booking = book(walk_service, at(9), at(10))
+    book(other_service, at(11), at(12))
+    book(other_service, at(13), at(14))
+
+    assert find_availability(walk_service, at(8), at(18)) == [
+        Window(at(9), at(10), 3, 1, booking.booking_slot.pk),
+        Window(at(14), at(18), 4, 2),
+    ]
+
+
+@pytest.mark.django_db
+def test_full_slots_are_not_available(walk_service: Service):
+    book(walk_service, at(9), at(10), pets=4)
+    baker.make(BookingSlot, start=at(12), end=at(13))
+
+    assert find_availability(walk_service, at(9), at(14)) == [Window(at(10), at(14), 4, 2)]
+
+
+@pytest.mark.django_db
+def test_single_query(walk_service: Service, django_assert_num_queries):
+    for hour in range(0, 24, 3):
+        book(walk_service, at(hour), at(hour + 1))
+
+    with django_assert_num_queries(1):
+        windows = find_availability(walk_service, at(0), at(24))
+
+    assert len(windows) == 16
+
+
+@pytest.mark.django_db
+def test_free_windows_split_by_day(walk_service: Service):
+    windows = find_availability(walk_service, at(12), at(12, days=2))
+
+    assert windows == [
+        Window(at(12), at(24), 4, 2),
+        Window(at(0, days=1), at(24, days=1), 4, 2),
+        Window(at(0, days=2), at(12, days=2), 4, 2),
+    ]
+
+
+@pytest.mark.django_db
+def test_gap_and_last_slot_queries(walk_service: Service, django_assert_num_queries):
+    for hour in (1, 2, 3, 8, 9):
+        book(walk_service, at(hour), pets=4)
+
+    with django_assert_num_queries(1):
+        windows = find_availability(walk_service, at(0), at(24))
+
+    assert windows == [Window(at(4), at(8), 4, 2), Window(at(10), at(24), 4, 2)]
+
+
+@pytest.mark.django_db
+def test_benchmark():
+    out = StringIO()
+
+    call_command("benchmark_availability", "--repeat", "1", stdout=out)
+
+    assert out.getvalue().startswith("Found 2500 windows among 50000 bookings over 92 days")
+    assert not BookingSlot.objects.exists()
+
+
+@pytest.mark.django_db
+def test_api(walk_service: Service):
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    book(walk_service, at(9), at(10))
+
+    response = client.get(f"/api/service/{walk_service.pk}/availability/", {"from": DAY, "to": DAY})
+
+    assert response.status_code == 200
+    assert [window["slot"] for window in response.data] == [None, Booking.objects.get().booking_slot.pk, None]
+
+
+@pytest.mark.django_db
+def test_api_invalid_range(walk_service: Service):
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+
+    response = client.get(
+        f"/api/service/{walk_service.pk}/availability/", {"from": DAY, "to": DAY - timedelta(days=1)}
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,111 @@
+# Standard Library
+from datetime import date, timedelta
+from io import StringIO
+
+# Django
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..billing import billing_run
+from ..models import Charge, Customer, Invoice, OutboxMessage
+
+
+def make_charges(customer: Customer, count: int = 2, **kwargs) -> list[Charge]:
+    return [baker.make(Charge, name="line", line=10, customer=customer, **kwargs) for _ in range(count)]
+
+
+@pytest.mark.django_db
+def test_billing_run(django_assert_max_num_queries):
+    customers = baker.make(Customer, _quantity=5)
+    charges = {customer.pk: make_charges(customer, 3) for customer in customers}
+
+    # None of these should be invoiced
+    already = baker.make(Invoice, customer=customers[0])
+    make_charges(customers[0], 1, invoice=already)
+    make_charges(customers[0], 1, state=Charge.States.VOID.value)
+    later = make_charges(customers[1], 1)
+    Charge.objects.filter(pk=later[0].pk).update(created=later[0].created + timedelta(days=7))
+
+    # One query to read the charges, one for the customers, one insert and an update per invoice
+    with django_assert_max_num_queries(5 + len(customers)):
+        report = billing_run(date.today())
+
+    assert (report.invoices, report.charges, report.sent) == (5, 15, 0)
+    assert not Invoice.mismatched_totals().exists()
+
+    for customer in customers:
+        invoice = Invoice.objects.exclude(pk=already.pk).get(customer=customer)
+        assert invoice.customer_name == customer.name
+        assert {charge.pk for charge in invoice.charges.all()} == {charge.pk for charge in charges[customer.pk]}
+
+    assert billing_run(date.today()) == (0, 0, 0, pytest.approx(0, abs=1))
+    assert billing_run(date.today() + timedelta(days=7)).charges == 1
+
+
+@pytest.mark.django_db
+def test_billing_run_period():
+    customer = baker.make(Customer)
+    old, new = make_charges(customer)
+    Charge.objects.filter(pk=old.pk).update(created=old.created - timedelta(days=40))
+
+    report = billing_run(date.today(), start=date.today() - timedelta(days=30))
+
+    assert report.charges == 1
+    assert Charge.objects.get(pk=old.pk).invoice is None
+    assert Charge.objects.get(pk=new.pk).invoice is not None
+
+
+@pytest.mark.django_db
+def test_billing_run_dry_run():
+    make_charges(baker.make(Customer))
+
+    assert billing_run(date.today(), dry_run=True)[:2] == (1, 2)
+    assert not Invoice.objects.exists()
+
+
+@pytest.mark.django_db
+def test_billing_run_send():
+    ready = baker.make(Customer, invoice_email="test@example.com")
+    no_email = baker.make(Customer, invoice_email="")
+    make_charges(ready)
+    make_charges(no_email)
+
+    report = billing_run(date.today(), send=True)
+
+    assert (report.invoices, report.sent) == (2, 1)
+    assert Invoice.objects.get(customer=ready).state == Invoice.States.UNPAID.value
+    assert Invoice.objects.get(customer=no_email).state == Invoice.States.DRAFT.value
+    assert OutboxMessage.objects.filter(invoice__customer=ready).count() == 1
+
+
+@pytest.mark.django_db
+def test_billing_run_api():
+    make_charges(baker.make(Customer))
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+
+    response = client.put("/api/invoice/billing_run/", {"dry_run": True}, format="json")
+    assert (response.status_code, response.data["invoices"], response.data["charges"]) == (200, 1, 2)
+
+    response = client.put("/api/invoice/billing_run/", {"from": date.today(), "to": date(2000, 1, 1)}, format="json")
+    assert response.status_code == 400
+
+    response = client.put("/api/invoice/billing_run/", {}, format="json")
+    assert response.data["invoices"] == 1
+    assert Invoice.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_billing_run_command():
+    make_charges(baker.make(Customer))
+    out = StringIO()
+
+    call_command("billing_run", "--to", date.today().isoformat(), stdout=out)
+
+    assert out.getvalue().startswith("Created 1 invoices for 2 charges, sent 0")
@@ -0,0 +1,118 @@
+# Standard Library
+from collections.abc import Generator
+from datetime import date, time, timedelta
+
+# Django
+from django.contrib.auth.models import User
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..models import Booking, BookingSeries, Customer, Pet, Service
+from ..utils import make_aware
+
+MONDAY = date(2024, 4, 1)
+
+
+@pytest.fixture
+def walk_service() -> Generator[Service, None, None]:
+    yield baker.make(Service, max_pet=4, max_customer=4, length=timedelta(hours=1))
+
+
+@pytest.fixture
+def customer() -> Generator[Customer, None, None]:
+    yield baker.make(Customer)
+
+
+@pytest.fixture
+def series(customer: Customer, walk_service: Service) -> Generator[BookingSeries, None, None]:
+    series = baker.make(
+        BookingSeries,
+        customer=customer,
+        service=walk_service,
+        start_date=MONDAY,
+        end_date=MONDAY + timedelta(days=13),
+        weekdays=[BookingSeries.Weekday.MONDAY, BookingSeries.Weekday.WEDNESDAY, BookingSeries.Weekday.FRIDAY],
+        time=time(10),
+        length=None,
+    )
+    series.pets.set(baker.make(Pet, customer=customer, _quantity=2))
+    yield series
+
+
+@pytest.mark.django_db
+def test_occurrences(series: BookingSeries):
+    occurrences = list(series.occurrences())
+
+    assert [o.start.date() for o in occurrences] == [MONDAY + timedelta(days=d) for d in (0, 2, 4, 7, 9, 11)]
+    assert all(o.end - o.start == timedelta(hours=1) for o in occurrences)
+
+
+@pytest.mark.django_db
+def test_book(series: BookingSeries, django_assert_max_num_queries):
+    with django_assert_max_num_queries(9):
+        bookings, conflicts = series.book()
+
+    assert conflicts == []
+    assert len(bookings) == 6
+    assert Booking.objects.filter(series=series).count() == 6
+    assert all(booking.pets.count() == 2 for booking in Booking.objects.filter(series=series))
+
+
+@pytest.mark.django_db
+def test_book_reports_conflicts(series: BookingSeries):
+    start = make_aware(MONDAY + timedelta(days=2)) + timedelta(hours=10, minutes=30)
+    baker.make(Booking, start=start, end=start + timedelta(hours=1))
+
+    bookings, conflicts = series.book()
+
+    assert len(bookings) == 5
+    assert [(c.start.date(), c.reason) for c in conflicts] == [(start.date(), "Booking overlaps another")]
+
+
+@pytest.mark.django_db
+def test_book_joins_matching_slots(series: BookingSeries, walk_service: Service):
+    start = make_aware(MONDAY) + timedelta(hours=10)
+    other = baker.make(Booking, service=walk_service, start=start, end=start + timedelta(hours=1))
+
+    bookings, conflicts = series.book()
+
+    assert conflicts == []
+    assert bookings[0].booking_slot == other.booking_slot
+
+
+@pytest.mark.django_db
+def test_book_twice(series: BookingSeries):
+    series.book()
+    bookings, conflicts = series.book()
+
+    assert bookings == []
+    assert len(conflicts) == 6
+
+
+@pytest.mark.django_db
+def test_api_create(customer: Customer, walk_service: Service):
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    pet = baker.make(Pet, customer=customer)
+
+    response = client.post(
+        "/api/bookingseries/",
+        {
+            "customer": customer.pk,
+            "service": walk_service.pk,
+            "pets": [pet.pk],
+            "start_date": MONDAY,
+            "end_date": MONDAY + timedelta(days=6),
+            "weekdays": [0, 4],
+            "time": "09:00",
+        },
+        format="json",
+    )
+
+    assert response.status_code == 201
+    assert len(response.data["bookings"]) == 2
+    assert response.data["conflicts"] == []
@@ -2,9 +2,11 @@
 from collections.abc import Callable, Generator
 from datetime import datetime, timedelta
 from functools import partial
+from io import StringIO
 
 # Django
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.db.utils import IntegrityError
 from django.utils.timezone import make_aware
 
@@ -17,11 +19,6 @@ from ..exceptions import MaxCustomersError, MaxPetsError
 from ..models import Booking, BookingSlot, Charge, Customer, Pet, Service
 
 
-@pytest.fixture
-def walk_service() -> Generator[Service, None, None]:
-    yield baker.make(Service, max_pet=4, max_customer=2)
-
-
 @pytest.fixture
 def customer() -> Generator[Customer, None, None]:
     yield baker.make(Customer)
@@ -137,6 +134,8 @@ def test_pet_count(walk_service, make_pet):
         pets=[make_pet()],
     ).booking_slot
 
+    booking_slot_1.refresh_counts()
+
     assert booking_slot_1.pk == booking_slot_2.pk
     assert booking_slot_1.pet_count == 2
 
@@ -161,6 +160,8 @@ def test_customer_count(walk_service):
         customer=baker.make(Customer),
     ).booking_slot
 
+    booking_slot_1.refresh_counts()
+
     assert booking_slot_1.pk == booking_slot_2.pk
     assert booking_slot_1.customer_count == 2
 
@@ -367,3 +368,159 @@ def test_move_booking(booking):
 @pytest.mark.django_db
 def test_length_seconds(booking):
     assert booking.length_seconds() == 3600  # 1 hour = 3600 seconds
+
+
+@pytest.mark.django_db
+@pytest.mark.freeze_time("2017-05-21")
+def test_has_overlap_shared_start(now):
+    start = BookingSlot.round_date_time(now + timedelta(hours=1))
+    baker.make(Booking, start=start, end=start + timedelta(hours=2), _booking_slot=None)
+
+    slot = baker.make(BookingSlot, start=start, end=start + timedelta(hours=1))
+
+    assert slot.overlaps() is True
+
+
+@pytest.mark.django_db
+@pytest.mark.freeze_time("2017-05-21")
+def test_empty_slots_do_not_overlap(now):
+    start = BookingSlot.round_date_time(now + timedelta(hours=1))
+    baker.make(BookingSlot, start=start, end=start + timedelta(hours=2))
+
+    slot = baker.make(BookingSlot, start=start + timedelta(hours=1), end=start + timedelta(hours=3))
+
+    assert slot.overlaps() is False
+
+
+@pytest.mark.django_db
+@pytest.mark.freeze_time("2017-05-21")
+def test_occupied_between(now, django_assert_num_queries):
+    start = BookingSlot.round_date_time(now + timedelta(hours=1))
+    bookings = [
+        baker.make(Booking, start=start + timedelta(hours=i * 2), end=start + timedelta(hours=i * 2 + 1))
+        for i in range(3)
+    ]
+    baker.make(BookingSlot, start=start + timedelta(hours=7), end=start + timedelta(hours=8))
+
+    with django_assert_num_queries(1):
+        index = BookingSlot.occupied_between(start, start + timedelta(hours=9))
+
+    assert len(index) == 3
+    hits = index.overlapping(start + timedelta(minutes=30), start + timedelta(hours=2, minutes=30))
+    assert [hit.item for hit in hits] == [bookings[0].booking_slot, bookings[1].booking_slot]
+
+
+@pytest.mark.django_db
+@pytest.mark.freeze_time("2017-05-21")
+def test_slot_counts_follow_pets(now, walk_service, customer, make_pet):
+    pets = [make_pet(customer=customer), make_pet(customer=customer)]
+    start = BookingSlot.round_date_time(now + timedelta(hours=1))
+    booking = baker.make(
+        Booking, start=start, end=start + timedelta(hours=1), service=walk_service, customer=customer, pets=pets
+    )
+
+    slot = booking.booking_slot
+    slot.refresh_counts()
+    assert (slot.pet_count, slot.customer_count, slot.service) == (2, 1, walk_service)
+
+    booking.pets.remove(pets[0])
+    slot.refresh_counts()
+    assert slot.pet_count == 1
+
+    pets[1].bookings.clear()
+    slot.refresh_counts()
+    assert slot.pet_count == 0
+
+
+@pytest.mark.django_db
+@pytest.mark.freeze_time("2017-05-21")
+def test_slot_counts_follow_cancel(now, walk_service, customer, make_pet, settings):
+    settings.COLLECT_EMPTY_SLOTS = False
+    start = BookingSlot.round_date_time(now + timedelta(hours=1))
+    booking = baker.make(
+        Booking, start=start, end=start + timedelta(hours=1), service=walk_service, customer=customer, pets=[make_pet()]
+    )
+    slot = booking.booking_slot
+
+    booking.cancel()
+
+    slot.refresh_counts()
+    assert (slot.pet_count, slot.customer_count, slot.service) == (0, 0, None)
+    assert slot.overlaps() is False
+
+
+@pytest.mark.django_db
+@pytest.mark.freeze_time("2017-05-21")
+def test_slot_counts_follow_move(now, walk_service, customer, make_pet):
+    start = BookingSlot.round_date_time(now + timedelta(hours=1))
+    booking = baker.make(
+        Booking, start=start, end=start + timedelta(hours=1), service=walk_service, customer=customer, pets=[make_pet()]
+    )
+    old_slot = booking.booking_slot
+
+    assert booking.move_booking(start + timedelta(days=1)) is True
+
+    new_slot = BookingSlot.objects.get(pk=booking.booking_slot.pk)
+    assert (new_slot.pet_count, new_slot.customer_count) == (1, 1)
+    assert not BookingSlot.objects.filter(pk=old_slot.pk, customer_count__gt=0).exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.freeze_time("2017-05-21")
+def test_rebuild_slot_counts(now, walk_service, customer, make_pet):
+    start = BookingSlot.round_date_time(now + timedelta(hours=1))
+    booking = baker.make(
+        Booking, start=start, end=start + timedelta(hours=1), service=walk_service, customer=customer, pets=[make_pet()]
+    )
+    BookingSlot.objects.update(pet_count=0, customer_count=0, service=None)
+
+    call_command("rebuild_slot_counts")
+
+    slot = BookingSlot.objects.get(pk=booking.booking_slot.pk)
+    assert (slot.pet_count, slot.customer_count, slot.service) == (1, 1, walk_service)
+
+
+@pytest.mark.django_db
+@pytest.mark.freeze_time("2017-05-21")
+def test_cancel_collects_empty_slot(now, walk_service, customer):
+    start = BookingSlot.round_date_time(now + timedelta(hours=1))
+    kept = baker.make(BookingSlot, start=start + timedelta(hours=3), end=start + timedelta(hours=4))
+    booking = baker.make(Booking, start=start, end=start + timedelta(hours=1), service=walk_service, customer=customer)
+    slot = booking.booking_slot
+
+    booking.cancel()
+
+    assert not BookingSlot.objects.filter(pk=slot.pk).exists()
+    assert BookingSlot.objects.filter(pk=kept.pk).exists()
+
+
+@pytest.mark.django_db
+@pytest.mark.freeze_time("2017-05-21")
+def test_collect_empty(now, walk_service, customer, django_assert_num_queries):
+    start = BookingSlot.round_date_time(now + timedelta(hours=1))
+    booking = baker.make(Booking, start=start, end=start + timedelta(hours=1), service=walk_service, customer=customer)
+    for hour in range(2, 7):
+        baker.make(BookingSlot, start=start + timedelta(hours=hour), end=start + timedelta(hours=hour, minutes=30))
+
+    # Pins the private _raw_delete: each chunk must stay a single DELETE
+    with django_assert_num_queries(3) as context:
+        report = BookingSlot.collect_empty(chunk_size=3)
+
+    deletes = [query["sql"] for query in context.captured_queries[1:]]
+    assert all(sql.startswith("DELETE") and "NOT EXISTS" in sql for sql in deletes)
+
+    assert (report.scanned, report.deleted) == (6, 5)
+    assert list(BookingSlot.objects.all()) == [booking.booking_slot]
+
+
+@pytest.mark.django_db
+def test_clean_slots_command():
+    start = BookingSlot.round_date_time(datetime.now())
+    for hour in range(3):
+        baker.make(BookingSlot, start=start + timedelta(hours=hour), end=start + timedelta(hours=hour + 1))
+    out = StringIO()
+
+    call_command("clean_slots", stdout=out)
+
+    assert "Scanned 3 slots, removed 3" in out.getvalue()
+    assert not BookingSlot.objects.exists()
@@ -0,0 +1,162 @@
+# Standard Library
+from collections.abc import Generator
+from datetime import date, timedelta
+
+# Django
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..models import Booking, Customer, Pet, Service
+from ..schedule import build_day_schedule
+from ..utils import make_aware
+
+DAY = date(2024, 4, 10)
+
+
+@pytest.fixture
+def bookings() -> Generator[list[Booking], None, None]:
+    service = baker.make(Service, max_pet=4, max_customer=4)
+    bookings = []
+    for day in range(10):
+        customer = baker.make(Customer)
+        start = make_aware(DAY) + timedelta(days=day, hours=10)
+        bookings.append(
+            baker.make(
+                Booking,
+                service=service,
+                customer=customer,
+                start=start,
+                end=start + timedelta(hours=1),
+                pets=baker.make(Pet, customer=customer, _quantity=2),
+            )
+        )
+
+    yield bookings
+
+
+def get_month(client: Client):
+    return client.get(reverse("booking_calender_month", kwargs={"year": DAY.year, "month": DAY.month}))
+
+
+@pytest.mark.django_db
+def test_month_queries(bookings: list[Booking], django_assert_max_num_queries):
+    client = Client()
+
+    with django_assert_max_num_queries(3):
+        response = get_month(client)
+
+    assert response.status_code == 200
+    assert response.content.count(b'class="booking"') == len(bookings)
+
+
+@pytest.mark.django_db
+def test_month_served_from_cache(bookings: list[Booking], django_assert_num_queries):
+    client = Client()
+    get_month(client)
+
+    with django_assert_num_queries(1):
+        response = get_month(client)
+
+    assert response.content.count(b'class="booking"') == len(bookings)
+
+
+@pytest.mark.django_db
+def test_month_cache_invalidated(bookings: list[Booking]):
+    client = Client()
+    get_month(client)
+
+    pet = bookings[0].pets.first()
+    pet.name = "Renamed"
+    pet.save()
+    bookings[0].save()
+
+    assert b"Renamed" in get_month(client).content
+
+
+@pytest.mark.django_db
+def test_day_schedule_includes_midnight():
+    customer = baker.make(Customer)
+    start = make_aware(DAY)
+    booking = baker.make(Booking, customer=customer, start=start, end=start + timedelta(hours=1))
+
+    schedule = build_day_schedule(DAY)
+
+    assert schedule.rows[0].time == start
+    assert schedule.rows[0].bookings == [booking]
+    assert Booking.get_mix_max_time(DAY) == (start, start + timedelta(hours=1))
+
+
+@pytest.mark.django_db
+def test_day_schedule_buckets_rows(bookings: list[Booking], django_assert_num_queries):
+    customer = baker.make(Customer)
+    start = make_aware(DAY) + timedelta(hours=12, minutes=20)
+    late = baker.make(Booking, customer=customer, start=start, end=start + timedelta(hours=1))
+
+    with django_assert_num_queries(3):
+        schedule = build_day_schedule(DAY)
+
+    by_time = {row.time: row.bookings for row in schedule.rows if row.bookings}
+    assert by_time == {
+        make_aware(DAY) + timedelta(hours=10): [bookings[0]],
+        make_aware(DAY) + timedelta(hours=12, minutes=15): [late],
+    }
+    assert schedule.rows[0].time == make_aware(DAY) + timedelta(hours=8)
+    assert schedule.rows[-1].time == make_aware(DAY) + timedelta(hours=17)
+
+
+@pytest.mark.django_db
+def test_day_schedule_groups_slots_in_a_row():
+    service = baker.make(Service, max_pet=4, max_customer=4)
+    start = make_aware(DAY) + timedelta(hours=10)
+    early, late, joined = (
+        baker.make(Booking, service=service, customer=baker.make(Customer), start=begin, end=end)
+        for begin, end in [
+            (start, start + timedelta(minutes=5)),
+            (start + timedelta(minutes=5), start + timedelta(minutes=30)),
+            (start, start + timedelta(minutes=5)),
+        ]
+    )
+
+    row = next(row for row in build_day_schedule(DAY).rows if row.bookings)
+
+    assert [(group.slot, group.bookings) for group in row.slots] == [
+        (early.booking_slot, [early, joined]),
+        (late.booking_slot, [late]),
+    ]
+
+    response = Client().get(
+        reverse("booking_calender_day", kwargs={"year": DAY.year, "month": DAY.month, "day": DAY.day})
+    )
+    assert response.content.count(b'class="booking-group"') == 2
+
+
+@pytest.mark.django_db
+def test_day_view(bookings: list[Booking], django_assert_max_num_queries):
+    client = Client()
+
+    with django_assert_max_num_queries(3):
+        response = client.get(
+            reverse("booking_calender_day", kwargs={"year": DAY.year, "month": DAY.month, "day": DAY.day})
+        )
+
+    assert response.status_code == 200
+    assert response.content.count(b'class="booking"') == 1
+
+
+@pytest.mark.django_db
+def test_day_api(bookings: list[Booking]):
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+
+    response = client.get("/api/booking/day/", {"date": DAY})
+
+    assert response.status_code == 200
+    rows = [row for row in response.data["rows"] if row["bookings"]]
+    assert [booking["id"] for row in rows for booking in row["bookings"]] == [bookings[0].pk]
@@ -0,0 +1,110 @@
+# Standard Library
+from datetime import datetime, timedelta
+from io import StringIO
+
+# Django
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+# Third Party
+import pytest
+from django_fsm_log.models import StateLog
+from model_bakery import baker
+from moneyed import Money
+from rest_framework.test import APIClient
+
+# Locals
+from ..models import Booking, BookingCharge, Charge, Service
+from ..models.booking import BookingStates
+from ..utils import make_aware
+from .conftest import book
+
+
+def make_booking(service: Service, days_ago: int, pets: int = 1, **kwargs) -> Booking:
+    start = make_aware(datetime.now()).replace(minute=0, second=0, microsecond=0) - timedelta(days=days_ago)
+    return book(service, start, pets=pets, state=BookingStates.CONFIRMED.value, **kwargs)
+
+
+@pytest.mark.django_db
+def test_complete_ended(walk_service: Service):
+    single = make_booking(walk_service, 1, cost=Money(10, "GBP"), cost_per_additional=None)
+    multiple = make_booking(walk_service, 2, pets=3, cost=Money(10, "GBP"), cost_per_additional=Money(5, "GBP"))
+    future = make_booking(walk_service, -1)
+
+    report = Booking.complete_ended()
+
+    assert (report.bookings, report.charges) == (2, 4)
+    assert set(Booking.objects.filter(state=BookingStates.COMPLETED.value)) == {single, multiple}
+    assert Booking.objects.get(pk=future.pk).state == BookingStates.CONFIRMED.value
+
+    charges = Charge.objects.filter(bookingcharge__booking=multiple).order_by("pk")
+    assert [charge.amount for charge in charges] == [Money(10, "GBP"), Money(5, "GBP"), Money(5, "GBP")]
+    assert all(isinstance(charge, BookingCharge) for charge in charges)
+    assert all(charge.customer == multiple.customer for charge in charges)
+
+    logs = StateLog.objects.for_(single)
+    assert [(log.source_state, log.state, log.transition) for log in logs] == [
+        (BookingStates.CONFIRMED.value, BookingStates.COMPLETED.value, "complete")
+    ]
+
+
+@pytest.mark.django_db
+def test_complete_ended_matches_complete(walk_service: Service):
+    bulk = make_booking(walk_service, 1, pets=2)
+    single = make_booking(walk_service, 2, pets=2)
+
+    single.complete()
+    Booking.complete_ended()
+
+    def charges(booking: Booking) -> list[tuple]:
+        return [(charge.name, charge.amount) for charge in BookingCharge.objects.filter(booking=booking).order_by("pk")]
+
+    assert [name for name, _ in charges(bulk)] == [f"Walk for {pet}"[:255] for pet in bulk.pets.all()]
+    assert [amount for _, amount in charges(bulk)] == [amount for _, amount in charges(single)]
+
+
+@pytest.mark.django_db
+def test_complete_ended_batches(walk_service: Service, django_assert_max_num_queries):
+    for days_ago in range(1, 21):
+        make_booking(walk_service, days_ago)
+
+    with django_assert_max_num_queries(20):
+        report = Booking.complete_ended(batch_size=10)
+
+    assert report.bookings == 20
+    assert BookingCharge.objects.count() == 20
+
+
+@pytest.mark.django_db
+def test_complete_ended_dry_run(walk_service: Service):
+    booking = make_booking(walk_service, 1)
+
+    report = Booking.complete_ended(dry_run=True)
+
+    assert (report.bookings, report.charges) == (1, 1)
+    assert Booking.objects.get(pk=booking.pk).state == BookingStates.CONFIRMED.value
+    assert not Charge.objects.exists()
+
+
+@pytest.mark.django_db
+def test_command(walk_service: Service):
+    make_booking(walk_service, 1)
+    out = StringIO()
+
+    call_command("complete_bookings", stdout=out)
+
+    assert out.getvalue().startswith("Completed 1 bookings with 1 charges")
+
+
+@pytest.mark.django_db
+def test_api(walk_service: Service):
+    user = baker.make(User)
+    client = APIClient()
+    client.force_authenticate(user)
+    booking = make_booking(walk_service, 1)
+
+    response = client.put("/api/booking/complete_ended/", {}, format="json")
+
+    assert response.status_code == 200
+    assert response.data["bookings"] == 1
+    assert StateLog.objects.for_(booking).get().by == user
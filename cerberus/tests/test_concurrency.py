@@ -0,0 +1,173 @@
+# Standard Library
+from collections import Counter
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Barrier
+from time import sleep
+from unittest import mock
+
+# Django
+from django.db import OperationalError, connection, transaction
+
+# Third Party
+import pytest
+from model_bakery import baker
+
+# Locals
+from ..exceptions import BookingSlotError, MaxPetsError, SlotChangedError
+from ..models import Booking, BookingSlot, Customer, Pet, Service
+from ..utils import is_lock_conflict
+
+WORKERS = 8
+
+
+def run_parallel(tasks: list[Callable[[], object]]) -> list[str]:
+    """Run the tasks in threads released together, each with its own database
+    connection, and return the name of the outcome of each."""
+    barrier = Barrier(len(tasks))
+
+    def run(task: Callable[[], object]) -> str:
+        barrier.wait()
+        try:
+            task()
+            return "ok"
+        except BookingSlotError as e:
+            return type(e).__name__
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(len(tasks)) as executor:
+        return list(executor.map(run, tasks))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_bookings_respect_capacity():
+    service = baker.make(Service, max_pet=WORKERS, max_customer=3)
+    customers = baker.make(Customer, _quantity=WORKERS)
+    start = BookingSlot.round_date_time(datetime.now() + timedelta(days=1))
+
+    def book(customer: Customer) -> Callable[[], None]:
+        return lambda: Booking(customer=customer, service=service, start=start, end=start + timedelta(hours=1)).save()
+
+    outcomes = Counter(run_parallel([book(customer) for customer in customers]))
+
+    slot = BookingSlot.objects.get()
+    assert outcomes == {"ok": 3, "MaxCustomersError": WORKERS - 3}
+    assert slot.customer_count == Booking.objects.filter(_booking_slot=slot).count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_pets_respect_capacity():
+    service = baker.make(Service, max_pet=3, max_customer=WORKERS)
+    start = BookingSlot.round_date_time(datetime.now() + timedelta(days=1))
+    bookings = []
+    for customer in baker.make(Customer, _quantity=WORKERS):
+        booking = Booking(customer=customer, service=service, start=start, end=start + timedelta(hours=1))
+        booking.save()
+        bookings.append((booking, baker.make(Pet, customer=customer, _quantity=2)))
+
+    def add_pets(booking: Booking, pets: list[Pet]) -> Callable[[], None]:
+        def task() -> None:
+            # SQLite's test database locks whole tables, so wait for the turn
+            # that a real database would get from the row lock
+            while True:
+                try:
+                    return booking.pets.set(pets)
+                except OperationalError as e:
+                    if not is_lock_conflict(e):
+                        raise
+                    sleep(0.01)
+
+        return task
+
+    outcomes = Counter(run_parallel([add_pets(booking, pets) for booking, pets in bookings]))
+
+    slot = BookingSlot.objects.get()
+    assert outcomes == {"ok": 1, "MaxPetsError": WORKERS - 1}
+    assert slot.pet_count == Booking.pets.through.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_pets_added_after_save_respect_capacity():
+    service = baker.make(Service, max_pet=3, max_customer=2)
+    start = BookingSlot.round_date_time(datetime.now() + timedelta(days=1))
+    customers = baker.make(Customer, _quantity=2)
+    bookings = [
+        baker.make(Booking, customer=customer, service=service, start=start, end=start + timedelta(hours=1))
+        for customer in customers
+    ]
+
+    bookings[0].pets.set(baker.make(Pet, customer=customers[0], _quantity=2))
+    with pytest.raises(MaxPetsError), transaction.atomic():
+        bookings[1].pets.set(baker.make(Pet, customer=customers[1], _quantity=2))
+
+    assert BookingSlot.objects.get().pet_count == 2
+    assert not bookings[1].pets.exists()
+
+
+@pytest.mark.django_db
+def test_get_slots_picks_up_existing_slots():
+    start = BookingSlot.round_date_time(datetime.now() + timedelta(days=1))
+    existing = baker.make(BookingSlot, start=start, end=start + timedelta(hours=1))
+    intervals = [(start, start + timedelta(hours=1)), (start + timedelta(hours=2), start + timedelta(hours=3))]
+
+    slots = BookingSlot.get_slots(intervals)
+
+    assert set(slots) == set(intervals)
+    assert slots[intervals[0]] == existing
+    assert BookingSlot.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_reserve_stale_slot():
+    start = BookingSlot.round_date_time(datetime.now() + timedelta(days=1))
+    slot = baker.make(BookingSlot, start=start, end=start + timedelta(hours=1))
+    stale = BookingSlot.objects.get(pk=slot.pk)
+
+    slot.reserve()
+
+    with pytest.raises(SlotChangedError):
+        stale.reserve()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_save_retries_stale_slot():
+    service = baker.make(Service, max_customer=2)
+    start = BookingSlot.round_date_time(datetime.now() + timedelta(days=1))
+    slot = baker.make(BookingSlot, start=start, end=start + timedelta(hours=1))
+    stale = BookingSlot.objects.get(pk=slot.pk)
+    baker.make(Booking, service=service, start=slot.start, end=slot.end, _booking_slot=slot)
+
+    with mock.patch.object(BookingSlot, "reserve", autospec=True, side_effect=BookingSlot.reserve) as reserve:
+        booking = baker.make(Booking, service=service, start=slot.start, end=slot.end, _booking_slot=stale)
+
+    assert reserve.call_count == 2
+    assert booking.booking_slot.customer_count == 2
+    assert BookingSlot.objects.get(pk=slot.pk).customer_count == 2
+
+
+@pytest.mark.django_db
+def test_save_in_transaction_does_not_retry():
+    service = baker.make(Service, max_customer=2)
+    start = BookingSlot.round_date_time(datetime.now() + timedelta(days=1))
+    slot = baker.make(BookingSlot, start=start, end=start + timedelta(hours=1))
+    stale = BookingSlot.objects.get(pk=slot.pk)
+    baker.make(Booking, service=service, start=slot.start, end=slot.end, _booking_slot=slot)
+
+    with mock.patch.object(BookingSlot, "reserve", autospec=True, side_effect=BookingSlot.reserve) as reserve:
+        with pytest.raises(SlotChangedError):
+            baker.make(Booking, service=service, start=slot.start, end=slot.end, _booking_slot=stale)
+
+    assert reserve.call_count == 1
+
+
+def test_only_lock_conflicts_are_retried():
+    assert is_lock_conflict(OperationalError("database is locked"))
+    assert not is_lock_conflict(OperationalError("no such column: cerberus_booking.start"))
+
+    with mock.patch.object(Booking, "_save", side_effect=OperationalError("no such column")) as save:
+        with pytest.raises(OperationalError):
+            Booking().save()
+
+    assert save.call_count == 1
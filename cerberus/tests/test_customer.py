@@ -2,20 +2,106 @@
 
 # Standard Library
 from collections.abc import Generator
+from datetime import date, timedelta
+
+# Django
+from django.contrib.auth.models import User
 
 # Third Party
 import pytest
 from model_bakery import baker
+from moneyed import Money
+from rest_framework.test import APIClient
 
 # Locals
-from ..models import Customer
+from ..models import Charge, Customer, CustomerBalance, Invoice
 
 
 @pytest.fixture
 def customer() -> Generator[Customer, None, None]:
-    yield baker.make(Customer)
+    yield baker.make(Customer, invoice_email="test@example.com")
 
 
 @pytest.mark.django_db
 def test_full_name(customer: Customer):
     assert customer.name == f"{customer.first_name} {customer.last_name}"
+
+
+def make_invoice(customer: Customer, amount: int = 10, **kwargs) -> Invoice:
+    invoice: Invoice = baker.make(Invoice, customer=customer, adjustment=0.0, **kwargs)
+    baker.make(Charge, name="line", line=amount, invoice=invoice)
+    return invoice
+
+
+def balance(customer: Customer) -> tuple[Money, int]:
+    customer_balance = CustomerBalance.objects.get(customer=customer)
+    return customer_balance.invoiced_unpaid, customer_balance.unpaid_count
+
+
+@pytest.mark.django_db
+def test_default_manager_is_plain(customer: Customer, django_assert_num_queries):
+    make_invoice(customer).send(send_email=False)
+
+    with django_assert_num_queries(1) as queries:
+        Customer.objects.get(pk=customer.pk)
+    assert "JOIN" not in queries.captured_queries[0]["sql"]
+
+    customer = Customer.objects.with_financials().get(pk=customer.pk)
+    assert (customer.invoiced_unpaid, customer.unpaid_count, customer.overdue_count) == (Money(10, "GBP"), 1, 0)
+
+
+@pytest.mark.django_db
+def test_balance_kept_up_to_date(customer: Customer):
+    assert balance(customer) == (Money(0, "GBP"), 0)
+
+    # Drafts don't count until they are sent
+    first = make_invoice(customer)
+    second = make_invoice(customer, 25)
+    assert balance(customer) == (Money(0, "GBP"), 0)
+
+    first.send(send_email=False)
+    second.send(send_email=False)
+    assert balance(customer) == (Money(35, "GBP"), 2)
+
+    # Charges changing the total of a sent invoice, as the admin can
+    Charge.objects.get(invoice=first).delete()
+    assert balance(customer) == (Money(25, "GBP"), 2)
+
+    first.pay()
+    assert balance(customer) == (Money(25, "GBP"), 1)
+
+    other = baker.make(Customer, invoice_email="other@example.com")
+    second.customer = other
+    second.save()
+    assert balance(customer) == (Money(0, "GBP"), 0)
+    assert balance(other) == (Money(25, "GBP"), 1)
+
+    second.delete()
+    assert balance(other) == (Money(0, "GBP"), 0)
+
+
+@pytest.mark.django_db
+def test_deleting_customer_with_invoices(customer: Customer):
+    invoice = make_invoice(customer)
+    invoice.send(send_email=False)
+
+    customer.delete()
+
+    assert not CustomerBalance.objects.exists()
+    assert Invoice.objects.get(pk=invoice.pk).customer is None
+
+
+@pytest.mark.django_db
+def test_api_sorts_by_balance():
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    customers = baker.make(Customer, invoice_email="test@example.com", _quantity=3)
+    for customer, amount in zip(customers, [20, 5, 10]):
+        make_invoice(customer, amount, due=date.today() - timedelta(days=1)).send(send_email=False)
+
+    response = client.get("/api/customer/", {"ordering": "-invoiced_unpaid"})
+
+    results = response.data["results"]
+    assert [result["id"] for result in results] == [customers[0].pk, customers[2].pk, customers[1].pk]
+    assert [result["invoiced_unpaid"] for result in results] == ["20.00", "10.00", "5.00"]
+    assert all(result["overdue_count"] == 1 for result in results)
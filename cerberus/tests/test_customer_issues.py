@@ -0,0 +1,137 @@
+# Standard Library
+from io import StringIO
+
+# Django
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..models import Contact, Customer, CustomerIssue, Invoice
+
+Kinds = CustomerIssue.Kinds
+
+
+def kinds(customer: Customer) -> set[str]:
+    return set(CustomerIssue.objects.filter(customer=customer).values_list("kind", flat=True))
+
+
+@pytest.fixture
+def customer() -> Customer:
+    customer = baker.make(Customer, first_name="Alice", last_name="Smith", invoice_email="alice@example.com")
+    baker.make(Contact, name="Mobile", details="07700 900123", customer=customer)
+    return customer
+
+
+@pytest.mark.django_db
+def test_rules_run_on_save():
+    customer = baker.make(Customer, last_name="Smith & Jones", invoice_email="")
+
+    assert kinds(customer) == {Kinds.NO_INVOICE_EMAIL, Kinds.BAD_LAST_NAME, Kinds.NO_CONTACT}
+    assert customer.issues == ["last name doesn't look right", "no invoice email set", "no contact details"]
+    assert CustomerIssue.objects.get(customer=customer, kind=Kinds.BAD_LAST_NAME).details == "Smith & Jones"
+
+    customer.invoice_email = "smith@example.com"
+    customer.last_name = "Smith"
+    customer.save()
+    contact = baker.make(Contact, customer=customer)
+    assert kinds(customer) == set()
+
+    contact.delete()
+    assert kinds(customer) == {Kinds.NO_CONTACT}
+
+    baker.make(Contact, customer=customer)
+    customer.delete()
+    assert not CustomerIssue.objects.exists()
+
+
+@pytest.mark.django_db
+def test_duplicate_email(customer: Customer):
+    other = baker.make(Customer, invoice_email="alice@example.com")
+    third = baker.make(Customer, invoice_email="alice@example.com")
+    assert Kinds.DUPLICATE_EMAIL in kinds(customer)
+
+    third.invoice_email = "third@example.com"
+    third.save()
+    assert Kinds.DUPLICATE_EMAIL in kinds(customer)
+    assert Kinds.DUPLICATE_EMAIL not in kinds(third)
+
+    other.invoice_email = "other@example.com"
+    other.save()
+    assert Kinds.DUPLICATE_EMAIL not in kinds(customer)
+
+    other.invoice_email = "alice@example.com"
+    other.save()
+    assert Kinds.DUPLICATE_EMAIL in kinds(customer)
+    other.delete()
+    assert Kinds.DUPLICATE_EMAIL not in kinds(customer)
+
+
+@pytest.mark.django_db
+def test_only_blocking_issues_stop_sending(customer: Customer, django_assert_num_queries):
+    baker.make(Customer, invoice_email=customer.invoice_email)
+    blocked = baker.make(Customer, invoice_email="")
+    baker.make(Invoice, customer=customer)
+    baker.make(Invoice, customer=blocked)
+
+    # Read along with the invoices rather than per invoice
+    invoices = list(Invoice.objects.order_by("pk"))
+    with django_assert_num_queries(0):
+        assert [invoice.can_send() for invoice in invoices] == [True, False]
+        assert [invoice.available_state_transitions for invoice in invoices] == [["send", "void"], ["void"]]
+
+    assert baker.make(Invoice, customer=customer).can_send()
+    assert not baker.make(Invoice, customer=None).can_send()
+
+
+@pytest.mark.django_db
+def test_needing_attention(customer: Customer):
+    no_email = baker.make(Customer, invoice_email="")
+    no_contact = baker.make(Customer, invoice_email="bob@example.com")
+
+    assert set(Customer.objects.needing_attention()) == {no_email, no_contact}
+    assert list(Customer.objects.needing_attention(blocking=True)) == [no_email]
+
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    response = client.get("/api/customer/", {"status": "ISSUES"})
+
+    found = {result["id"]: result["issues"] for result in response.data["results"]}
+    assert found == {
+        no_email.pk: ["no invoice email set", "no contact details"],
+        no_contact.pk: ["no contact details"],
+    }
+
+
+@pytest.mark.django_db
+def test_check_customers(customer: Customer):
+    other = baker.make(Customer, invoice_email="")
+    # Bulk updates don't send the signals that keep issues up to date
+    Customer.objects.filter(pk=customer.pk).update(invoice_email="")
+    CustomerIssue.objects.all().delete()
+    out = StringIO()
+
+    call_command("check_customers", "--chunk-size", "1", stdout=out)
+
+    assert out.getvalue().splitlines() == [
+        "Checked 2 customers, found 3 issues",
+        "  no invoice email set: 2",
+        "  no contact details: 1",
+    ]
+    assert kinds(customer) == {Kinds.NO_INVOICE_EMAIL}
+    assert kinds(other) == {Kinds.NO_INVOICE_EMAIL, Kinds.NO_CONTACT}
+
+
+@pytest.mark.django_db
+def test_fixcustomers(customer: Customer):
+    fixable = baker.make(Customer, first_name="Bob", last_name="Jones", invoice_email="")
+    baker.make(Contact, name="Email", details="bob@example.com", customer=fixable)
+
+    call_command("fixcustomers", stdout=StringIO())
+
+    assert Customer.objects.get(pk=fixable.pk).invoice_email == "bob@example.com"
+    assert kinds(fixable) == set()
@@ -0,0 +1,100 @@
+# Standard Library
+import io
+import zipfile
+from datetime import date
+from unittest import mock
+
+# Django
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.http import StreamingHttpResponse
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..exports import zip_stream
+from ..models import Charge, Customer, Invoice
+from ..rendering import PdfRenderer
+
+
+@pytest.fixture
+def client() -> APIClient:
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    return client
+
+
+def make_invoice() -> Invoice:
+    invoice: Invoice = baker.make(Invoice, customer=baker.make(Customer), adjustment=0.0)
+    baker.make(Charge, name="line", line=10, invoice=invoice)
+    return invoice
+
+
+def read_zip(response) -> zipfile.ZipFile:
+    return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+
+def test_zip_stream_yields_each_entry():
+    chunks = list(zip_stream([("a.txt", b"a" * 100), ("b.txt", b"b" * 100)]))
+
+    # One chunk per entry and one for the central directory
+    assert len(chunks) == 3
+    assert b"a" * 100 in chunks[0] and b"b" * 100 not in chunks[0]
+
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.testzip() is None
+    assert archive.read("b.txt") == b"b" * 100
+
+
+@pytest.mark.django_db
+def test_export(client: APIClient):
+    invoices = [make_invoice(), make_invoice()]
+    today = date.today().isoformat()
+
+    response = client.get("/api/invoice/export.zip/", {"from": today, "to": today})
+
+    assert response.status_code == 200
+    assert isinstance(response, StreamingHttpResponse)
+    assert response["Content-Type"] == "application/zip"
+
+    archive = read_zip(response)
+    assert archive.namelist() == [f"{invoice.name}.pdf" for invoice in invoices]
+    assert all(archive.read(name).startswith(b"%PDF") for name in archive.namelist())
+
+    # Rendered PDFs are kept, so a download afterwards doesn't render again
+    assert all(default_storage.exists(invoice.get_pdf_file().name) for invoice in invoices)
+
+
+@pytest.mark.django_db
+def test_export_filters(client: APIClient):
+    make_invoice()
+    void = make_invoice()
+    Invoice.objects.filter(pk=void.pk).update(state=Invoice.States.VOID.value)
+    today = date.today().isoformat()
+
+    response = client.get("/api/invoice/export.zip/", {"from": today, "to": today, "state": "void"})
+    assert read_zip(response).namelist() == [f"{void.name}.pdf"]
+
+    response = client.get("/api/invoice/export.zip/", {"from": "2000-01-01", "to": "2000-01-02"})
+    assert read_zip(response).namelist() == []
+
+    assert client.get("/api/invoice/export.zip/", {"from": today}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_export_streams_before_rendering_everything(client: APIClient):
+    invoices = [make_invoice() for _ in range(3)]
+    today = date.today().isoformat()
+
+    with mock.patch.object(PdfRenderer, "render", autospec=True, side_effect=lambda _, html: b"%PDF") as render:
+        response = client.get("/api/invoice/export.zip/", {"from": today, "to": today})
+        first = next(iter(response.streaming_content))
+
+        assert render.call_count == 1
+        assert invoices[0].name.encode() in first
+
+        b"".join(response.streaming_content)
+        assert render.call_count == 3
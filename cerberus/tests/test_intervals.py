@@ -0,0 +1,72 @@
+# Standard Library
+import random
+from datetime import datetime, timedelta
+
+# Third Party
+import pytest
+
+# Locals
+from ..intervals import Interval, IntervalIndex
+
+START = datetime(2024, 1, 1, 9)
+
+
+def at(hours: float) -> datetime:
+    return START + timedelta(hours=hours)
+
+
+@pytest.fixture
+def index() -> IntervalIndex[str]:
+    return IntervalIndex(
+        [
+            Interval(at(0), at(1), "a"),
+            Interval(at(2), at(3), "b"),
+            Interval(at(1), at(6), "long"),
+            Interval(at(4), at(5), "c"),
+        ]
+    )
+
+
+def test_overlapping(index: IntervalIndex[str]):
+    assert [i.item for i in index.overlapping(at(0.5), at(2.5))] == ["a", "long", "b"]
+
+
+def test_touching_is_not_overlapping(index: IntervalIndex[str]):
+    assert index.overlapping(at(-1), at(0)) == []
+    assert index.overlapping(at(6), at(7)) == []
+
+
+def test_contained_in_long_interval(index: IntervalIndex[str]):
+    assert [i.item for i in index.overlapping(at(3.25), at(3.75))] == ["long"]
+
+
+def test_add_and_remove(index: IntervalIndex[str]):
+    index.add(at(7), at(8), "d")
+    assert index.overlaps(at(7.5), at(9))
+
+    index.remove(at(7), at(8), "d")
+    assert not index.overlaps(at(7.5), at(9))
+    assert len(index) == 4
+
+
+def test_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    index: IntervalIndex[int] = IntervalIndex()
+
+    for item in range(500):
+        start = at(rng.randrange(0, 200) / 4)
+        interval = Interval(start, start + timedelta(minutes=rng.randrange(5, 240)), item)
+        intervals.append(interval)
+        index.add(*interval)
+
+    for interval in rng.sample(intervals, 200):
+        intervals.remove(interval)
+        index.remove(*interval)
+
+    assert list(index) == sorted(intervals, key=lambda i: (i.start, i.end, i.item))
+    for _ in range(100):
+        start = at(rng.randrange(0, 200) / 4)
+        end = start + timedelta(minutes=rng.randrange(1, 300))
+        expected = [i for i in intervals if i.start < end and i.end > start]
+        assert sorted(index.overlapping(start, end), key=lambda i: i.item) == sorted(expected, key=lambda i: i.item)
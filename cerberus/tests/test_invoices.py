@@ -2,19 +2,35 @@
 from collections.abc import Generator
 from datetime import date, timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
 # Django
 from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.template import loader
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
 # Third Party
 import pytest
 from django_fsm import TransitionNotAllowed
+from django_fsm_log.models import StateLog
+from mjml import mjml2html
 from model_bakery import baker
 from moneyed import Money
+from rest_framework.test import APIClient
+from xhtml2pdf import pisa
 from xhtml2pdf.context import pisaContext
 
 # Locals
-from ..models import Charge, Customer, Invoice, Payment
+from .. import emails
+from ..models import Charge, Customer, Invoice, OutboxMessage, Payment
 
 
 @pytest.fixture
@@ -22,6 +38,13 @@ def customer() -> Generator[Customer, None, None]:
     yield baker.make(Customer, invoice_email="test@example.com")
 
 
+@pytest.fixture
+def client() -> APIClient:
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    return client
+
+
 @pytest.fixture
 def invoice(customer) -> Generator[Invoice, None, None]:
     invoice: Invoice = baker.make(Invoice, customer=customer, adjustment=0.0)
@@ -62,6 +85,7 @@ def test_send_requires_customer():
 @pytest.mark.django_db
 def test_send_requires_invoice_email(customer: Customer):
     customer.invoice_email = ""
+    customer.save()
     inv = baker.make(Invoice, customer=customer)
 
     with pytest.raises(TransitionNotAllowed):
@@ -163,6 +187,63 @@ def test_create_partial_payments(invoice: Invoice):
     assert invoice.paid == invoice.total
 
 
+@pytest.mark.django_db
+def test_stored_totals(invoice: Invoice):
+    def stored():
+        return Invoice.objects.values_list("subtotal", "total", "paid_total").get(pk=invoice.pk)
+
+    assert stored() == (30, 30, 0)
+    assert (invoice.subtotal.amount, invoice.total.amount) == (30, 30)
+
+    invoice.adjustment = Money(-5, settings.DEFAULT_CURRENCY)
+    invoice.save()
+    assert stored() == (30, 25, 0)
+
+    charge = invoice.charges.first()
+    charge.quantity = 2
+    charge.save()
+    assert stored() == (40, 35, 0)
+    assert invoice.total.amount == 35
+
+    charge.void()
+    assert stored() == (20, 15, 0)
+
+    other = baker.make(Invoice)
+    moved = invoice.charges.first()
+    moved.invoice = other
+    moved.save()
+    assert stored() == (10, 5, 0)
+    assert Invoice.objects.values_list("total", flat=True).get(pk=other.pk) == 10
+
+    payment = baker.make(Payment, invoice=invoice, amount=Money(5, settings.DEFAULT_CURRENCY))
+    assert stored() == (10, 5, 5)
+    assert invoice.unpaid.amount == 0
+
+    payment.delete()
+    assert stored() == (10, 5, 0)
+    assert not Invoice.mismatched_totals().exists()
+
+
+@pytest.mark.django_db
+def test_totals_read_without_joins(invoice: Invoice):
+    assert "cerberus_charge" not in str(Invoice.objects.order_by("total").query)
+    assert "cerberus_charge" not in str(Invoice.objects.filter(pk=invoice.pk).query)
+
+
+@pytest.mark.django_db
+def test_rebuild_invoice_totals(invoice: Invoice):
+    out = StringIO()
+    call_command("rebuild_invoice_totals", "--check", stdout=out)
+    assert out.getvalue() == "All invoice totals match\n"
+
+    Invoice.objects.update(subtotal=0, total=0)
+    with pytest.raises(CommandError, match=f"1 invoices have wrong totals: {invoice.pk}"):
+        call_command("rebuild_invoice_totals", "--check")
+
+    call_command("rebuild_invoice_totals", stdout=out)
+    assert not Invoice.mismatched_totals().exists()
+
+
 @pytest.mark.django_db
 def test_totals_match():
     customers = []
@@ -177,7 +258,7 @@ def test_totals_match():
         invoice.send(send_email=False)
 
     total_totals = settings.DEFAULT_CURRENCY.zero
-    for customer in Customer.objects.all():
+    for customer in Customer.objects.with_financials():
         total = settings.DEFAULT_CURRENCY.zero
         for invoice in customer.invoices.all():
             total += invoice.total
@@ -186,3 +267,200 @@ def test_totals_match():
         total_totals += total
 
     assert total_totals > settings.DEFAULT_CURRENCY.zero
+
+
+def put_charges(client: APIClient, invoice: Invoice, charges: list[dict]):
+    return client.put(
+        f"/api/invoice/{invoice.pk}/",
+        {"customer_id": invoice.customer_id, "adjustment": "0.00", "charges": charges},
+        format="json",
+    )
+
+
+@pytest.mark.django_db
+def test_api_writes_charge_lines(client: APIClient, invoice: Invoice):
+    kept, dropped, changed = invoice.charges.order_by("pk")
+    lines = [
+        {"id": kept.pk, "name": kept.name, "line": "10.00"},
+        {"id": changed.pk, "name": "changed", "line": "15.00", "quantity": 2},
+        {"name": "new", "line": "5.00"},
+    ]
+
+    response = put_charges(client, invoice, lines)
+
+    assert response.status_code == 200
+    assert [charge["name"] for charge in response.data["charges"]] == ["line 0", "changed", "new"]
+    assert response.data["total"] == "45.00"
+
+    dropped = Charge.objects.get(pk=dropped.pk)
+    assert dropped.state == Charge.States.VOID.value and dropped.invoice is None
+    assert list(StateLog.objects.for_(dropped).values_list("transition", flat=True)) == ["void"]
+    assert not Invoice.mismatched_totals().exists()
+
+
+@pytest.mark.django_db
+def test_api_charge_lines_checked_first(client: APIClient, invoice: Invoice, customer: Customer):
+    other = baker.make(Charge, name="other", line=10, invoice=baker.make(Invoice, customer=customer))
+    paid = invoice.charges.first()
+    Charge.objects.filter(pk=paid.pk).update(state=Charge.States.PAID.value)
+
+    response = put_charges(client, invoice, [{"name": "new", "line": "5.00"}])
+    assert response.status_code == 400
+
+    response = put_charges(client, invoice, [{"id": paid.pk, "name": "x", "line": "1.00"}, {"id": other.pk}])
+    assert response.status_code == 400
+
+    # Nothing was written
+    assert list(invoice.charges.order_by("pk").values_list("name", flat=True)) == ["line 0", "line 1", "line 2"]
+    assert not Charge.objects.filter(state=Charge.States.VOID.value).exists()
+
+
+@pytest.mark.django_db
+def test_api_charge_line_queries(client: APIClient, customer: Customer):
+    def edit(count: int) -> int:
+        invoice: Invoice = baker.make(Invoice, customer=customer, adjustment=0.0)
+        charges = baker.make(Charge, name="line", line=10, invoice=invoice, _quantity=count * 2)
+        # Change half of the lines, drop the other half and add as many again
+        lines = [{"id": charge.pk, "name": "changed", "line": "12.00"} for charge in charges[:count]]
+        lines += [{"name": "new", "line": "8.00"} for _ in range(count)]
+
+        with CaptureQueriesContext(connection) as queries:
+            assert put_charges(client, invoice, lines).status_code == 200
+        return len(queries)
+
+    assert edit(2) == edit(20)
+
+
+@pytest.mark.django_db
+def test_update_view_writes_changed_lines(invoice: Invoice):
+    client = Client()
+    client.force_login(baker.make(User))
+    first, second, third = invoice.charges.order_by("pk")
+
+    data = {
+        "customer_name": "Someone",
+        "adjustment_0": "0.00",
+        "adjustment_1": "GBP",
+        "form-TOTAL_FORMS": "4",
+        "form-INITIAL_FORMS": "3",
+        "form-3-name": "new",
+        "form-3-line_0": "5.00",
+        "form-3-line_1": "GBP",
+        "form-3-quantity": "1",
+    }
+    for i, charge in enumerate([first, second, third]):
+        data |= {
+            f"form-{i}-id": charge.pk,
+            f"form-{i}-name": "changed" if charge == second else charge.name,
+            f"form-{i}-line_0": "10.00",
+            f"form-{i}-line_1": "GBP",
+            f"form-{i}-quantity": "1",
+        }
+
+    response = client.post(reverse("invoice_update", kwargs={"pk": invoice.pk}), data)
+
+    assert response.status_code == 302
+    invoice = Invoice.objects.get(pk=invoice.pk)
+    assert invoice.customer_name == "Someone"
+    assert list(invoice.charges.order_by("pk").values_list("name", flat=True)) == ["line 0", "changed", "line 2", "new"]
+    assert invoice.total == Money(35, "GBP")
+
+
+@pytest.mark.django_db
+def test_email_html_precompiled(invoice: Invoice):
+    invoice.send_notes = "A <note>\nover two lines"
+    context = {"invoice": invoice, "customer": invoice.customer, "send_notes": invoice.send_notes}
+    emails._compiled.clear()
+
+    with mock.patch.object(emails, "mjml2html", wraps=mjml2html) as compile_mjml:
+        html = emails.get_email_template("emails/invoice.mjml").render(context)
+        emails.get_email_template("emails/invoice.mjml").render(context)
+        assert compile_mjml.call_count == 1
+
+        # Compiled again once the template changes
+        with mock.patch.object(emails, "_mtime", return_value=0.0):
+            emails.get_email_template("emails/invoice.mjml")
+        assert compile_mjml.call_count == 2
+
+    # The same email, except that values are no longer passed through MJML,
+    # which rewrote <br> tags in them as <br />
+    assert "A &lt;note&gt;<br>over two lines" in html
+    assert html.replace("<br>", "<br />") == mjml2html(loader.get_template("emails/invoice.mjml").render(context))
+
+
+@pytest.mark.django_db
+def test_pdf_file_cached(invoice: Invoice):
+    with mock.patch.object(pisa, "CreatePDF", wraps=pisa.CreatePDF) as create_pdf:
+        first = invoice.get_pdf_file()
+        second = invoice.get_pdf_file()
+
+        assert first == second
+        assert default_storage.exists(first.name)
+        assert create_pdf.call_count == 1
+
+        invoice.adjustment = Decimal(5)
+        invoice.save()
+
+        assert invoice.get_pdf_file().digest != first.digest
+        assert create_pdf.call_count == 2
+
+
+@pytest.mark.django_db
+def test_pdf_rendered_once_when_emailed(invoice: Invoice):
+    invoice.send()
+
+    with mock.patch.object(pisa, "CreatePDF", wraps=pisa.CreatePDF) as create_pdf:
+        OutboxMessage.deliver()
+        Invoice.objects.get(pk=invoice.pk).get_pdf_file()
+        invoice.resend_email()
+        OutboxMessage.deliver()
+
+    assert create_pdf.call_count == 1
+
+
+@pytest.mark.django_db
+def test_pdf_response_conditional(invoice: Invoice):
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    url = f"/api/invoice/{invoice.pk}/pdf/"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/pdf"
+    assert b"".join(response.streaming_content).startswith(b"%PDF")
+
+    assert client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code == 304
+    assert client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code == 304
+
+
+@pytest.mark.django_db
+def test_pdf_repeat_download_skips_render_and_storage_checks(invoice: Invoice):
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    url = f"/api/invoice/{invoice.pk}/pdf/"
+    etag = client.get(url)["ETag"]
+
+    with (
+        mock.patch.object(Invoice, "render_html") as render_html,
+        mock.patch.object(default_storage, "exists", wraps=default_storage.exists) as exists,
+    ):
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert client.get(url).status_code == 200
+
+    assert render_html.call_count == 0
+    assert exists.call_count == 0
+
+
+@pytest.mark.django_db
+def test_clean_invoice_pdfs(invoice: Invoice):
+    old = invoice.get_pdf_file()
+    invoice.details = "Changed"
+    invoice.save()
+    current = invoice.get_pdf_file()
+    out = StringIO()
+
+    call_command("clean_invoice_pdfs", stdout=out)
+
+    assert out.getvalue().startswith("Deleted 1 PDFs, kept 1")
+    assert not default_storage.exists(old.name)
+    assert default_storage.exists(current.name)
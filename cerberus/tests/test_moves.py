@@ -0,0 +1,114 @@
+# Standard Library
+from datetime import timedelta
+
+# Django
+from django.contrib.auth.models import User
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..models import Booking, BookingSlot, Service
+from ..moves import Move, bulk_move
+from .conftest import DAY, at, book
+
+
+@pytest.mark.django_db
+def test_move_day(walk_service: Service, django_assert_max_num_queries):
+    bookings = [book(walk_service, at(hour)) for hour in range(9, 15)]
+
+    with django_assert_max_num_queries(12):
+        results = bulk_move(Move(booking.pk, DAY + timedelta(days=1)) for booking in bookings)
+
+    assert [result.status for result in results] == [200] * 6
+    for booking in bookings:
+        moved = Booking.objects.get(pk=booking.pk)
+        assert moved.start == booking.start + timedelta(days=1)
+        assert moved.booking_slot.start == moved.start
+        assert moved.booking_slot.customer_count == 1
+
+    assert BookingSlot.objects.count() == 6
+
+
+@pytest.mark.django_db
+def test_swap(walk_service: Service):
+    other_service = baker.make(Service, max_pet=1, max_customer=1)
+    first = book(walk_service, at(9))
+    second = book(other_service, at(10))
+
+    results = bulk_move([Move(first.pk, at(10)), Move(second.pk, at(9))])
+
+    assert [result.status for result in results] == [200, 200]
+    assert Booking.objects.get(pk=first.pk).booking_slot.service == walk_service
+    assert Booking.objects.get(pk=second.pk).booking_slot.service == other_service
+
+
+@pytest.mark.django_db
+def test_conflicts(walk_service: Service):
+    full = book(walk_service, at(9), pets=4)
+    overlapped = book(walk_service, at(12))
+    joins = book(walk_service, at(15))
+    too_many_pets = book(walk_service, at(16))
+    overlaps = book(walk_service, at(17))
+    canceled = book(walk_service, at(18))
+    canceled.cancel()
+
+    results = bulk_move(
+        [
+            Move(joins.pk, at(12)),
+            Move(too_many_pets.pk, at(9)),
+            Move(overlaps.pk, at(12) + timedelta(minutes=30)),
+            Move(canceled.pk, at(20)),
+            Move(0, at(20)),
+        ]
+    )
+
+    assert [(result.status, result.reason) for result in results] == [
+        (200, None),
+        (400, "Booking has max pets for service, 4"),
+        (400, "Booking overlaps another"),
+        (400, "Booking cannot be moved"),
+        (404, "Booking not found"),
+    ]
+    assert Booking.objects.get(pk=joins.pk).booking_slot == overlapped.booking_slot
+    assert Booking.objects.get(pk=too_many_pets.pk).start == at(16)
+    assert BookingSlot.objects.get(pk=full.booking_slot.pk).pet_count == 4
+
+
+@pytest.mark.django_db
+def test_failed_move_stays_put(walk_service: Service):
+    other_service = baker.make(Service, max_pet=1, max_customer=1)
+    blocked = book(walk_service, at(9))
+    blocker = book(other_service, at(12))
+    follower = book(walk_service, at(15))
+
+    results = bulk_move([Move(blocked.pk, at(12)), Move(follower.pk, at(9) + timedelta(minutes=30))])
+
+    assert [result.status for result in results] == [400, 400]
+    assert Booking.objects.get(pk=blocked.pk).start == at(9)
+    assert Booking.objects.get(pk=blocker.pk).start == at(12)
+
+
+@pytest.mark.django_db
+def test_api(walk_service: Service):
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    first = book(walk_service, at(9))
+    second = book(walk_service, at(10))
+
+    response = client.put(
+        "/api/booking/bulk_move/",
+        [{"id": first.pk, "to": DAY + timedelta(days=1)}, {"id": second.pk, "to": at(9).isoformat()}],
+        format="json",
+    )
+
+    assert response.status_code == 200
+    assert Booking.objects.get(pk=first.pk).start == at(9, days=1)
+    assert Booking.objects.get(pk=second.pk).start == at(9)
+
+    response = client.put("/api/booking/bulk_move/", [{"id": 0, "to": DAY}], format="json")
+
+    assert response.status_code == 207
+    assert response.data["results"][0]["status"] == 404
@@ -0,0 +1,167 @@
+# Standard Library
+import socketserver
+import threading
+from collections.abc import Generator
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPServerDisconnected
+from unittest import mock
+
+# Django
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.management import call_command
+from django.utils import timezone
+
+# Third Party
+import pytest
+from model_bakery import baker
+from xhtml2pdf import pisa
+
+# Locals
+from ..models import Charge, Customer, Invoice, OutboxMessage
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough of SMTP to accept messages and count them."""
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1  # type: ignore
+        self.reply("220 localhost")
+        in_data = False
+
+        for line in self.rfile:
+            line = line.rstrip(b"\r\n")
+            if in_data:
+                if line == b".":
+                    in_data = False
+                    self.server.messages += 1  # type: ignore
+                    self.reply("250 OK")
+            elif line[:4].upper() == b"DATA":
+                in_data = True
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+            elif line[:4].upper() == b"QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+@pytest.fixture
+def smtp_server(settings) -> Generator[socketserver.ThreadingTCPServer, None, None]:
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SmtpHandler)
+    server.daemon_threads = True
+    server.connections = server.messages = 0  # type: ignore
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    settings.EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+    settings.EMAIL_HOST, settings.EMAIL_PORT = server.server_address
+    settings.EMAIL_USE_TLS = False
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def make_invoice() -> Invoice:
+    invoice: Invoice = baker.make(
+        Invoice, customer=baker.make(Customer, invoice_email="test@example.com"), adjustment=0.0
+    )
+    baker.make(Charge, name="line", line=10, invoice=invoice)
+    return invoice
+
+
+@pytest.mark.django_db
+def test_send_only_queues():
+    invoice = make_invoice()
+
+    with mock.patch.object(pisa, "CreatePDF", wraps=pisa.CreatePDF) as create_pdf:
+        invoice.send()
+
+    assert create_pdf.call_count == 0
+    assert len(mail.outbox) == 0
+    assert list(invoice.emails.values_list("state", "to")) == [
+        (OutboxMessage.States.PENDING.value, [f"{invoice.customer.name} <test@example.com>"])
+    ]
+
+
+@pytest.mark.django_db
+def test_deliver():
+    invoice = make_invoice()
+    invoice.send()
+
+    report = OutboxMessage.deliver()
+
+    assert (report.sent, report.retrying, report.failed) == (1, 0, 0)
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].attachments[0][0] == f"{invoice.name}.pdf"
+
+    message = invoice.emails.get()
+    assert (message.state, message.attempts) == (OutboxMessage.States.SENT.value, 1)
+    assert message.sent_on is not None
+
+    assert OutboxMessage.deliver().sent == 0
+
+
+@pytest.mark.django_db
+def test_retry_with_backoff(settings):
+    settings.OUTBOX_MAX_ATTEMPTS = 3
+    invoice = make_invoice()
+    invoice.send()
+    message = invoice.emails.get()
+
+    with mock.patch.object(locmem.EmailBackend, "send_messages", side_effect=SMTPServerDisconnected("gone")):
+        for attempt, delay in enumerate([60, 120], start=1):
+            started = timezone.now()
+            assert OutboxMessage.deliver().retrying == 1
+
+            message.refresh_from_db()
+            assert (message.state, message.attempts) == (OutboxMessage.States.PENDING.value, attempt)
+            assert message.last_error == "SMTPServerDisconnected: gone"
+            assert started + timedelta(seconds=delay) <= message.next_attempt
+            assert message.next_attempt <= timezone.now() + timedelta(seconds=delay)
+
+            # Not due yet
+            assert OutboxMessage.deliver().retrying == 0
+            OutboxMessage.objects.update(next_attempt=timezone.now())
+
+        assert OutboxMessage.deliver().failed == 1
+
+    message.refresh_from_db()
+    assert (message.state, message.attempts) == (OutboxMessage.States.FAILED.value, 3)
+    assert OutboxMessage.deliver().failed == 0
+
+
+@pytest.mark.django_db
+def test_expired_claim_is_retried():
+    make_invoice().send()
+    OutboxMessage.objects.update(state=OutboxMessage.States.SENDING.value, next_attempt=timezone.now())
+
+    assert OutboxMessage.deliver().sent == 1
+
+
+@pytest.mark.django_db
+def test_deliver_over_one_smtp_connection(smtp_server):
+    for _ in range(3):
+        make_invoice().send()
+
+    report = OutboxMessage.deliver(batch_size=2)
+
+    assert report.sent == 3
+    assert (smtp_server.connections, smtp_server.messages) == (1, 3)
+
+
+@pytest.mark.django_db
+def test_run_outbox():
+    make_invoice().send()
+    out = StringIO()
+
+    call_command("run_outbox", stdout=out)
+
+    assert out.getvalue().startswith("Sent 1 emails, 0 to retry and 0 failed")
+    assert len(mail.outbox) == 1
@@ -0,0 +1,94 @@
+# Standard Library
+from datetime import timedelta
+
+# Django
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..models import Charge, Customer, Invoice
+from ..overview import build_overview, get_overview
+
+
+def make_invoice(customer: Customer, state: str = Invoice.States.DRAFT.value, line: int = 10, **kwargs) -> Invoice:
+    invoice: Invoice = baker.make(Invoice, customer=customer)
+    baker.make(Charge, invoice=invoice, line=line)
+    Invoice.objects.filter(pk=invoice.pk).update(state=state, **kwargs)
+    return invoice
+
+
+@pytest.fixture
+def customer() -> Customer:
+    return baker.make(Customer, first_name="Ann", last_name="Other")
+
+
+@pytest.mark.django_db
+def test_overview_in_one_query(customer: Customer, django_assert_num_queries):
+    drafts = [make_invoice(customer, line=i) for i in range(1, 4)]
+    make_invoice(customer, Invoice.States.UNPAID.value)
+    make_invoice(customer, Invoice.States.PAID.value)
+    make_invoice(customer, Invoice.States.PAID.value, last_updated=timezone.now() - timedelta(days=40))
+
+    with django_assert_num_queries(1):
+        overview = build_overview(limit=2)
+
+    assert {state: (bucket.count, bucket.total.amount) for state, bucket in overview.items()} == {
+        "draft": (3, 6),
+        "unpaid": (1, 10),
+        "void": (0, 0),
+        "paid": (1, 10),
+    }
+
+    draft = overview["draft"]
+    assert [row.id for row in draft.results] == [drafts[2].pk, drafts[1].pk]
+    assert draft.results[0].name == drafts[2].name
+    assert draft.results[0].customer_name == "Ann Other"
+    assert draft.next_offset == 2
+
+    draft = build_overview(limit=2, offset=2)["draft"]
+    assert ([row.id for row in draft.results], draft.count, draft.next_offset) == ([drafts[0].pk], 3, None)
+
+    # Past the end the counts are still there
+    assert build_overview(offset=10)["draft"][:3] == (3, draft.total, 10)
+    assert list(build_overview(bucket="unpaid")) == ["unpaid"]
+
+
+@pytest.mark.django_db
+def test_overview_cached_until_changed(customer: Customer, django_assert_num_queries):
+    invoice = make_invoice(customer)
+    assert get_overview()["draft"].total.amount == 10
+
+    with django_assert_num_queries(0):
+        assert get_overview()["draft"].total.amount == 10
+
+    charge = invoice.charges.get()
+    charge.quantity = 3
+    charge.save()
+
+    assert get_overview()["draft"].total.amount == 30
+
+
+@pytest.mark.django_db
+def test_overview_api(customer: Customer):
+    make_invoice(customer)
+    make_invoice(baker.make(Customer))
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+
+    response = client.get("/api/invoice/overview/", {"limit": 1})
+    assert response.status_code == 200
+    assert set(response.data) == {"draft", "unpaid", "void", "paid"}
+    assert (response.data["draft"]["count"], response.data["draft"]["next_offset"]) == (2, 1)
+    assert set(response.data["draft"]["results"][0]) >= {"id", "name", "customer_name", "total", "overdue"}
+
+    response = client.get(f"/api/customer/{customer.pk}/accounts/")
+    assert response.data["draft"]["count"] == 1
+    assert response.data["draft"]["results"][0]["customer_id"] == customer.pk
+
+    assert client.get("/api/customer/0/accounts/").status_code == 404
+    assert client.get("/api/invoice/overview/", {"limit": 0}).status_code == 400
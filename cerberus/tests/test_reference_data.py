@@ -0,0 +1,94 @@
+# Standard Library
+from collections.abc import Generator
+
+# Django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+from taggit.models import Tag
+
+# Locals
+from ..models import Customer, Pet, Service, Vet
+from ..reference_data import get_reference_data
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> Generator[None, None, None]:
+    caches[settings.REFERENCE_DATA_CACHE].clear()
+    yield
+    caches[settings.REFERENCE_DATA_CACHE].clear()
+
+
+@pytest.fixture
+def client() -> APIClient:
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    return client
+
+
+@pytest.fixture
+def customer() -> Customer:
+    return baker.make(Customer, first_name="Alice", last_name="Smith")
+
+
+@pytest.mark.django_db
+def test_bundle(client: APIClient, customer: Customer):
+    service = baker.make(Service, name="Walk")
+    vet = baker.make(Vet, name="Riverside Vets")
+    pet = baker.make(Pet, name="Rex", customer=customer)
+    baker.make(Pet, name="Retired", customer=customer, active=False)
+    baker.make(Customer, first_name="Bob", active=False)
+    Tag.objects.create(name="nervous")
+
+    response = client.get("/api/reference-data/")
+
+    assert response.status_code == 200
+    assert response["ETag"] == f'"{response.data["version"]}"'
+    assert [(s["id"], s["name"]) for s in response.data["services"]] == [(service.pk, "Walk")]
+    assert [(v["id"], v["name"]) for v in response.data["vets"]] == [(vet.pk, "Riverside Vets")]
+    assert "pets" not in response.data["vets"][0]
+    assert response.data["tags"] == ["nervous"]
+    assert response.data["customers"] == {str(customer.pk): "Alice Smith"}
+    assert response.data["pets"] == {str(pet.pk): "Rex"}
+    assert client.get("/api/tag/").data == ["nervous"]
+
+
+@pytest.mark.django_db
+def test_not_modified(client: APIClient, customer: Customer):
+    etag = client.get("/api/reference-data/")["ETag"]
+
+    response = client.get("/api/reference-data/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+    assert not response.content
+
+    assert client.get("/api/reference-data/", HTTP_IF_NONE_MATCH='"other"').status_code == 200
+
+
+@pytest.mark.django_db
+def test_cached_until_written(customer: Customer, django_assert_num_queries):
+    version = get_reference_data().version
+
+    with django_assert_num_queries(0):
+        assert get_reference_data().version == version
+
+    # Saving without changing anything moves on the cache but not the version
+    customer.save()
+    assert get_reference_data().version == version
+
+    for write in [
+        lambda: baker.make(Service),
+        lambda: baker.make(Vet),
+        lambda: Tag.objects.create(name="new"),
+        lambda: baker.make(Pet, customer=customer),
+        lambda: baker.make(Customer),
+        lambda: Tag.objects.filter(name="new").delete(),
+    ]:
+        write()
+        assert get_reference_data().version != version
+        version = get_reference_data().version
@@ -0,0 +1,117 @@
+# Standard Library
+import time
+from collections.abc import Generator
+from unittest import mock
+
+# Django
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..exceptions import RendererUnavailableError
+from ..models import Charge, Customer, Invoice
+from ..rendering import WARM_UP_HTML, PdfRenderer, get_renderer
+
+
+@pytest.fixture
+def invoice() -> Generator[Invoice, None, None]:
+    invoice: Invoice = baker.make(Invoice, customer=baker.make(Customer), adjustment=0.0)
+    baker.make(Charge, name="line", line=10, invoice=invoice)
+    yield invoice
+
+
+@pytest.fixture
+def pool() -> Generator[PdfRenderer, None, None]:
+    renderer = PdfRenderer(workers=1, queue=0, timeout=60)
+    yield renderer
+    renderer.shutdown()
+
+
+def test_render_inline():
+    renderer = PdfRenderer(workers=0)
+
+    assert renderer.render(WARM_UP_HTML).startswith(b"%PDF")
+
+    stats = renderer.stats()
+    assert (stats.rendered, stats.in_flight) == (1, 0)
+    assert stats.average_render_seconds > 0
+
+
+def test_render_in_pool(pool: PdfRenderer):
+    pool.start()
+
+    assert pool.render(WARM_UP_HTML).startswith(b"%PDF")
+    assert pool.stats().rendered == 1
+
+
+def test_pool_rejects_when_full(pool: PdfRenderer):
+    # The worker is still starting, so the first render holds the only place
+    first = pool.submit(WARM_UP_HTML)
+
+    with pytest.raises(RendererUnavailableError) as error:
+        pool.submit(WARM_UP_HTML)
+    assert error.value.wait == pool.retry_after
+    assert pool.stats().rejected == 1
+
+    first.result()
+    assert pool.submit(WARM_UP_HTML).result()[0].startswith(b"%PDF")
+
+
+def test_render_times_out():
+    renderer = PdfRenderer(workers=1, queue=0, timeout=0.001)
+
+    try:
+        with pytest.raises(RendererUnavailableError):
+            renderer.render(WARM_UP_HTML)
+        assert renderer.stats().timed_out == 1
+
+        # The render carries on in the worker and gives its place back when done
+        deadline = time.monotonic() + 60
+        while renderer.stats().in_flight and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert renderer.stats().in_flight == 0
+
+        renderer.timeout = 60
+        assert renderer.render(WARM_UP_HTML).startswith(b"%PDF")
+    finally:
+        renderer.shutdown()
+
+
+def test_renderer_follows_settings(settings):
+    settings.PDF_RENDER_WORKERS = 3
+    settings.PDF_RENDER_QUEUE = 4
+
+    assert (get_renderer().workers, get_renderer().capacity) == (3, 7)
+
+
+@pytest.mark.django_db
+def test_unavailable_responses(invoice: Invoice):
+    api = APIClient()
+    api.force_authenticate(baker.make(User))
+    client = Client()
+    client.force_login(baker.make(User))
+
+    with mock.patch.object(PdfRenderer, "render", side_effect=RendererUnavailableError(wait=5)):
+        responses = [
+            api.get(f"/api/invoice/{invoice.pk}/pdf/"),
+            client.get(reverse("invoice_pdf", kwargs={"pk": invoice.pk})),
+        ]
+
+    assert [(response.status_code, response["Retry-After"]) for response in responses] == [(503, "5"), (503, "5")]
+
+
+@pytest.mark.django_db
+def test_render_stats_api():
+    client = APIClient()
+    client.force_authenticate(baker.make(User, is_staff=True))
+
+    response = client.get("/api/invoice/render_stats/")
+
+    assert response.status_code == 200
+    assert set(response.data) >= {"workers", "queued", "in_flight", "rendered", "average_render_seconds"}
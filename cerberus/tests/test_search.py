@@ -0,0 +1,127 @@
+# Standard Library
+from io import StringIO
+
+# Django
+from django.contrib.auth.models import User
+from django.core.management import call_command
+
+# Third Party
+import pytest
+from model_bakery import baker
+from rest_framework.test import APIClient
+
+# Locals
+from ..models import Contact, Customer, Pet, SearchEntry, Vet
+from ..models.search import fts_query, search_words
+
+
+@pytest.fixture
+def client() -> APIClient:
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    return client
+
+
+@pytest.fixture
+def customer() -> Customer:
+    return baker.make(Customer, first_name="Alice", last_name="Smith", invoice_email="alice@example.com")
+
+
+def found(query: str, **kwargs) -> list[tuple[str, int]]:
+    return [(hit.kind, hit.id) for hit in SearchEntry.search(query, **kwargs)]
+
+
+def test_search_words():
+    assert search_words("Alice, o'brien") == ["Alice", "o", "brien"]
+    assert search_words("07700 900 123 ext 4") == ["07700900123", "ext", "4"]
+    # Words that are FTS5 syntax are quoted like any other
+    assert fts_query(["Rex", "OR"]) == '"Rex"* "OR"*'
+
+
+@pytest.mark.django_db
+def test_index_kept_up_to_date(customer: Customer):
+    pet = baker.make(Pet, name="Rex", customer=customer)
+    contact = baker.make(Contact, name="Mobile", details="07700 900 123", customer=customer)
+    vet = baker.make(Vet, name="Riverside Vets")
+
+    assert found("smith") == [("customer", customer.pk)]
+    assert found("alice@example") == [("customer", customer.pk)]
+    assert found("re") == [("pet", pet.pk)]
+    assert found("07700900") == [("contact", contact.pk)]
+    assert found("07700 900 1") == [("contact", contact.pk)]
+    assert found("riverside") == [("vet", vet.pk)]
+
+    pet.name = "Bella"
+    pet.save()
+    assert found("rex") == []
+    assert found("bella") == [("pet", pet.pk)]
+
+    vet.delete()
+    assert found("riverside") == []
+
+    pet.delete()
+    customer.delete()
+    assert not SearchEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_search_ranked_and_typed(customer: Customer):
+    pet = baker.make(Pet, name="Smith", customer=customer)
+    other = baker.make(Customer, first_name="Bob", last_name="Smithson")
+
+    hits = SearchEntry.search("smith")
+    assert {(hit.kind, hit.id) for hit in hits} == {
+        ("customer", customer.pk),
+        ("customer", other.pk),
+        ("pet", pet.pk),
+    }
+    assert [hit.rank for hit in hits] == sorted((hit.rank for hit in hits), reverse=True)
+    assert all(hit.customer_id == customer.pk for hit in hits if hit.id != other.pk)
+
+    assert found("smith", kinds=["pet"]) == [("pet", pet.pk)]
+    assert len(SearchEntry.search("smith", limit=1)) == 1
+    assert found('smith" OR *') == []
+
+
+@pytest.mark.django_db
+def test_api(client: APIClient, customer: Customer):
+    pet = baker.make(Pet, name="Rex", customer=customer)
+
+    response = client.get("/api/search/", {"q": "rex"})
+
+    assert response.status_code == 200
+    [hit] = response.data
+    assert (hit["kind"], hit["id"], hit["customer_id"], hit["title"]) == ("pet", pet.pk, customer.pk, "Rex")
+    assert hit["rank"] > 0
+
+    response = client.get("/api/search/", {"q": "alice", "kind": ["pet", "vet"]})
+    assert response.data == []
+
+    assert client.get("/api/search/", {"q": "a"}).status_code == 400
+    assert client.get("/api/search/").status_code == 400
+
+
+@pytest.mark.django_db
+def test_filters_use_index(client: APIClient, customer: Customer):
+    baker.make(Pet, name="Rex", customer=customer)
+    other = baker.make(Customer, first_name="Bob", last_name="Jones")
+
+    def customer_ids(**params) -> list[int]:
+        return [result["id"] for result in client.get("/api/customer/", params).data["results"]]
+
+    assert customer_ids(name="smi") == [customer.pk]
+    assert customer_ids(pets__name="rex") == [customer.pk]
+    assert customer_ids(name="jones") == [other.pk]
+
+    response = client.get("/api/pet/", {"customer__name": "alice"})
+    assert [result["name"] for result in response.data["results"]] == ["Rex"]
+
+
+@pytest.mark.django_db
+def test_benchmark():
+    out = StringIO()
+
+    call_command("benchmark_search", "--entries", "3000", "--repeat", "1", stdout=out)
+
+    assert out.getvalue().startswith("Searched 3000 entries 5 times")
+    assert not SearchEntry.objects.exists()
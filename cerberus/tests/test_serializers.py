@@ -1,5 +1,8 @@
 # Django
+from django.contrib.auth.models import User
+from django.db import connection
 from django.db.models import GeneratedField
+from django.test.utils import CaptureQueriesContext
 
 # Third Party
 import pytest
@@ -7,10 +10,11 @@ from hypothesis import given
 from hypothesis.extra.django import from_model, register_field_strategy
 from hypothesis.strategies import just
 from model_bakery import baker
+from rest_framework.test import APIClient
 
 # Locals
-from ..models import Address, Contact, Customer, Pet
-from ..serializers import ContactSerializer, CustomerSerializer
+from ..models import Address, Charge, Contact, Customer, Invoice, Pet
+from ..serializers import ContactSerializer, CustomerSerializer, InvoiceSerializer
 
 register_field_strategy(GeneratedField, just(None))
 
@@ -69,3 +73,45 @@ def test_customer():
     }
 
     assert validation.items() <= data.items()
+
+
+def make_invoices(customer: Customer, count: int) -> None:
+    for _ in range(count):
+        invoice: Invoice = baker.make(Invoice, customer=customer)
+        baker.make(Charge, invoice=invoice, _quantity=2)
+        invoice.send(send_email=False)
+
+
+@pytest.mark.django_db
+def test_invoice_queries_dont_grow_with_results():
+    customer = baker.make(Customer, invoice_email="test@example.com")
+    client = APIClient()
+    client.force_authenticate(baker.make(User))
+    urls = ["/api/invoice/?limit=100", "/api/invoice/overview/", f"/api/customer/{customer.pk}/accounts/"]
+
+    def count_queries() -> list[int]:
+        counts = []
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                assert client.get(url).status_code == 200
+            counts.append(len(queries))
+        return counts
+
+    make_invoices(customer, 2)
+    few = count_queries()
+    make_invoices(customer, 10)
+
+    assert count_queries() == few
+
+
+@pytest.mark.django_db
+def test_invoice_state_log_prefetched():
+    make_invoices(baker.make(Customer, invoice_email="test@example.com"), 1)
+    invoice = InvoiceSerializer.setup_queryset(Invoice.objects.all()).get()
+
+    with CaptureQueriesContext(connection) as queries:
+        data = InvoiceSerializer(invoice).data
+
+    assert [log["transition"] for log in data["state_log"]] == [None, "send"]
+    assert len(data["charges"]) == 2
+    assert len(queries) == 0
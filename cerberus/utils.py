@@ -36,3 +36,22 @@ def rgetattr(obj, attr, *args):
         return getattr(obj, attr, *args)
 
     return functools.reduce(_getattr, [obj] + attr.split("."))
+
+
+# serialization_failure, deadlock_detected and lock_not_available on Postgres,
+# lock wait timeout and deadlock on MySQL
+LOCK_CONFLICT_CODES = {"40001", "40P01", "55P03", 1205, 1213}
+
+
+def is_lock_conflict(error: Exception) -> bool:
+    """Whether a database error is a lock or serialization conflict that is
+    worth retrying, rather than a real failure."""
+    cause = error.__cause__ or error
+    if getattr(cause, "pgcode", None) in LOCK_CONFLICT_CODES:
+        return True
+
+    if cause.args and cause.args[0] in LOCK_CONFLICT_CODES:
+        return True
+
+    # SQLite only reports it in the message
+    return "database is locked" in str(cause) or "database table is locked" in str(cause)
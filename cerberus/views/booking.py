@@ -2,23 +2,26 @@
 import datetime as dt
 from calendar import MONDAY, Calendar, month_name
 from collections import defaultdict, namedtuple
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
+from functools import cache, partial
 
 # Django
 from django.contrib.humanize.templatetags import humanize
-from django.db.models import Count
-from django.http import Http404
+from django.db.models import Count, Max, QuerySet
+from django.http import Http404, HttpRequest, HttpResponse
+from django.shortcuts import render
 from django.urls import reverse_lazy
 from django.views.generic import RedirectView, TemplateView
 
 # Locals
 from ..forms import BookingForm
-from ..models import Booking
+from ..models import Booking, Pet
+from ..schedule import build_day_schedule
 from ..utils import make_aware
-from .crud_views import CRUDViews, Crumb
+from .crud_views import CRUDViews, Crumb, extra_view
 from .transition_view import TransitionView
 
-BookingGroup = namedtuple("BookingDay", ["date", "bookings"])
+CalendarDay = namedtuple("CalendarDay", ["date", "bookings", "version"])
 
 
 class BookingCRUD(CRUDViews):
@@ -26,6 +29,19 @@ class BookingCRUD(CRUDViews):
     form_class = BookingForm
     sortable_fields = ["customer__name", "pets", "service", "start", "length"]
 
+    @extra_view(detail=False)
+    def pets(self, request: HttpRequest) -> HttpResponse:
+        """The pets field of the booking form for the chosen customer, with
+        their active pets ticked."""
+        customer = request.GET.get("customer", "")
+        active = []
+        if customer.isdigit():
+            active = list(Pet.objects.filter(customer_id=customer, active=True).values_list("pk", flat=True))
+
+        form = BookingForm(initial={"customer": customer, "pets": active})
+
+        return render(request, "cerberus/widgets/customer_pets.html", {"field": form["pets"]})
+
 
 class BookingCalenderRedirect(RedirectView):
     pattern_name = "booking_calender_month"
@@ -93,10 +109,27 @@ class BookingCalenderYear(TemplateView, CalendarBreadCrumbs):
 
 
 class BookingCalenderMonth(TemplateView, CalendarBreadCrumbs):
+    """Month calendar where each day cell is a cached fragment.
+
+    A day's fragment is keyed by the number of bookings on the day and their
+    latest ``last_updated``, which one aggregate query provides. The bookings
+    themselves are only loaded, in a single prefetched query for the whole
+    month, when a cell is missing from the cache.
+    """
+
     template_name = "cerberus/booking_calender_month.html"
+    fragment_timeout = 60 * 60 * 24
+
+    def get_bookings(self, start: dt.date, end: dt.date) -> QuerySet[Booking]:
+        return Booking.active.filter(start__gte=make_aware(start), start__lt=make_aware(end + dt.timedelta(days=1)))
 
     def grouped_bookings(self, start: dt.date, end: dt.date) -> dict[dt.date, list[Booking]]:
-        bookings = Booking.active.filter(start__gte=start, end__lte=end).order_by("start")
+        bookings = (
+            self.get_bookings(start, end)
+            .select_related("service", "customer")
+            .prefetch_related("pets")
+            .order_by("start")
+        )
 
         bookings_by_date: dict[dt.date, list[Booking]] = defaultdict(list)
         for booking in bookings:
@@ -104,10 +137,24 @@ class BookingCalenderMonth(TemplateView, CalendarBreadCrumbs):
 
         return bookings_by_date
 
-    def organize_bookings(self, dates: list[dt.date]) -> Iterable[BookingGroup]:
-        bookings_by_date = self.grouped_bookings(dates[0], dates[-1])
+    def day_versions(self, start: dt.date, end: dt.date) -> dict[dt.date, str]:
+        days = (
+            self.get_bookings(start, end)
+            .order_by()
+            .values("start__date")
+            .annotate(last_updated=Max("last_updated"), count=Count("id"))
+        )
+
+        return {day["start__date"]: f"{day['last_updated'].timestamp()}:{day['count']}" for day in days}
+
+    def organize_bookings(self, dates: list[dt.date]) -> Iterable[CalendarDay]:
+        bookings_by_date = cache(partial(self.grouped_bookings, dates[0], dates[-1]))
+        versions = self.day_versions(dates[0], dates[-1])
 
-        return [BookingGroup(date, bookings_by_date[date]) for date in dates]
+        def day_bookings(date: dt.date) -> Callable[[], list[Booking]]:
+            return lambda: bookings_by_date()[date]
+
+        return [CalendarDay(date, day_bookings(date), versions.get(date)) for date in dates]
 
     def get_context_data(self, year=None, month=None, **kwargs):
         now = dt.datetime.now()
@@ -128,6 +175,7 @@ class BookingCalenderMonth(TemplateView, CalendarBreadCrumbs):
         context["next_month"] = (date + dt.timedelta(days=32)).replace(day=1)
         context["prev_month"] = (date + dt.timedelta(days=-1)).replace(day=1)
         context["calendar"] = self.organize_bookings(list(calendar.itermonthdates(year, month)))
+        context["fragment_timeout"] = self.fragment_timeout
         context["today"] = date.today()
         context["days"] = calendar.iterweekdays()
         context["breadcrumbs"] = self.get_breadcrumbs(year, month)
@@ -138,31 +186,6 @@ class BookingCalenderMonth(TemplateView, CalendarBreadCrumbs):
 class BookingCalenderDay(TemplateView, CalendarBreadCrumbs):
     template_name = "cerberus/booking_calender_day.html"
 
-    def grouped_bookings(self, start: dt.datetime, end: dt.datetime) -> dict[dt.time, list[Booking]]:
-        bookings = Booking.active.filter(start__gte=start, end__lte=end).order_by("start")
-
-        bookings_by_date: dict[dt.time, list[Booking]] = defaultdict(list)
-        for booking in bookings:
-            bookings_by_date[booking.start.time()].append(booking)
-
-        return bookings_by_date
-
-    def organize_bookings(self, times: list[dt.datetime]) -> Iterable[BookingGroup]:
-        bookings_by_date = self.grouped_bookings(times[0], times[-1])
-
-        return [BookingGroup(t, bookings_by_date[t.time()]) for t in times]
-
-    def get_times(self, date: dt.date, step: int = 15, start: int = 8, end: int = 17) -> list[dt.datetime]:
-        min_time, max_time = Booking.get_mix_max_time(date)
-
-        bookings_start = getattr(min_time, "hour", start + 1) - 1
-        bookings_end = getattr(max_time, "hour", end - 1) + 1
-
-        start = min(start, bookings_start)
-        end = max(end, bookings_end)
-        steps = range(((end - start) * (60 // step)) + 1)
-        return [make_aware(date + dt.timedelta(hours=start, minutes=15 * i)) for i in steps]
-
     def get_context_data(self, year=None, month=None, day=None, **kwargs):
         now = dt.datetime.now()
         year = year or now.year
@@ -175,15 +198,13 @@ class BookingCalenderDay(TemplateView, CalendarBreadCrumbs):
         except ValueError as e:
             raise Http404("date not found") from e
 
-        times = self.get_times(date)
-
         context["date"] = date
         context["year"] = year
         context["month"] = month
         context["day"] = day
         context["next_day"] = date + dt.timedelta(days=1)
         context["prev_day"] = date + dt.timedelta(days=-1)
-        context["booking_times"] = self.organize_bookings(times)
+        context["booking_times"] = build_day_schedule(date).rows
         context["breadcrumbs"] = self.get_breadcrumbs(year, month, day)
 
         return context
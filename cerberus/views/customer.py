@@ -7,7 +7,7 @@ from django.shortcuts import get_object_or_404, render
 from django.urls import reverse_lazy
 
 # Third Party
-from vanilla import DetailView
+from vanilla import DetailView, GenericModelView
 
 # Locals
 from ..filters import CustomerFilter
@@ -15,6 +15,13 @@ from ..forms import CustomerForm, UninvoicedChargesForm
 from ..models import Customer
 from .crud_views import Actions, CRUDViews, Crumb, extra_view
 
+AUTOCOMPLETE_LIMIT = 10
+
+
+class CustomerFinancialsMixin(GenericModelView):
+    def get_queryset(self):
+        return super().get_queryset().with_financials()
+
 
 class CustomerDetail(DetailView):
     def get_context_data(self, **kwargs):
@@ -30,6 +37,7 @@ class CustomerCRUD(CRUDViews):
     form_class = CustomerForm
     filter_class = CustomerFilter
     sortable_fields = ["name"]
+    extra_mixins = [CustomerFinancialsMixin]
 
     @classmethod
     def get_view_class(cls, action: Actions):
@@ -37,6 +45,16 @@ class CustomerCRUD(CRUDViews):
             return CustomerDetail
         return super().get_view_class(action)
 
+    @extra_view(detail=False)
+    def autocomplete(self: Self, request: HttpRequest) -> HttpResponse:
+        customers = Customer.objects.filter(active=True).matching(request.GET.get("q", ""))
+
+        return render(
+            request,
+            "cerberus/widgets/autocomplete_results.html",
+            {"options": [{"value": customer.pk, "label": str(customer)} for customer in customers[:AUTOCOMPLETE_LIMIT]]},
+        )
+
     @extra_view(detail=True)
     def uninvoiced_charges(self: Self, request: HttpRequest, pk: int) -> HttpResponse:
         customer = get_object_or_404(Customer, pk=pk)
@@ -1,5 +1,3 @@
-# Standard Library
-
 # Standard Library
 from typing import Self
 
@@ -15,6 +13,8 @@ from django_htmx.http import HttpResponseClientRedirect
 from vanilla import CreateView, UpdateView
 
 # Locals
+from ..billing import write_charges
+from ..exceptions import ChargeLinesError, RendererUnavailableError
 from ..filters import InvoiceFilter
 from ..forms import ChargeForm, InvoiceForm, InvoiceSendForm, UninvoicedChargesForm
 from ..models import Charge, Invoice
@@ -22,6 +22,10 @@ from .crud_views import Actions, CRUDViews, extra_view
 from .transition_view import TransitionView
 
 
+def renderer_unavailable(error: RendererUnavailableError) -> HttpResponse:
+    return HttpResponse(str(error.detail), status=error.status_code, headers={"Retry-After": str(error.wait)})
+
+
 class InvoiceUpdateView(UpdateView):
     def get_success_url(self):
         return reverse_lazy("invoice_detail", kwargs={"pk": self.object.id})
@@ -38,16 +42,25 @@ class InvoiceUpdateView(UpdateView):
         return context
 
     def post(self, request, *args, **kwargs):
-        formset = self.get_formset()(data=request.POST, files=request.FILES)
-        if formset.is_valid():
-            formset.save()
-            return super().post(request, *args, **kwargs)
-
-        form = self.get_form(
-            data=request.POST,
-            files=request.FILES,
-            instance=self.object,
-        )
+        self.object = self.get_object()
+        form = self.get_form(data=request.POST, files=request.FILES, instance=self.object)
+        formset = self.get_formset()(data=request.POST, files=request.FILES, queryset=self.object.charges.all())
+
+        if form.is_valid() and formset.is_valid():
+            # Only the lines that were changed are written, the rest are left as they are
+            lines = [
+                {**charge_form.cleaned_data, "id": charge_form.instance.pk}
+                for charge_form in formset.forms
+                if charge_form.has_changed()
+            ]
+            try:
+                with transaction.atomic():
+                    response = self.form_valid(form)
+                    write_charges(self.object, lines, remove_missing=False, by=request.user)
+                return response
+            except ChargeLinesError as e:
+                form.add_error(None, str(e.detail))
+
         return self.form_invalid(form)
 
 
@@ -90,7 +103,10 @@ class InvoiceCRUD(CRUDViews):
     def download(self: Self, request: HttpRequest, pk: int) -> HttpResponse:
         invoice: Invoice = get_object_or_404(Invoice, pk=pk)
 
-        return invoice.get_pdf_response()
+        try:
+            return invoice.get_pdf_response(request)
+        except RendererUnavailableError as e:
+            return renderer_unavailable(e)
 
     @extra_view(detail=False, methods=["get", "post"], url_name="invoice_from_charges")
     def from_charges(self: Self, request: HttpRequest) -> HttpResponse:
@@ -99,9 +115,7 @@ class InvoiceCRUD(CRUDViews):
         if charge_form.is_valid():
             with transaction.atomic():
                 invoice = Invoice.from_customer(charge_form.cleaned_data["customer"])
-                for charge in charge_form.cleaned_data["charges"]:
-                    charge.invoice = invoice
-                    charge.save()
+                invoice.add_charges(charge.pk for charge in charge_form.cleaned_data["charges"])
 
             success_url = reverse_lazy("invoice_detail", kwargs={"pk": invoice.pk})
             if request.htmx:  # type: ignore
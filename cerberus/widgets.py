@@ -1,10 +1,13 @@
 # Standard Library
+import contextlib
 from collections.abc import Callable
 from typing import Any
 
 # Django
 from django import forms
+from django.core.validators import EMPTY_VALUES
 from django.forms import widgets
+from django.urls import reverse
 
 # Third Party
 from djmoney.forms import MoneyWidget
@@ -171,3 +174,50 @@ class CheckboxTable(forms.CheckboxSelectMultiple):
                 option["columns"][f"{col_name}"] = col_value
 
         return option
+
+
+class AutocompleteInput(forms.Widget):
+    """A search box which looks up its choices with htmx as it is typed in,
+    rather than rendering every choice into the page.
+
+    ``url_name`` should render ``cerberus/widgets/autocomplete_results.html``
+    for the ``q`` it is given. Only the chosen object is read, for its label.
+    """
+
+    template_name = "cerberus/widgets/autocomplete.html"
+
+    def __init__(self, url_name: str, attrs=None) -> None:
+        super().__init__(attrs)
+        self.url_name = url_name
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"]["url"] = reverse(self.url_name)
+        context["widget"]["label"] = self.label_for(value)
+        return context
+
+    def label_for(self, value) -> str:
+        # A model choice field hands its choices over without reading them
+        queryset = getattr(getattr(self, "choices", None), "queryset", None)
+        if queryset is None or value in EMPTY_VALUES:
+            return ""
+
+        with contextlib.suppress(ValueError, TypeError):
+            if (instance := queryset.filter(pk=value).first()) is not None:
+                return str(instance)
+        return ""
+
+    def id_for_label(self, id_):
+        return f"{id_}_search" if id_ else id_
+
+
+class CustomerPetsCheckbox(forms.CheckboxSelectMultiple):
+    """The pets of the chosen customer, loaded again with htmx whenever the
+    ``customer_field`` changes."""
+
+    crispy_template = "cerberus/widgets/customer_pets.html"
+
+    def __init__(self, url_name: str, customer_field: str = "customer", *args, **kwargs) -> None:
+        self.url_name = url_name
+        self.customer_field = customer_field
+        super().__init__(*args, **kwargs)
@@ -136,7 +136,14 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+MEDIA_URL = "media/"
+
+MEDIA_ROOT = BASE_DIR / "media"
+
 STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedStaticFilesStorage",
     },
@@ -215,4 +222,46 @@ LOGIN_REDIRECT_URL = "dashboard"
 
 SERIALIZATION_MODULES = {"json": "djmoney.serializers"}
 
+# Delete a booking's previous slot when a save or cancel leaves it empty
+COLLECT_EMPTY_SLOTS = True
+
+# Invoice PDFs render in a pool of worker processes, 0 workers renders in the
+# web process. Renders past the workers plus the queue, or slower than the
+# timeout in seconds, get a 503 asking the client to retry after a few seconds
+PDF_RENDER_WORKERS = 2
+PDF_RENDER_QUEUE = 8
+PDF_RENDER_TIMEOUT = 30
+PDF_RENDER_RETRY_AFTER = 5
+# Start the workers when the app loads rather than on the first download
+PDF_RENDER_PREWARM = False
+
+# Emails are queued in the outbox and sent by the run_outbox command. A failed
+# send is retried after OUTBOX_RETRY_SECONDS, doubling each time, up to
+# OUTBOX_MAX_ATTEMPTS. A worker that dies mid batch leaves its messages to be
+# picked up again once OUTBOX_LEASE_SECONDS have passed
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_RETRY_SECONDS = 60
+OUTBOX_LEASE_SECONDS = 300
+
+# The invoice overview is cached until an invoice, charge or payment changes,
+# or for this long at most, since void and paid invoices drop out of it with time
+INVOICE_OVERVIEW_CACHE_SECONDS = 300
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "default",
+    },
+    # Seen by every worker in production, see production.py
+    "shared": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shared",
+    },
+}
+
+# The reference data bundle is cached until a service, vet, tag, customer or
+# pet changes, or for this long at most, in case one was changed in bulk
+REFERENCE_DATA_CACHE = "shared"
+REFERENCE_DATA_CACHE_SECONDS = 60 * 60
+
 SITE_ID = 1
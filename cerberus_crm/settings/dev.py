@@ -15,6 +15,8 @@ ALLOWED_HOSTS = ["*"]
 
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 
+PDF_RENDER_WORKERS = 0
+
 
 INSTALLED_APPS += [
     "django_browser_reload",
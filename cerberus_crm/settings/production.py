@@ -60,4 +60,11 @@ CACHES = {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
         "LOCATION": "renditions",
     },
+    # Created by createcachetable on release
+    "shared": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "cerberus_cache",
+    },
 }
+
+PDF_RENDER_PREWARM = True
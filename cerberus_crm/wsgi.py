@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "cerberus_crm.settings.dev")
 
 application = get_wsgi_application()
+
+if settings.PDF_RENDER_PREWARM:
+    from cerberus.rendering import get_renderer
+
+    get_renderer().start()